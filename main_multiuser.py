@@ -15,8 +15,13 @@ import fcntl
 from typing import Any, Dict, List
 from telethon import TelegramClient, events
 from logging.handlers import TimedRotatingFileHandler
-from user_manager import UserManager, UserContext
-from update_manager import periodic_release_check_loop
+from user_manager import UserManager, UserContext, close_aio_session
+from update_manager import (
+    RELEASE_WEBHOOK_BACKSTOP_INTERVAL,
+    periodic_release_check_loop,
+    release_webhook_server,
+    resolve_release_webhook_config,
+)
 
 # 日志配置
 logger = logging.getLogger('main_multiuser')
@@ -660,6 +665,34 @@ async def start_user(user_ctx: UserContext, global_config: dict):
         return None
 
 
+async def run_release_notifier(notify_callback, webhook_cfg: Dict[str, Any]):
+    """
+    发布通知任务：webhook 启用时与长间隔兜底轮询并行；
+    webhook 异常退出（如端口占用）时记录错误并回退到常规周期轮询。
+    """
+    if webhook_cfg.get("enabled"):
+        backstop = asyncio.create_task(
+            periodic_release_check_loop(notify_callback, interval_seconds=RELEASE_WEBHOOK_BACKSTOP_INTERVAL)
+        )
+        try:
+            log_event(logging.INFO, 'release_check', '发布通知使用 webhook', port=webhook_cfg["port"])
+            await release_webhook_server(
+                notify_callback,
+                webhook_cfg["secret"],
+                host=webhook_cfg["host"],
+                port=webhook_cfg["port"],
+                path=webhook_cfg["path"],
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            log_event(logging.ERROR, 'release_check', 'webhook 异常退出，回退周期轮询', error=str(e))
+        finally:
+            backstop.cancel()
+            await asyncio.gather(backstop, return_exceptions=True)
+    await periodic_release_check_loop(notify_callback)
+
+
 async def main():
     print("=" * 50)
     print("多用户 Telegram Bot 启动中...")
@@ -718,14 +751,19 @@ async def main():
                     error=str(e),
                 )
 
-    asyncio.create_task(periodic_release_check_loop(notify_release))
+    # 保留任务引用，退出时取消
+    release_task = asyncio.create_task(run_release_notifier(notify_release, resolve_release_webhook_config()))
     
     try:
         await asyncio.gather(*tasks, return_exceptions=True)
     finally:
+        release_task.cancel()
+        from zq_multiuser import close_delete_scheduler
+        await close_delete_scheduler()
         for user_ctx in user_manager.get_all_users().values():
             user_ctx.save_state()
             _release_session_lock(user_ctx)
+        await close_aio_session()
     
     log_event(logging.INFO, 'main', '程序正常退出')
 
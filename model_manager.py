@@ -23,6 +23,7 @@ logger = logging.getLogger('model_manager')
 class ModelManager:
     def __init__(self):
         self.models: List[Dict[str, Any]] = []
+        self._model_index: Dict[str, Dict[str, Any]] = {}
         self.api_key_indices = {}  # 用于轮询 API Key
         self.shared_ai_config: Dict[str, Any] = {}
         self.fallback_chain: List[str] = []
@@ -122,21 +123,26 @@ class ModelManager:
             logger.error(f"加载模型配置失败: {e}")
             self.models = []
 
+        self._rebuild_model_index()
+
+    def _rebuild_model_index(self):
+        """按 model_id 与序号(idx)建立查找表；同名键保留列表中靠前的模型，与逐个匹配的结果一致。"""
+        index: Dict[str, Dict[str, Any]] = {}
+        for model in self.models:
+            index.setdefault(model.get('model_id'), model)
+            idx = model.get('idx')
+            if idx is not None:
+                index.setdefault(str(idx), model)
+        self._model_index = index
+
     def load_models(self):
         """兼容旧接口，重新加载配置"""
         self.load_models_from_config()
 
     def get_model(self, model_id: str) -> Optional[Dict[str, Any]]:
         """获取指定模型配置，支持真实 model_id 或配置序号(idx)。"""
-        target = str(model_id)
-        for model in self.models:
-            if model.get('model_id') == target:
-                return model
-            idx = model.get('idx')
-            # 修复：降级链编号无法解析的问题，原因：配置中常使用“1/2/3”序号而非真实 model_id。
-            if idx is not None and str(idx) == target:
-                return model
-        return None
+        # 修复：降级链编号无法解析的问题，原因：配置中常使用“1/2/3”序号而非真实 model_id。
+        return self._model_index.get(str(model_id))
 
     def list_models(self) -> Dict[str, List[Dict[str, Any]]]:
         """按厂商分组列出模型"""
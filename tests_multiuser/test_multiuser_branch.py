@@ -2,20 +2,190 @@ import asyncio
 import json
 import logging
 import re
+import shutil
 import threading
+from collections import deque
+from dataclasses import dataclass
 from pathlib import Path
 from types import SimpleNamespace
 
-from user_manager import UserContext, UserManager
+import pytest
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from user_manager import HISTORY_KEEP, UserContext, UserManager, UserState, load_json_with_comments
 from model_manager import ModelManager
 import constants
+import user_manager
 import zq_multiuser as zm
 import main_multiuser as mm
 
+@dataclass(slots=True)
+class FakeSent:
+    chat_id: int
+    id: int
+
+
+@dataclass(slots=True)
+class FakeIterMsg:
+    id: int
+
+
+@dataclass(slots=True, frozen=True)
+class FakeButton:
+    data: bytes
+    text: str = ""
+
+
+@dataclass(slots=True, frozen=True)
+class FakeRow:
+    buttons: tuple
+
+
+@dataclass(slots=True, frozen=True)
+class FakeMarkup:
+    rows: tuple
+
+
+class FakeRedPacketEvent:
+    sender_id = 9001
+    chat_id = -10001
+    id = 99
+
+    def __init__(self, raw_text, reply_markup):
+        self.raw_text = raw_text
+        self.text = raw_text
+        self.reply_markup = reply_markup
+        self.clicked = []
+
+    async def click(self, *args):
+        self.clicked.append(args)
+
+
+_RED_PACKET_MARKUP = FakeMarkup(rows=(FakeRow(buttons=(FakeButton(b"red-packet"),)),))
+_GAME_START_MARKUP = FakeMarkup(rows=(FakeRow(buttons=(FakeButton(b"game-start", "开始游戏"),)),))
+# format_dashboard 只读历史，使用元组可顺带暴露意外的原地修改。
+_DASHBOARD_HISTORY = (1, 0) * 20
+_XX_SAMPLE = {
+    111: (FakeIterMsg(1), FakeIterMsg(2), FakeIterMsg(3)),
+    222: (FakeIterMsg(10),),
+}
+
 
 def _write_json(path: Path, data):
     path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+    if orjson is not None:
+        path.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+    else:
+        path.write_bytes(json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8"))
+
+
+def make_fake_send_to_admin(sink, chat_id):
+    async def _fake_send_to_admin(client, message, user_ctx, global_cfg):
+        sink.append(message)
+        return FakeSent(chat_id, len(sink))
+
+    return _fake_send_to_admin
+
+
+async def noop_sleep(*args, **kwargs):
+    return None
+
+
+def suppress_create_task(coro):
+    coro.close()
+    return None
+
+
+def patch_zm(mp, **names):
+    for name, value in names.items():
+        mp.setattr(zm, name, value)
+
+
+def patch_zm_asyncio(mp, **names):
+    for name, value in names.items():
+        mp.setattr(zm.asyncio, name, value)
+
+
+def _assert_any_contains(messages, *needles):
+    blob = "\n".join(messages)
+    missing = [needle for needle in needles if needle not in blob]
+    assert not missing, f"missing: {missing}\nsent:\n{blob}"
+
+
+def _first_indices(messages, *keys):
+    idx = {}
+    for i, msg in enumerate(messages):
+        for key in keys:
+            if key not in idx and key in msg:
+                idx[key] = i
+    missing = [key for key in keys if key not in idx]
+    assert not missing, f"missing: {missing}"
+    return idx
+
+
+_BASE_USER_CONFIG = {
+    "notification": {"iyuu": {"enable": False}, "tg_bot": {"enable": False}},
+}
+
+
+@pytest.fixture(scope="session")
+def user_template(tmp_path_factory):
+    # 会话级账号模板：公共配置与 presets.json 只生成一次，各用例按目录克隆。
+    root = tmp_path_factory.mktemp("user_template")
+    _write_json(root / "config.json", _BASE_USER_CONFIG)
+    UserContext(str(root))
+    return root
+
+
+@pytest.fixture
+def users_root(tmp_path):
+    # 每个用例独立的账号根目录，隔离不依赖 user_id 在模块内唯一。
+    return tmp_path / "users"
+
+
+@pytest.fixture
+def make_user_dir(users_root, user_template):
+    def _make(user_id, name, groups=None):
+        user_dir = users_root / str(user_id)
+        shutil.copytree(user_template, user_dir)
+        _write_json(
+            user_dir / "config.json",
+            {
+                "account": {"name": name},
+                "telegram": {"user_id": user_id},
+                "groups": groups or {"admin_chat": user_id},
+                **_BASE_USER_CONFIG,
+            },
+        )
+        return user_dir
+
+    return _make
+
+
+@pytest.fixture
+def make_ctx(make_user_dir):
+    def _make(user_id, name, groups=None):
+        return UserContext(str(make_user_dir(user_id, name, groups=groups)))
+
+    return _make
+
+
+@pytest.fixture(scope="session")
+def session_loop():
+    # 会话级事件循环：避免每个用例 asyncio.run 反复创建/销毁循环与默认线程池。
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.run_until_complete(zm.close_delete_scheduler())
+    loop.close()
+
+
+@pytest.fixture
+def run_async(session_loop):
+    return session_loop.run_until_complete
 
 
 def test_user_context_user_id_fallback_numeric_dir(tmp_path):
@@ -66,6 +236,39 @@ def test_user_manager_get_iflow_config_compatible_with_ai_key(tmp_path):
     assert "base_url" in cfg
 
 
+def test_user_manager_reuses_parsed_global_config_until_file_changes(tmp_path):
+    users_dir = tmp_path / "users"
+    config_dir = tmp_path / "config"
+    users_dir.mkdir(parents=True, exist_ok=True)
+    _write_json(config_dir / "global_config.json", {"groups": {"zq_bot": 8}})
+
+    mgr = UserManager(users_dir=str(users_dir), config_dir=str(config_dir))
+    mgr.load_all_users()
+    mgr.global_config["groups"]["zq_bot"] = 999
+    mgr.load_all_users()
+    assert mgr.global_config["groups"]["zq_bot"] == 8
+
+    _write_json(config_dir / "global_config.json", {"groups": {"zq_bot": 8, "monitor": [101]}})
+    mgr.load_all_users()
+    assert mgr.global_config["groups"]["monitor"] == [101]
+
+
+def test_user_manager_user_table_is_copy_on_write(tmp_path):
+    users_dir = tmp_path / "users"
+    config_dir = tmp_path / "config"
+    users_dir.mkdir(parents=True, exist_ok=True)
+
+    mgr = UserManager(users_dir=str(users_dir), config_dir=str(config_dir))
+    snapshot = mgr.get_all_users()
+    ctx = mgr.create_user(6101, {"account": {"name": "写时复制用户"}, "telegram": {"user_id": 6101}})
+
+    assert 6101 not in snapshot
+    assert mgr.get_user(6101) is ctx
+
+    assert mgr.delete_user(6101) is True
+    assert mgr.get_user(6101) is None
+
+
 def test_user_context_merges_global_common_and_user_private_config(tmp_path):
     users_dir = tmp_path / "users"
     config_dir = tmp_path / "config"
@@ -308,6 +511,32 @@ def test_user_context_supports_hash_comments_in_config(tmp_path):
     assert ctx.config.name == "注释用户"
 
 
+def test_encode_json_uses_same_indent_with_and_without_orjson(monkeypatch):
+    data = {"history": [1, 0], "name": "用户"}
+    with_env = user_manager.encode_json(data)
+    monkeypatch.setattr(user_manager, "HAS_ORJSON", False)
+    fallback = user_manager.encode_json(data)
+    assert b'\n  "history"' in fallback
+    assert with_env == fallback
+
+
+def test_load_json_with_comments_keeps_markers_inside_strings(tmp_path):
+    path = tmp_path / "commented.json"
+    path.write_text(
+        """{
+    // 整行注释
+    "url": "https://iyuu.cn/#anchor", # 行尾注释
+    "quote": "a \\"#\\" b" // 转义引号后的标记仍在字符串内
+}
+""",
+        encoding="utf-8",
+    )
+    assert load_json_with_comments(str(path)) == {
+        "url": "https://iyuu.cn/#anchor",
+        "quote": 'a "#" b',
+    }
+
+
 def test_zq_log_event_includes_account_prefix_and_business_category(tmp_path, monkeypatch):
     user_dir = tmp_path / "users" / "log_user"
     _write_json(
@@ -408,6 +637,36 @@ def test_user_context_refreshes_builtin_presets_but_keeps_custom(tmp_path):
     assert saved_presets["my_custom"] == ["1", "6", "2.2", "2.1", "2.0", "2.0", "800"]
 
 
+def test_user_state_append_history_trims_in_place():
+    state = UserState()
+    history = state.history
+    for i in range(HISTORY_KEEP + 3):
+        state.append_history(i)
+
+    assert state.history is history
+    assert len(history) == HISTORY_KEEP
+    assert history[0] == 3
+    assert history[-1] == HISTORY_KEEP + 2
+
+
+def test_user_context_skips_presets_rewrite_when_up_to_date(tmp_path, monkeypatch):
+    user_dir = tmp_path / "users" / "preset_fresh"
+    _write_json(
+        user_dir / "config.json",
+        {
+            "account": {"name": "预设未变"},
+            "telegram": {"user_id": 6124},
+        },
+    )
+    _write_json(user_dir / "presets.json", {**constants.PRESETS, "my_custom": ["1", "6", "2.2", "2.1", "2.0", "2.0", "800"]})
+
+    saves = []
+    monkeypatch.setattr(UserContext, "save_presets", lambda self: saves.append(self.user_id))
+    ctx = UserContext(str(user_dir))
+    assert ctx.presets["my_custom"] == ["1", "6", "2.2", "2.1", "2.0", "2.0", "800"]
+    assert saves == []
+
+
 def test_main_multiuser_settle_regex_is_strict():
     source = Path("main_multiuser.py").read_text(encoding="utf-8")
     assert 'pattern=r"已结算: 结果为 (\\d+) (大|小)"' in source
@@ -463,6 +722,36 @@ def test_main_log_event_includes_account_prefix(monkeypatch):
     assert captured["extra"]["category"] in {"runtime", "business"}
 
 
+def test_release_notifier_falls_back_to_polling_when_webhook_fails(monkeypatch):
+    intervals = []
+    fallback_started = asyncio.Event()
+
+    async def fake_loop(notify_callback, repo_root=None, interval_seconds=None):
+        intervals.append(interval_seconds)
+        if interval_seconds is None:
+            fallback_started.set()
+        await asyncio.Event().wait()
+
+    async def failing_webhook(*args, **kwargs):
+        await asyncio.sleep(0)
+        raise OSError("address already in use")
+
+    monkeypatch.setattr(mm, "periodic_release_check_loop", fake_loop)
+    monkeypatch.setattr(mm, "release_webhook_server", failing_webhook)
+    monkeypatch.setattr(mm, "log_event", lambda *args, **kwargs: None)
+
+    async def scenario():
+        cfg = {"enabled": True, "secret": "s", "host": "127.0.0.1", "port": 8787, "path": "/hook"}
+        task = asyncio.create_task(mm.run_release_notifier(lambda message: None, cfg))
+        await asyncio.wait_for(fallback_started.wait(), timeout=1)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(scenario())
+    # 先起长间隔兜底轮询，webhook 失败后改为常规间隔轮询
+    assert intervals == [mm.RELEASE_WEBHOOK_BACKSTOP_INTERVAL, None]
+
+
 def test_user_isolation_between_two_contexts(tmp_path):
     users_dir = tmp_path / "users"
     config_dir = tmp_path / "config"
@@ -511,24 +800,74 @@ def test_user_state_save_concurrent_no_corruption(tmp_path):
     assert "runtime" in loaded
     assert isinstance(loaded["runtime"], dict)
     assert "counter" in loaded["runtime"]
+    assert list(user_dir.glob("*.tmp")) == []
 
 
-def test_send_message_returns_admin_message_object(tmp_path):
-    user_dir = tmp_path / "users" / "3001"
-    _write_json(
-        user_dir / "config.json",
-        {
-            "account": {"name": "消息用户"},
-            "telegram": {"user_id": 3001},
-            "groups": {"admin_chat": 3001},
-            "notification": {"iyuu": {"enable": False}, "tg_bot": {"enable": False}},
-        },
-    )
-    ctx = UserContext(str(user_dir))
+def test_user_state_save_skips_unchanged_state(make_ctx, monkeypatch):
+    ctx = make_ctx(2002, "跳过写盘")
+    ctx.save_state()
+
+    writes = []
+    monkeypatch.setattr(user_manager, "write_bytes_atomic", lambda path, data: writes.append(path))
+    ctx.save_state()
+    assert writes == []
+
+    ctx.set_runtime("counter", 1)
+    ctx.save_state()
+    assert len(writes) == 1
+
+
+def test_delete_later_batches_due_messages_per_chat():
+    deleted_calls = []
+
+    class DummyClient:
+        async def delete_messages(self, chat_id, message_ids):
+            deleted_calls.append((chat_id, list(message_ids)))
+
+    async def _run():
+        client = DummyClient()
+        for chat_id, msg_id in ((111, 1), (111, 2), (222, 3), (111, 4)):
+            await zm.delete_later(client, chat_id, msg_id, 0)
+        await zm.delete_later(client, 111, 5, 60)
+        await asyncio.sleep(0.05)
+
+    asyncio.run(_run())
+    assert deleted_calls == [(111, [1, 2, 4]), (222, [3])]
+
+
+def test_delete_scheduler_deletes_chats_concurrently_and_closes():
+    started = []
+    release = None
+
+    class SlowClient:
+        async def delete_messages(self, chat_id, message_ids):
+            started.append(chat_id)
+            await release.wait()
+
+    async def _run():
+        nonlocal release
+        release = asyncio.Event()
+        client = SlowClient()
+        for chat_id in (111, 222, 333):
+            zm.schedule_delete(client, chat_id, 1, 0)
+        await asyncio.sleep(0.05)
+        # 前一个会话的删除尚未返回，其余会话已同时发起
+        assert sorted(started) == [111, 222, 333]
+        release.set()
+
+        scheduler = zm._get_delete_scheduler()
+        await zm.close_delete_scheduler()
+        assert scheduler.task.cancelled()
+
+    asyncio.run(_run())
+
+
+def test_send_message_returns_admin_message_object(make_ctx):
+    ctx = make_ctx(3001, "消息用户")
 
     class DummyClient:
         async def send_message(self, target, message, parse_mode=None):
-            return SimpleNamespace(chat_id=target, id=88)
+            return FakeSent(target, 88)
 
     message = asyncio.run(
         zm.send_message(
@@ -543,26 +882,20 @@ def test_send_message_returns_admin_message_object(tmp_path):
     assert message.id == 88
 
 
-def test_process_bet_on_parses_history_and_places_bet(tmp_path, monkeypatch):
-    user_dir = tmp_path / "users" / "4001"
-    _write_json(
-        user_dir / "config.json",
+def test_process_bet_on_parses_history_and_places_bet(make_ctx, monkeypatch):
+    ctx = make_ctx(4001, "下注用户")
+    rt = ctx.state.runtime
+    rt.update(
         {
-            "account": {"name": "下注用户"},
-            "telegram": {"user_id": 4001},
-            "groups": {"admin_chat": 4001},
-            "notification": {"iyuu": {"enable": False}, "tg_bot": {"enable": False}},
-        },
+            "switch": True,
+            "bet_on": True,
+            "mode_stop": True,
+            "stop_count": 0,
+            "bet_amount": 500,
+            "lose_count": 0,
+            "win_count": 0,
+        }
     )
-    ctx = UserContext(str(user_dir))
-    rt = ctx.state.runtime
-    rt["switch"] = True
-    rt["bet_on"] = True
-    rt["mode_stop"] = True
-    rt["stop_count"] = 0
-    rt["bet_amount"] = 500
-    rt["lose_count"] = 0
-    rt["win_count"] = 0
 
     async def fake_predict(user_ctx, global_cfg):
         user_ctx.state.runtime["last_predict_info"] = "test"
@@ -570,23 +903,15 @@ def test_process_bet_on_parses_history_and_places_bet(tmp_path, monkeypatch):
         return 1
 
     async def fake_send_to_admin(client, message, user_ctx, global_cfg):
-        return SimpleNamespace(chat_id=1, id=1)
-
-    async def fake_delete_later(*args, **kwargs):
-        return None
-
-    async def fake_sleep(*args, **kwargs):
-        return None
-
-    def fake_create_task(coro):
-        coro.close()
-        return None
+        return FakeSent(1, 1)
 
-    monkeypatch.setattr(zm, "predict_next_bet_v10", fake_predict)
-    monkeypatch.setattr(zm, "send_to_admin", fake_send_to_admin)
-    monkeypatch.setattr(zm, "delete_later", fake_delete_later)
-    monkeypatch.setattr(zm.asyncio, "sleep", fake_sleep)
-    monkeypatch.setattr(zm.asyncio, "create_task", fake_create_task)
+    patch_zm(
+        monkeypatch,
+        predict_next_bet_v10=fake_predict,
+        send_to_admin=fake_send_to_admin,
+        schedule_delete=lambda *args, **kwargs: None,
+    )
+    patch_zm_asyncio(monkeypatch, sleep=noop_sleep, create_task=suppress_create_task)
 
     class DummyEvent:
         def __init__(self):
@@ -609,27 +934,21 @@ def test_process_bet_on_parses_history_and_places_bet(tmp_path, monkeypatch):
     assert rt.get("current_bet_seq", 1) >= 2
 
 
-def test_process_bet_on_allows_short_history_like_master(tmp_path, monkeypatch):
-    user_dir = tmp_path / "users" / "4002"
-    _write_json(
-        user_dir / "config.json",
+def test_process_bet_on_allows_short_history_like_master(make_ctx, monkeypatch):
+    ctx = make_ctx(4002, "短历史用户")
+    rt = ctx.state.runtime
+    rt.update(
         {
-            "account": {"name": "短历史用户"},
-            "telegram": {"user_id": 4002},
-            "groups": {"admin_chat": 4002},
-            "notification": {"iyuu": {"enable": False}, "tg_bot": {"enable": False}},
-        },
+            "switch": True,
+            "bet_on": True,
+            "mode_stop": True,
+            "stop_count": 0,
+            "initial_amount": 500,
+            "bet_amount": 500,
+            "lose_count": 0,
+            "win_count": 0,
+        }
     )
-    ctx = UserContext(str(user_dir))
-    rt = ctx.state.runtime
-    rt["switch"] = True
-    rt["bet_on"] = True
-    rt["mode_stop"] = True
-    rt["stop_count"] = 0
-    rt["initial_amount"] = 500
-    rt["bet_amount"] = 500
-    rt["lose_count"] = 0
-    rt["win_count"] = 0
 
     async def fake_predict(user_ctx, global_cfg):
         user_ctx.state.runtime["last_predict_info"] = "test-short-history"
@@ -637,23 +956,15 @@ def test_process_bet_on_allows_short_history_like_master(tmp_path, monkeypatch):
         return 1
 
     async def fake_send_to_admin(client, message, user_ctx, global_cfg):
-        return SimpleNamespace(chat_id=1, id=1)
-
-    async def fake_delete_later(*args, **kwargs):
-        return None
-
-    async def fake_sleep(*args, **kwargs):
-        return None
+        return FakeSent(1, 1)
 
-    def fake_create_task(coro):
-        coro.close()
-        return None
-
-    monkeypatch.setattr(zm, "predict_next_bet_v10", fake_predict)
-    monkeypatch.setattr(zm, "send_to_admin", fake_send_to_admin)
-    monkeypatch.setattr(zm, "delete_later", fake_delete_later)
-    monkeypatch.setattr(zm.asyncio, "sleep", fake_sleep)
-    monkeypatch.setattr(zm.asyncio, "create_task", fake_create_task)
+    patch_zm(
+        monkeypatch,
+        predict_next_bet_v10=fake_predict,
+        send_to_admin=fake_send_to_admin,
+        schedule_delete=lambda *args, **kwargs: None,
+    )
+    patch_zm_asyncio(monkeypatch, sleep=noop_sleep, create_task=suppress_create_task)
 
     class DummyEvent:
         def __init__(self):
@@ -674,27 +985,21 @@ def test_process_bet_on_allows_short_history_like_master(tmp_path, monkeypatch):
     assert len(ctx.state.bet_sequence_log) == 1
 
 
-def test_process_bet_on_recovers_when_source_message_id_invalid(tmp_path, monkeypatch):
-    user_dir = tmp_path / "users" / "4003"
-    _write_json(
-        user_dir / "config.json",
+def test_process_bet_on_recovers_when_source_message_id_invalid(make_ctx, monkeypatch):
+    ctx = make_ctx(4003, "回溯点击用户", groups={"admin_chat": 4003, "zq_bot": 9001})
+    rt = ctx.state.runtime
+    rt.update(
         {
-            "account": {"name": "回溯点击用户"},
-            "telegram": {"user_id": 4003},
-            "groups": {"admin_chat": 4003, "zq_bot": 9001},
-            "notification": {"iyuu": {"enable": False}, "tg_bot": {"enable": False}},
-        },
+            "switch": True,
+            "bet_on": True,
+            "mode_stop": True,
+            "stop_count": 0,
+            "initial_amount": 500,
+            "bet_amount": 500,
+            "lose_count": 0,
+            "win_count": 0,
+        }
     )
-    ctx = UserContext(str(user_dir))
-    rt = ctx.state.runtime
-    rt["switch"] = True
-    rt["bet_on"] = True
-    rt["mode_stop"] = True
-    rt["stop_count"] = 0
-    rt["initial_amount"] = 500
-    rt["bet_amount"] = 500
-    rt["lose_count"] = 0
-    rt["win_count"] = 0
 
     sent_messages = []
 
@@ -703,25 +1008,15 @@ def test_process_bet_on_recovers_when_source_message_id_invalid(tmp_path, monkey
         user_ctx.state.predictions.append(1)
         return 1
 
-    async def fake_send_to_admin(client, message, user_ctx, global_cfg):
-        sent_messages.append(message)
-        return SimpleNamespace(chat_id=1, id=len(sent_messages))
-
-    async def fake_delete_later(*args, **kwargs):
-        return None
-
-    async def fake_sleep(*args, **kwargs):
-        return None
-
-    def fake_create_task(coro):
-        coro.close()
-        return None
+    fake_send_to_admin = make_fake_send_to_admin(sent_messages, 1)
 
-    monkeypatch.setattr(zm, "predict_next_bet_v10", fake_predict)
-    monkeypatch.setattr(zm, "send_to_admin", fake_send_to_admin)
-    monkeypatch.setattr(zm, "delete_later", fake_delete_later)
-    monkeypatch.setattr(zm.asyncio, "sleep", fake_sleep)
-    monkeypatch.setattr(zm.asyncio, "create_task", fake_create_task)
+    patch_zm(
+        monkeypatch,
+        predict_next_bet_v10=fake_predict,
+        send_to_admin=fake_send_to_admin,
+        schedule_delete=lambda *args, **kwargs: None,
+    )
+    patch_zm_asyncio(monkeypatch, sleep=noop_sleep, create_task=suppress_create_task)
 
     class DummyEvent:
         def __init__(self):
@@ -768,27 +1063,21 @@ def test_process_bet_on_recovers_when_source_message_id_invalid(tmp_path, monkey
     assert all("押注出错" not in msg for msg in sent_messages)
 
 
-def test_process_bet_on_prediction_timeout_pauses_and_skips_bet(tmp_path, monkeypatch):
-    user_dir = tmp_path / "users" / "4004"
-    _write_json(
-        user_dir / "config.json",
+def test_process_bet_on_prediction_timeout_pauses_and_skips_bet(make_ctx, monkeypatch):
+    ctx = make_ctx(4004, "超时回退用户")
+    rt = ctx.state.runtime
+    rt.update(
         {
-            "account": {"name": "超时回退用户"},
-            "telegram": {"user_id": 4004},
-            "groups": {"admin_chat": 4004},
-            "notification": {"iyuu": {"enable": False}, "tg_bot": {"enable": False}},
-        },
+            "switch": True,
+            "bet_on": True,
+            "mode_stop": True,
+            "stop_count": 0,
+            "initial_amount": 500,
+            "bet_amount": 500,
+            "lose_count": 0,
+            "win_count": 0,
+        }
     )
-    ctx = UserContext(str(user_dir))
-    rt = ctx.state.runtime
-    rt["switch"] = True
-    rt["bet_on"] = True
-    rt["mode_stop"] = True
-    rt["stop_count"] = 0
-    rt["initial_amount"] = 500
-    rt["bet_amount"] = 500
-    rt["lose_count"] = 0
-    rt["win_count"] = 0
     ctx.state.history = [0, 1] * 20
 
     async def fake_predict(user_ctx, global_cfg):
@@ -798,23 +1087,15 @@ def test_process_bet_on_prediction_timeout_pauses_and_skips_bet(tmp_path, monkey
 
     async def fake_send_to_admin(client, message, user_ctx, global_cfg):
         sent_messages.append(message)
-        return SimpleNamespace(chat_id=1, id=1)
+        return FakeSent(1, 1)
 
-    async def fake_delete_later(*args, **kwargs):
-        return None
-
-    async def fake_sleep(*args, **kwargs):
-        return None
-
-    def fake_create_task(coro):
-        coro.close()
-        return None
-
-    monkeypatch.setattr(zm, "predict_next_bet_v10", fake_predict)
-    monkeypatch.setattr(zm, "send_to_admin", fake_send_to_admin)
-    monkeypatch.setattr(zm, "delete_later", fake_delete_later)
-    monkeypatch.setattr(zm.asyncio, "sleep", fake_sleep)
-    monkeypatch.setattr(zm.asyncio, "create_task", fake_create_task)
+    patch_zm(
+        monkeypatch,
+        predict_next_bet_v10=fake_predict,
+        send_to_admin=fake_send_to_admin,
+        schedule_delete=lambda *args, **kwargs: None,
+    )
+    patch_zm_asyncio(monkeypatch, sleep=noop_sleep, create_task=suppress_create_task)
 
     class DummyEvent:
         def __init__(self):
@@ -835,30 +1116,24 @@ def test_process_bet_on_prediction_timeout_pauses_and_skips_bet(tmp_path, monkey
     assert "预测超时 - 本局不下注" in rt.get("last_predict_info", "")
     assert len(ctx.state.bet_sequence_log) == 0
     assert rt.get("stop_count") == 2
-    assert any("模型可用性门控（超时）" in m for m in sent_messages)
+    _assert_any_contains(sent_messages, "模型可用性门控（超时）")
 
 
-def test_process_bet_on_prediction_timeout_gate_dedup_same_snapshot(tmp_path, monkeypatch):
-    user_dir = tmp_path / "users" / "4005"
-    _write_json(
-        user_dir / "config.json",
+def test_process_bet_on_prediction_timeout_gate_dedup_same_snapshot(make_ctx, monkeypatch):
+    ctx = make_ctx(4005, "超时去重用户")
+    rt = ctx.state.runtime
+    rt.update(
         {
-            "account": {"name": "超时去重用户"},
-            "telegram": {"user_id": 4005},
-            "groups": {"admin_chat": 4005},
-            "notification": {"iyuu": {"enable": False}, "tg_bot": {"enable": False}},
-        },
+            "switch": True,
+            "bet_on": True,
+            "mode_stop": True,
+            "stop_count": 0,
+            "initial_amount": 500,
+            "bet_amount": 500,
+            "lose_count": 0,
+            "win_count": 0,
+        }
     )
-    ctx = UserContext(str(user_dir))
-    rt = ctx.state.runtime
-    rt["switch"] = True
-    rt["bet_on"] = True
-    rt["mode_stop"] = True
-    rt["stop_count"] = 0
-    rt["initial_amount"] = 500
-    rt["bet_amount"] = 500
-    rt["lose_count"] = 0
-    rt["win_count"] = 0
     ctx.state.history = [0, 1] * 20
 
     async def fake_predict(user_ctx, global_cfg):
@@ -866,16 +1141,10 @@ def test_process_bet_on_prediction_timeout_gate_dedup_same_snapshot(tmp_path, mo
 
     sent_messages = []
 
-    async def fake_send_to_admin(client, message, user_ctx, global_cfg):
-        sent_messages.append(message)
-        return SimpleNamespace(chat_id=1, id=len(sent_messages))
-
-    async def fake_sleep(*args, **kwargs):
-        return None
+    fake_send_to_admin = make_fake_send_to_admin(sent_messages, 1)
 
-    monkeypatch.setattr(zm, "predict_next_bet_v10", fake_predict)
-    monkeypatch.setattr(zm, "send_to_admin", fake_send_to_admin)
-    monkeypatch.setattr(zm.asyncio, "sleep", fake_sleep)
+    patch_zm(monkeypatch, predict_next_bet_v10=fake_predict, send_to_admin=fake_send_to_admin)
+    monkeypatch.setattr(zm.asyncio, "sleep", noop_sleep)
 
     class DummyEvent:
         def __init__(self):
@@ -892,43 +1161,41 @@ def test_process_bet_on_prediction_timeout_gate_dedup_same_snapshot(tmp_path, mo
     event = DummyEvent()
     asyncio.run(zm.process_bet_on(SimpleNamespace(), event, ctx, {"betting": {"predict_timeout_sec": 2}}))
     # 模拟倒计时走完但仍无新结算快照（同一连押阶段）。
-    rt["stop_count"] = 0
-    rt["bet_on"] = True
-    rt["mode_stop"] = True
+    rt.update(
+        {
+            "stop_count": 0,
+            "bet_on": True,
+            "mode_stop": True,
+        }
+    )
     asyncio.run(zm.process_bet_on(SimpleNamespace(), event, ctx, {"betting": {"predict_timeout_sec": 2}}))
 
     timeout_msgs = [m for m in sent_messages if "触发类型：模型可用性门控（超时）" in m]
     assert len(timeout_msgs) == 1
 
 
-def test_process_bet_on_forces_unlock_after_repeated_skip_same_sequence(tmp_path, monkeypatch):
-    user_dir = tmp_path / "users" / "4016"
-    _write_json(
-        user_dir / "config.json",
+def test_process_bet_on_forces_unlock_after_repeated_skip_same_sequence(make_ctx, monkeypatch):
+    ctx = make_ctx(4016, "防卡死用户")
+    rt = ctx.state.runtime
+    rt.update(
         {
-            "account": {"name": "防卡死用户"},
-            "telegram": {"user_id": 4016},
-            "groups": {"admin_chat": 4016},
-            "notification": {"iyuu": {"enable": False}, "tg_bot": {"enable": False}},
-        },
+            "switch": True,
+            "bet_on": True,
+            "mode_stop": True,
+            "stop_count": 0,
+            "initial_amount": 500,
+            "bet_amount": 500,
+            "lose_count": 4,
+            "bet_sequence_count": 4,  # 下一手=5
+            "win_count": 0,
+            "stall_guard_sequence": 5,
+            "stall_guard_no_bet_streak": 2,
+            "stall_guard_skip_streak": 2,
+            "stall_guard_timeout_streak": 0,
+            "stall_guard_gate_streak": 0,
+            "stall_guard_last_history_len": 39,
+        }
     )
-    ctx = UserContext(str(user_dir))
-    rt = ctx.state.runtime
-    rt["switch"] = True
-    rt["bet_on"] = True
-    rt["mode_stop"] = True
-    rt["stop_count"] = 0
-    rt["initial_amount"] = 500
-    rt["bet_amount"] = 500
-    rt["lose_count"] = 4
-    rt["bet_sequence_count"] = 4  # 下一手=5
-    rt["win_count"] = 0
-    rt["stall_guard_sequence"] = 5
-    rt["stall_guard_no_bet_streak"] = 2
-    rt["stall_guard_skip_streak"] = 2
-    rt["stall_guard_timeout_streak"] = 0
-    rt["stall_guard_gate_streak"] = 0
-    rt["stall_guard_last_history_len"] = 39
     ctx.state.history = [0, 1] * 20
 
     async def fake_predict(user_ctx, global_cfg):
@@ -940,21 +1207,10 @@ def test_process_bet_on_forces_unlock_after_repeated_skip_same_sequence(tmp_path
 
     sent_messages = []
 
-    async def fake_send_to_admin(client, message, user_ctx, global_cfg):
-        sent_messages.append(message)
-        return SimpleNamespace(chat_id=1, id=len(sent_messages))
-
-    async def fake_sleep(*args, **kwargs):
-        return None
-
-    def fake_create_task(coro):
-        coro.close()
-        return None
+    fake_send_to_admin = make_fake_send_to_admin(sent_messages, 1)
 
-    monkeypatch.setattr(zm, "predict_next_bet_v10", fake_predict)
-    monkeypatch.setattr(zm, "send_to_admin", fake_send_to_admin)
-    monkeypatch.setattr(zm.asyncio, "sleep", fake_sleep)
-    monkeypatch.setattr(zm.asyncio, "create_task", fake_create_task)
+    patch_zm(monkeypatch, predict_next_bet_v10=fake_predict, send_to_admin=fake_send_to_admin)
+    patch_zm_asyncio(monkeypatch, sleep=noop_sleep, create_task=suppress_create_task)
 
     class DummyEvent:
         def __init__(self):
@@ -974,30 +1230,24 @@ def test_process_bet_on_forces_unlock_after_repeated_skip_same_sequence(tmp_path
     assert event.clicks
     assert len(ctx.state.bet_sequence_log) == 1
     assert rt.get("stall_guard_force_unlock_total", 0) >= 1
-    assert any("防卡死解锁已触发" in m for m in sent_messages)
+    _assert_any_contains(sent_messages, "防卡死解锁已触发")
 
 
-def test_process_bet_on_step3_quality_gate_blocks_low_confidence(tmp_path, monkeypatch):
-    user_dir = tmp_path / "users" / "4013"
-    _write_json(
-        user_dir / "config.json",
+def test_process_bet_on_step3_quality_gate_blocks_low_confidence(make_ctx, monkeypatch):
+    ctx = make_ctx(4013, "三手门控用户")
+    rt = ctx.state.runtime
+    rt.update(
         {
-            "account": {"name": "三手门控用户"},
-            "telegram": {"user_id": 4013},
-            "groups": {"admin_chat": 4013},
-            "notification": {"iyuu": {"enable": False}, "tg_bot": {"enable": False}},
-        },
+            "switch": True,
+            "bet_on": True,
+            "mode_stop": True,
+            "stop_count": 0,
+            "bet_sequence_count": 2,  # 下一手=3
+            "bet_amount": 5_000,
+            "lose_count": 2,
+            "win_count": 0,
+        }
     )
-    ctx = UserContext(str(user_dir))
-    rt = ctx.state.runtime
-    rt["switch"] = True
-    rt["bet_on"] = True
-    rt["mode_stop"] = True
-    rt["stop_count"] = 0
-    rt["bet_sequence_count"] = 2  # 下一手=3
-    rt["bet_amount"] = 5_000
-    rt["lose_count"] = 2
-    rt["win_count"] = 0
     ctx.state.history = [0, 1] * 25
 
     async def fake_predict(user_ctx, global_cfg):
@@ -1009,16 +1259,10 @@ def test_process_bet_on_step3_quality_gate_blocks_low_confidence(tmp_path, monke
 
     sent_messages = []
 
-    async def fake_send_to_admin(client, message, user_ctx, global_cfg):
-        sent_messages.append(message)
-        return SimpleNamespace(chat_id=1, id=len(sent_messages))
-
-    async def fake_sleep(*args, **kwargs):
-        return None
+    fake_send_to_admin = make_fake_send_to_admin(sent_messages, 1)
 
-    monkeypatch.setattr(zm, "predict_next_bet_v10", fake_predict)
-    monkeypatch.setattr(zm, "send_to_admin", fake_send_to_admin)
-    monkeypatch.setattr(zm.asyncio, "sleep", fake_sleep)
+    patch_zm(monkeypatch, predict_next_bet_v10=fake_predict, send_to_admin=fake_send_to_admin)
+    monkeypatch.setattr(zm.asyncio, "sleep", noop_sleep)
 
     class DummyEvent:
         def __init__(self):
@@ -1038,31 +1282,25 @@ def test_process_bet_on_step3_quality_gate_blocks_low_confidence(tmp_path, monke
     assert not event.clicks
     assert len(ctx.state.bet_sequence_log) == 0
     assert rt.get("stop_count") == 3  # 暂停2局，内部计数=2+1
-    assert any("第3手质量门控" in m for m in sent_messages)
+    _assert_any_contains(sent_messages, "第3手质量门控")
 
 
-def test_process_bet_on_step3_quality_gate_skipped_when_deep_risk_off(tmp_path, monkeypatch):
-    user_dir = tmp_path / "users" / "5033"
-    _write_json(
-        user_dir / "config.json",
+def test_process_bet_on_step3_quality_gate_skipped_when_deep_risk_off(make_ctx, monkeypatch):
+    ctx = make_ctx(5033, "三手门控关闭用户")
+    rt = ctx.state.runtime
+    rt.update(
         {
-            "account": {"name": "三手门控关闭用户"},
-            "telegram": {"user_id": 5033},
-            "groups": {"admin_chat": 5033},
-            "notification": {"iyuu": {"enable": False}, "tg_bot": {"enable": False}},
-        },
+            "switch": True,
+            "bet_on": True,
+            "mode_stop": True,
+            "stop_count": 0,
+            "bet_sequence_count": 2,  # 下一手=3
+            "bet_amount": 5_000,
+            "lose_count": 2,
+            "win_count": 0,
+            "risk_deep_enabled": False,
+        }
     )
-    ctx = UserContext(str(user_dir))
-    rt = ctx.state.runtime
-    rt["switch"] = True
-    rt["bet_on"] = True
-    rt["mode_stop"] = True
-    rt["stop_count"] = 0
-    rt["bet_sequence_count"] = 2  # 下一手=3
-    rt["bet_amount"] = 5_000
-    rt["lose_count"] = 2
-    rt["win_count"] = 0
-    rt["risk_deep_enabled"] = False
     ctx.state.history = [0, 1] * 25
     sent_messages = []
 
@@ -1073,16 +1311,10 @@ def test_process_bet_on_step3_quality_gate_skipped_when_deep_risk_off(tmp_path,
         user_ctx.state.runtime["last_predict_info"] = "M-SMP/DRAGON_CANDIDATE | 信:65%"
         return 1
 
-    async def fake_send_to_admin(client, message, user_ctx, global_cfg):
-        sent_messages.append(message)
-        return SimpleNamespace(chat_id=1, id=len(sent_messages))
-
-    async def fake_sleep(*args, **kwargs):
-        return None
+    fake_send_to_admin = make_fake_send_to_admin(sent_messages, 1)
 
-    monkeypatch.setattr(zm, "predict_next_bet_v10", fake_predict)
-    monkeypatch.setattr(zm, "send_to_admin", fake_send_to_admin)
-    monkeypatch.setattr(zm.asyncio, "sleep", fake_sleep)
+    patch_zm(monkeypatch, predict_next_bet_v10=fake_predict, send_to_admin=fake_send_to_admin)
+    monkeypatch.setattr(zm.asyncio, "sleep", noop_sleep)
 
     class DummyEvent:
         def __init__(self):
@@ -1105,27 +1337,21 @@ def test_process_bet_on_step3_quality_gate_skipped_when_deep_risk_off(tmp_path,
     assert not any("第3手质量门控" in m for m in sent_messages)
 
 
-def test_process_bet_on_step4_quality_gate_blocks_non_whitelisted_tag(tmp_path, monkeypatch):
-    user_dir = tmp_path / "users" / "4014"
-    _write_json(
-        user_dir / "config.json",
+def test_process_bet_on_step4_quality_gate_blocks_non_whitelisted_tag(make_ctx, monkeypatch):
+    ctx = make_ctx(4014, "四手门控用户")
+    rt = ctx.state.runtime
+    rt.update(
         {
-            "account": {"name": "四手门控用户"},
-            "telegram": {"user_id": 4014},
-            "groups": {"admin_chat": 4014},
-            "notification": {"iyuu": {"enable": False}, "tg_bot": {"enable": False}},
-        },
+            "switch": True,
+            "bet_on": True,
+            "mode_stop": True,
+            "stop_count": 0,
+            "bet_sequence_count": 3,  # 下一手=4
+            "bet_amount": 14_000,
+            "lose_count": 3,
+            "win_count": 0,
+        }
     )
-    ctx = UserContext(str(user_dir))
-    rt = ctx.state.runtime
-    rt["switch"] = True
-    rt["bet_on"] = True
-    rt["mode_stop"] = True
-    rt["stop_count"] = 0
-    rt["bet_sequence_count"] = 3  # 下一手=4
-    rt["bet_amount"] = 14_000
-    rt["lose_count"] = 3
-    rt["win_count"] = 0
     ctx.state.history = [0, 1] * 25
     ctx.state.bet_sequence_log = [{"result": "赢"} for _ in range(40)]
 
@@ -1138,16 +1364,10 @@ def test_process_bet_on_step4_quality_gate_blocks_non_whitelisted_tag(tmp_path,
 
     sent_messages = []
 
-    async def fake_send_to_admin(client, message, user_ctx, global_cfg):
-        sent_messages.append(message)
-        return SimpleNamespace(chat_id=1, id=len(sent_messages))
-
-    async def fake_sleep(*args, **kwargs):
-        return None
+    fake_send_to_admin = make_fake_send_to_admin(sent_messages, 1)
 
-    monkeypatch.setattr(zm, "predict_next_bet_v10", fake_predict)
-    monkeypatch.setattr(zm, "send_to_admin", fake_send_to_admin)
-    monkeypatch.setattr(zm.asyncio, "sleep", fake_sleep)
+    patch_zm(monkeypatch, predict_next_bet_v10=fake_predict, send_to_admin=fake_send_to_admin)
+    monkeypatch.setattr(zm.asyncio, "sleep", noop_sleep)
 
     class DummyEvent:
         def __init__(self):
@@ -1167,47 +1387,35 @@ def test_process_bet_on_step4_quality_gate_blocks_non_whitelisted_tag(tmp_path,
     assert not event.clicks
     assert len(ctx.state.bet_sequence_log) == 40
     assert rt.get("stop_count") == 4  # 暂停3局，内部计数=3+1
-    assert any("第4手强风控门控" in m for m in sent_messages)
+    _assert_any_contains(sent_messages, "第4手强风控门控")
 
 
-def test_process_bet_on_timeout_gate_skipped_when_deep_risk_off(tmp_path, monkeypatch):
-    user_dir = tmp_path / "users" / "5034"
-    _write_json(
-        user_dir / "config.json",
+def test_process_bet_on_timeout_gate_skipped_when_deep_risk_off(make_ctx, monkeypatch):
+    ctx = make_ctx(5034, "超时门控关闭用户")
+    rt = ctx.state.runtime
+    rt.update(
         {
-            "account": {"name": "超时门控关闭用户"},
-            "telegram": {"user_id": 5034},
-            "groups": {"admin_chat": 5034},
-            "notification": {"iyuu": {"enable": False}, "tg_bot": {"enable": False}},
-        },
+            "switch": True,
+            "bet_on": True,
+            "mode_stop": True,
+            "stop_count": 0,
+            "initial_amount": 500,
+            "bet_amount": 500,
+            "lose_count": 0,
+            "win_count": 0,
+            "risk_deep_enabled": False,
+        }
     )
-    ctx = UserContext(str(user_dir))
-    rt = ctx.state.runtime
-    rt["switch"] = True
-    rt["bet_on"] = True
-    rt["mode_stop"] = True
-    rt["stop_count"] = 0
-    rt["initial_amount"] = 500
-    rt["bet_amount"] = 500
-    rt["lose_count"] = 0
-    rt["win_count"] = 0
-    rt["risk_deep_enabled"] = False
     ctx.state.history = [0, 1] * 20
     sent_messages = []
 
     async def fake_predict(user_ctx, global_cfg):
         raise asyncio.TimeoutError("predict timeout")
 
-    async def fake_send_to_admin(client, message, user_ctx, global_cfg):
-        sent_messages.append(message)
-        return SimpleNamespace(chat_id=1, id=len(sent_messages))
-
-    async def fake_sleep(*args, **kwargs):
-        return None
+    fake_send_to_admin = make_fake_send_to_admin(sent_messages, 1)
 
-    monkeypatch.setattr(zm, "predict_next_bet_v10", fake_predict)
-    monkeypatch.setattr(zm, "send_to_admin", fake_send_to_admin)
-    monkeypatch.setattr(zm.asyncio, "sleep", fake_sleep)
+    patch_zm(monkeypatch, predict_next_bet_v10=fake_predict, send_to_admin=fake_send_to_admin)
+    monkeypatch.setattr(zm.asyncio, "sleep", noop_sleep)
 
     class DummyEvent:
         def __init__(self):
@@ -1259,6 +1467,36 @@ def test_user_context_migrates_legacy_state_when_history_empty(tmp_path, monkeyp
     assert len(ctx.state.history) >= 40
 
 
+def test_aio_session_shared_per_loop_and_closed_on_shutdown(monkeypatch):
+    monkeypatch.setattr(user_manager, "_AIO_SESSION", None)
+    monkeypatch.setattr(user_manager, "_AIO_SESSION_LOOP", None)
+
+    async def reuse():
+        session = user_manager.get_aio_session()
+        assert session is user_manager.get_aio_session()
+        assert session.trust_env is True
+        return session
+
+    async def reuse_then_shutdown():
+        session = await reuse()
+        await user_manager.close_aio_session()
+        return session
+
+    loop = asyncio.new_event_loop()
+    try:
+        first = loop.run_until_complete(reuse())
+        # 换到新事件循环后重建会话，旧会话交回原循环关闭
+        second = asyncio.run(reuse_then_shutdown())
+        loop.run_until_complete(asyncio.sleep(0))
+        assert first.closed
+    finally:
+        loop.close()
+
+    assert second is not first
+    assert second.closed
+    assert user_manager._AIO_SESSION is None
+
+
 def test_send_message_v2_routes_and_account_prefix(tmp_path, monkeypatch):
     user_dir = tmp_path / "users" / "5001"
     _write_json(
@@ -1277,11 +1515,11 @@ def test_send_message_v2_routes_and_account_prefix(tmp_path, monkeypatch):
 
     requests_payloads = []
 
-    def fake_post(url, data=None, json=None, timeout=5):
+    async def fake_post(url, data=None, json=None, timeout=5):
         requests_payloads.append({"url": url, "data": data, "json": json})
         return SimpleNamespace(status_code=200)
 
-    monkeypatch.setattr(zm.requests, "post", fake_post)
+    monkeypatch.setattr(zm, "_post", fake_post)
 
     class DummyClient:
         def __init__(self):
@@ -1289,7 +1527,7 @@ def test_send_message_v2_routes_and_account_prefix(tmp_path, monkeypatch):
 
         async def send_message(self, target, message, parse_mode=None):
             self.messages.append((target, message))
-            return SimpleNamespace(chat_id=target, id=7)
+            return FakeSent(target, 7)
 
     client = DummyClient()
     asyncio.run(
@@ -1330,11 +1568,11 @@ def test_send_message_v2_lose_end_priority_keeps_account_prefix(tmp_path, monkey
 
     requests_payloads = []
 
-    def fake_post(url, data=None, json=None, timeout=5):
+    async def fake_post(url, data=None, json=None, timeout=5):
         requests_payloads.append({"url": url, "data": data, "json": json})
         return SimpleNamespace(status_code=200)
 
-    monkeypatch.setattr(zm.requests, "post", fake_post)
+    monkeypatch.setattr(zm, "_post", fake_post)
 
     class DummyClient:
         def __init__(self):
@@ -1342,7 +1580,7 @@ def test_send_message_v2_lose_end_priority_keeps_account_prefix(tmp_path, monkey
 
         async def send_message(self, target, message, parse_mode=None):
             self.messages.append((target, message))
-            return SimpleNamespace(chat_id=target, id=8)
+            return FakeSent(target, 8)
 
     client = DummyClient()
     asyncio.run(
@@ -1388,18 +1626,8 @@ def test_build_yc_result_message_uses_codeblock_table():
     assert msg.count("```") == 2
 
 
-def test_process_settle_no_longer_auto_sends_ydx(tmp_path, monkeypatch):
-    user_dir = tmp_path / "users" / "5002"
-    _write_json(
-        user_dir / "config.json",
-        {
-            "account": {"name": "结算用户"},
-            "telegram": {"user_id": 5002},
-            "groups": {"admin_chat": 5002, "monitor": [101, 102]},
-            "notification": {"iyuu": {"enable": False}, "tg_bot": {"enable": False}},
-        },
-    )
-    ctx = UserContext(str(user_dir))
+def test_process_settle_no_longer_auto_sends_ydx(make_ctx, monkeypatch):
+    ctx = make_ctx(5002, "结算用户", groups={"admin_chat": 5002, "monitor": [101, 102]})
     ctx.state.runtime["open_ydx"] = True
     ctx.state.runtime["bet"] = False
 
@@ -1407,10 +1635,9 @@ def test_process_settle_no_longer_auto_sends_ydx(tmp_path, monkeypatch):
         return 123456
 
     async def fake_send_to_admin(client, message, user_ctx, global_cfg):
-        return SimpleNamespace(chat_id=5002, id=99)
+        return FakeSent(5002, 99)
 
-    monkeypatch.setattr(zm, "fetch_balance", fake_fetch_balance)
-    monkeypatch.setattr(zm, "send_to_admin", fake_send_to_admin)
+    patch_zm(monkeypatch, fetch_balance=fake_fetch_balance, send_to_admin=fake_send_to_admin)
 
     class DummyClient:
         def __init__(self):
@@ -1418,7 +1645,7 @@ def test_process_settle_no_longer_auto_sends_ydx(tmp_path, monkeypatch):
 
         async def send_message(self, target, message, parse_mode=None):
             self.sent.append((target, message))
-            return SimpleNamespace(chat_id=target, id=1)
+            return FakeSent(target, 1)
 
         async def delete_messages(self, chat_id, message_id):
             return None
@@ -1432,32 +1659,26 @@ def test_process_settle_no_longer_auto_sends_ydx(tmp_path, monkeypatch):
     assert ctx.state.history[-1] == 0
 
 
-def test_check_bet_status_can_resume_when_fund_sufficient(tmp_path, monkeypatch):
-    user_dir = tmp_path / "users" / "5003"
-    _write_json(
-        user_dir / "config.json",
+def test_check_bet_status_can_resume_when_fund_sufficient(make_ctx, monkeypatch):
+    ctx = make_ctx(5003, "恢复用户")
+    rt = ctx.state.runtime
+    rt.update(
         {
-            "account": {"name": "恢复用户"},
-            "telegram": {"user_id": 5003},
-            "groups": {"admin_chat": 5003},
-            "notification": {"iyuu": {"enable": False}, "tg_bot": {"enable": False}},
-        },
+            "switch": True,
+            "stop_count": 0,
+            "bet": False,
+            "gambling_fund": 2_000_000,
+            "bet_amount": 0,
+            "lose_count": 0,
+            "win_count": 0,
+        }
     )
-    ctx = UserContext(str(user_dir))
-    rt = ctx.state.runtime
-    rt["switch"] = True
-    rt["stop_count"] = 0
-    rt["bet"] = False
-    rt["gambling_fund"] = 2_000_000
-    rt["bet_amount"] = 0
-    rt["lose_count"] = 0
-    rt["win_count"] = 0
 
     sent = {}
 
     async def fake_send_to_admin(client, message, user_ctx, global_cfg):
         sent["message"] = message
-        return SimpleNamespace(chat_id=5003, id=1)
+        return FakeSent(5003, 1)
 
     monkeypatch.setattr(zm, "send_to_admin", fake_send_to_admin)
     asyncio.run(zm.check_bet_status(SimpleNamespace(), ctx, {}))
@@ -1468,35 +1689,26 @@ def test_check_bet_status_can_resume_when_fund_sufficient(tmp_path, monkeypatch)
     assert "恢复可下注状态" in sent["message"]
 
 
-def test_pause_command_sets_manual_pause_and_blocks_bet_on(tmp_path, monkeypatch):
-    user_dir = tmp_path / "users" / "5005"
-    _write_json(
-        user_dir / "config.json",
+def test_pause_command_sets_manual_pause_and_blocks_bet_on(make_ctx, monkeypatch):
+    ctx = make_ctx(5005, "暂停用户")
+    rt = ctx.state.runtime
+    rt.update(
         {
-            "account": {"name": "暂停用户"},
-            "telegram": {"user_id": 5005},
-            "groups": {"admin_chat": 5005},
-            "notification": {"iyuu": {"enable": False}, "tg_bot": {"enable": False}},
-        },
+            "switch": True,
+            "bet": True,
+            "bet_on": True,
+            "mode_stop": True,
+        }
     )
-    ctx = UserContext(str(user_dir))
-    rt = ctx.state.runtime
-    rt["switch"] = True
-    rt["bet"] = True
-    rt["bet_on"] = True
-    rt["mode_stop"] = True
 
     async def fake_send_to_admin(client, message, user_ctx, global_cfg):
-        return SimpleNamespace(chat_id=5005, id=1)
-
-    async def fake_sleep(*args, **kwargs):
-        return None
+        return FakeSent(5005, 1)
 
     async def fail_predict(*args, **kwargs):
         raise AssertionError("predict should not run while manual pause is active")
 
     monkeypatch.setattr(zm, "send_to_admin", fake_send_to_admin)
-    monkeypatch.setattr(zm.asyncio, "sleep", fake_sleep)
+    monkeypatch.setattr(zm.asyncio, "sleep", noop_sleep)
     monkeypatch.setattr(zm, "predict_next_bet_v10", fail_predict)
 
     cmd_event = SimpleNamespace(raw_text="pause", chat_id=5005, id=10)
@@ -1517,31 +1729,15 @@ def test_pause_command_sets_manual_pause_and_blocks_bet_on(tmp_path, monkeypatch
     asyncio.run(zm.process_bet_on(SimpleNamespace(), DummyEvent(), ctx, {}))
 
 
-def test_risk_command_can_toggle_base_and_deep_switches(tmp_path, monkeypatch):
-    user_dir = tmp_path / "users" / "5030"
-    _write_json(
-        user_dir / "config.json",
-        {
-            "account": {"name": "风控开关用户"},
-            "telegram": {"user_id": 5030},
-            "groups": {"admin_chat": 5030},
-            "notification": {"iyuu": {"enable": False}, "tg_bot": {"enable": False}},
-        },
-    )
-    ctx = UserContext(str(user_dir))
+def test_risk_command_can_toggle_base_and_deep_switches(make_ctx, monkeypatch):
+    ctx = make_ctx(5030, "风控开关用户")
     rt = ctx.state.runtime
     sent_messages = []
 
-    async def fake_send_to_admin(client, message, user_ctx, global_cfg):
-        sent_messages.append(message)
-        return SimpleNamespace(chat_id=5030, id=len(sent_messages))
-
-    def fake_create_task(coro):
-        coro.close()
-        return None
+    fake_send_to_admin = make_fake_send_to_admin(sent_messages, 5030)
 
     monkeypatch.setattr(zm, "send_to_admin", fake_send_to_admin)
-    monkeypatch.setattr(zm.asyncio, "create_task", fake_create_task)
+    monkeypatch.setattr(zm.asyncio, "create_task", suppress_create_task)
 
     asyncio.run(zm.process_user_command(SimpleNamespace(), SimpleNamespace(raw_text="risk deep off", chat_id=5030, id=1), ctx, {}))
     assert rt["risk_deep_enabled"] is False
@@ -1557,7 +1753,7 @@ def test_risk_command_can_toggle_base_and_deep_switches(tmp_path, monkeypatch):
     assert rt["risk_deep_enabled"] is True
     assert rt["risk_base_default_enabled"] is True
     assert rt["risk_deep_default_enabled"] is True
-    assert any("当前风控开关" in msg for msg in sent_messages)
+    _assert_any_contains(sent_messages, "当前风控开关")
 
 
 def test_apply_account_risk_default_mode_resets_current_switches():
@@ -1588,11 +1784,15 @@ def test_build_startup_focus_reminder_contains_risk_and_preset_guidance(tmp_path
     )
     ctx = UserContext(str(user_dir))
     rt = ctx.state.runtime
-    rt["current_preset_name"] = "yc05"
-    rt["risk_base_enabled"] = True
-    rt["risk_deep_enabled"] = False
-    rt["risk_base_default_enabled"] = True
-    rt["risk_deep_default_enabled"] = False
+    rt.update(
+        {
+            "current_preset_name": "yc05",
+            "risk_base_enabled": True,
+            "risk_deep_enabled": False,
+            "risk_base_default_enabled": True,
+            "risk_deep_default_enabled": False,
+        }
+    )
 
     msg = zm.build_startup_focus_reminder(ctx)
 
@@ -1602,33 +1802,27 @@ def test_build_startup_focus_reminder_contains_risk_and_preset_guidance(tmp_path
     assert "help" in msg
 
 
-def test_check_bet_status_does_not_resume_when_manual_pause(tmp_path, monkeypatch):
-    user_dir = tmp_path / "users" / "5006"
-    _write_json(
-        user_dir / "config.json",
+def test_check_bet_status_does_not_resume_when_manual_pause(make_ctx, monkeypatch):
+    ctx = make_ctx(5006, "手动暂停用户")
+    rt = ctx.state.runtime
+    rt.update(
         {
-            "account": {"name": "手动暂停用户"},
-            "telegram": {"user_id": 5006},
-            "groups": {"admin_chat": 5006},
-            "notification": {"iyuu": {"enable": False}, "tg_bot": {"enable": False}},
-        },
+            "switch": True,
+            "manual_pause": True,
+            "stop_count": 0,
+            "bet": False,
+            "gambling_fund": 2_000_000,
+            "bet_amount": 0,
+            "lose_count": 0,
+            "win_count": 0,
+        }
     )
-    ctx = UserContext(str(user_dir))
-    rt = ctx.state.runtime
-    rt["switch"] = True
-    rt["manual_pause"] = True
-    rt["stop_count"] = 0
-    rt["bet"] = False
-    rt["gambling_fund"] = 2_000_000
-    rt["bet_amount"] = 0
-    rt["lose_count"] = 0
-    rt["win_count"] = 0
 
     sent = {"called": False}
 
     async def fake_send_to_admin(client, message, user_ctx, global_cfg):
         sent["called"] = True
-        return SimpleNamespace(chat_id=5006, id=1)
+        return FakeSent(5006, 1)
 
     monkeypatch.setattr(zm, "send_to_admin", fake_send_to_admin)
     asyncio.run(zm.check_bet_status(SimpleNamespace(), ctx, {}))
@@ -1637,29 +1831,23 @@ def test_check_bet_status_does_not_resume_when_manual_pause(tmp_path, monkeypatc
     assert sent["called"] is False
 
 
-def test_process_settle_lose_warning_matches_master_style(tmp_path, monkeypatch):
-    user_dir = tmp_path / "users" / "5004"
-    _write_json(
-        user_dir / "config.json",
+def test_process_settle_lose_warning_matches_master_style(make_ctx, monkeypatch):
+    ctx = make_ctx(5004, "告警用户")
+    rt = ctx.state.runtime
+    rt.update(
         {
-            "account": {"name": "告警用户"},
-            "telegram": {"user_id": 5004},
-            "groups": {"admin_chat": 5004},
-            "notification": {"iyuu": {"enable": False}, "tg_bot": {"enable": False}},
-        },
+            "bet": True,
+            "bet_type": 0,  # 押小
+            "bet_amount": 500,
+            "warning_lose_count": 1,
+            "bet_sequence_count": 1,
+            "account_balance": 10_000_000,
+            "gambling_fund": 9_000_000,
+            "current_round": 1,
+            "current_bet_seq": 2,
+            "current_preset_name": "yc10",
+        }
     )
-    ctx = UserContext(str(user_dir))
-    rt = ctx.state.runtime
-    rt["bet"] = True
-    rt["bet_type"] = 0  # 押小
-    rt["bet_amount"] = 500
-    rt["warning_lose_count"] = 1
-    rt["bet_sequence_count"] = 1
-    rt["account_balance"] = 10_000_000
-    rt["gambling_fund"] = 9_000_000
-    rt["current_round"] = 1
-    rt["current_bet_seq"] = 2
-    rt["current_preset_name"] = "yc10"
     ctx.state.bet_sequence_log = [{"bet_id": "20260223_1_1", "profit": None}]
 
     captured = {}
@@ -1670,18 +1858,21 @@ def test_process_settle_lose_warning_matches_master_style(tmp_path, monkeypatch)
         return None
 
     async def fake_send_to_admin(client, message, user_ctx, global_cfg):
-        return SimpleNamespace(chat_id=5004, id=12)
+        return FakeSent(5004, 12)
 
     async def fake_fetch_balance(user_ctx):
         return rt["account_balance"]
 
-    monkeypatch.setattr(zm, "send_message_v2", fake_send_message_v2)
-    monkeypatch.setattr(zm, "send_to_admin", fake_send_to_admin)
-    monkeypatch.setattr(zm, "fetch_balance", fake_fetch_balance)
+    patch_zm(
+        monkeypatch,
+        send_message_v2=fake_send_message_v2,
+        send_to_admin=fake_send_to_admin,
+        fetch_balance=fake_fetch_balance,
+    )
 
     class DummyClient:
         async def send_message(self, target, message, parse_mode=None):
-            return SimpleNamespace(chat_id=target, id=1)
+            return FakeSent(target, 1)
 
         async def delete_messages(self, chat_id, message_id):
             return None
@@ -1697,31 +1888,25 @@ def test_process_settle_lose_warning_matches_master_style(tmp_path, monkeypatch)
     assert "🤖 当局 AI 预测提示" not in captured["message"]
 
 
-def test_process_settle_lose_end_message_contains_balance_lines(tmp_path, monkeypatch):
-    user_dir = tmp_path / "users" / "5007"
-    _write_json(
-        user_dir / "config.json",
+def test_process_settle_lose_end_message_contains_balance_lines(make_ctx, monkeypatch):
+    ctx = make_ctx(5007, "回补用户")
+    rt = ctx.state.runtime
+    rt.update(
         {
-            "account": {"name": "回补用户"},
-            "telegram": {"user_id": 5007},
-            "groups": {"admin_chat": 5007},
-            "notification": {"iyuu": {"enable": False}, "tg_bot": {"enable": False}},
-        },
+            "bet": True,
+            "bet_type": 1,  # 押大，下面开大 -> 赢
+            "bet_amount": 1000,
+            "warning_lose_count": 1,
+            "lose_count": 3,
+            "lose_notify_pending": True,
+            "lose_start_info": {"round": 1, "seq": 5, "fund": 24_566_390},
+            "current_round": 1,
+            "current_bet_seq": 10,
+            "current_preset_name": "yc10",
+            "account_balance": 24_634_900,
+            "gambling_fund": 24_567_390,
+        }
     )
-    ctx = UserContext(str(user_dir))
-    rt = ctx.state.runtime
-    rt["bet"] = True
-    rt["bet_type"] = 1  # 押大，下面开大 -> 赢
-    rt["bet_amount"] = 1000
-    rt["warning_lose_count"] = 1
-    rt["lose_count"] = 3
-    rt["lose_notify_pending"] = True
-    rt["lose_start_info"] = {"round": 1, "seq": 5, "fund": 24_566_390}
-    rt["current_round"] = 1
-    rt["current_bet_seq"] = 10
-    rt["current_preset_name"] = "yc10"
-    rt["account_balance"] = 24_634_900
-    rt["gambling_fund"] = 24_567_390
     ctx.state.bet_sequence_log = [{"bet_id": "20260224_1_9", "profit": None}]
 
     captured = {}
@@ -1732,18 +1917,21 @@ def test_process_settle_lose_end_message_contains_balance_lines(tmp_path, monkey
         return None
 
     async def fake_send_to_admin(client, message, user_ctx, global_cfg):
-        return SimpleNamespace(chat_id=5007, id=1)
+        return FakeSent(5007, 1)
 
     async def fake_fetch_balance(user_ctx):
         return rt["account_balance"]
 
-    monkeypatch.setattr(zm, "send_message_v2", fake_send_message_v2)
-    monkeypatch.setattr(zm, "send_to_admin", fake_send_to_admin)
-    monkeypatch.setattr(zm, "fetch_balance", fake_fetch_balance)
+    patch_zm(
+        monkeypatch,
+        send_message_v2=fake_send_message_v2,
+        send_to_admin=fake_send_to_admin,
+        fetch_balance=fake_fetch_balance,
+    )
 
     class DummyClient:
         async def send_message(self, target, message, parse_mode=None):
-            return SimpleNamespace(chat_id=target, id=1)
+            return FakeSent(target, 1)
 
         async def delete_messages(self, chat_id, message_id):
             return None
@@ -1762,31 +1950,25 @@ def test_process_settle_lose_end_message_contains_balance_lines(tmp_path, monkey
     assert "💰 菠菜资金剩余：2456.84 万" in msg
 
 
-def test_process_settle_skips_stale_lose_end_when_old_lose_count_zero(tmp_path, monkeypatch):
-    user_dir = tmp_path / "users" / "5022"
-    _write_json(
-        user_dir / "config.json",
+def test_process_settle_skips_stale_lose_end_when_old_lose_count_zero(make_ctx, monkeypatch):
+    ctx = make_ctx(5022, "连输脏状态用户")
+    rt = ctx.state.runtime
+    rt.update(
         {
-            "account": {"name": "连输脏状态用户"},
-            "telegram": {"user_id": 5022},
-            "groups": {"admin_chat": 5022},
-            "notification": {"iyuu": {"enable": False}, "tg_bot": {"enable": False}},
-        },
+            "bet": True,
+            "bet_type": 1,  # 押大，下面开大 -> 赢
+            "bet_amount": 1000,
+            "warning_lose_count": 3,
+            "lose_count": 0,
+            "lose_notify_pending": True,
+            "lose_start_info": {"round": 2, "seq": 56, "fund": 9_999_999},
+            "current_round": 1,
+            "current_bet_seq": 1,
+            "current_preset_name": "yc05",
+            "account_balance": 315_300,
+            "gambling_fund": 314_800,
+        }
     )
-    ctx = UserContext(str(user_dir))
-    rt = ctx.state.runtime
-    rt["bet"] = True
-    rt["bet_type"] = 1  # 押大，下面开大 -> 赢
-    rt["bet_amount"] = 1000
-    rt["warning_lose_count"] = 3
-    rt["lose_count"] = 0
-    rt["lose_notify_pending"] = True
-    rt["lose_start_info"] = {"round": 2, "seq": 56, "fund": 9_999_999}
-    rt["current_round"] = 1
-    rt["current_bet_seq"] = 1
-    rt["current_preset_name"] = "yc05"
-    rt["account_balance"] = 315_300
-    rt["gambling_fund"] = 314_800
     ctx.state.bet_sequence_log = [{"bet_id": "20260228_1_1", "profit": None}]
 
     sent_types = []
@@ -1797,20 +1979,21 @@ def test_process_settle_skips_stale_lose_end_when_old_lose_count_zero(tmp_path,
         sent_msgs.append(message)
         return None
 
-    async def fake_send_to_admin(client, message, user_ctx, global_cfg):
-        sent_msgs.append(message)
-        return SimpleNamespace(chat_id=5022, id=len(sent_msgs))
+    fake_send_to_admin = make_fake_send_to_admin(sent_msgs, 5022)
 
     async def fake_fetch_balance(user_ctx):
         return rt["account_balance"]
 
-    monkeypatch.setattr(zm, "send_message_v2", fake_send_message_v2)
-    monkeypatch.setattr(zm, "send_to_admin", fake_send_to_admin)
-    monkeypatch.setattr(zm, "fetch_balance", fake_fetch_balance)
+    patch_zm(
+        monkeypatch,
+        send_message_v2=fake_send_message_v2,
+        send_to_admin=fake_send_to_admin,
+        fetch_balance=fake_fetch_balance,
+    )
 
     class DummyClient:
         async def send_message(self, target, message, parse_mode=None):
-            return SimpleNamespace(chat_id=target, id=1)
+            return FakeSent(target, 1)
 
         async def delete_messages(self, chat_id, message_id):
             return None
@@ -1824,31 +2007,25 @@ def test_process_settle_skips_stale_lose_end_when_old_lose_count_zero(tmp_path,
     assert rt["lose_start_info"] == {}
 
 
-def test_process_settle_skips_lose_end_when_range_is_invalid(tmp_path, monkeypatch):
-    user_dir = tmp_path / "users" / "5023"
-    _write_json(
-        user_dir / "config.json",
+def test_process_settle_skips_lose_end_when_range_is_invalid(make_ctx, monkeypatch):
+    ctx = make_ctx(5023, "连输区间异常用户")
+    rt = ctx.state.runtime
+    rt.update(
         {
-            "account": {"name": "连输区间异常用户"},
-            "telegram": {"user_id": 5023},
-            "groups": {"admin_chat": 5023},
-            "notification": {"iyuu": {"enable": False}, "tg_bot": {"enable": False}},
-        },
+            "bet": True,
+            "bet_type": 1,  # 押大，下面开大 -> 赢
+            "bet_amount": 1000,
+            "warning_lose_count": 3,
+            "lose_count": 3,
+            "lose_notify_pending": True,
+            "lose_start_info": {"round": 2, "seq": 56, "fund": 9_999_999},
+            "current_round": 1,
+            "current_bet_seq": 1,
+            "current_preset_name": "yc05",
+            "account_balance": 315_300,
+            "gambling_fund": 314_800,
+        }
     )
-    ctx = UserContext(str(user_dir))
-    rt = ctx.state.runtime
-    rt["bet"] = True
-    rt["bet_type"] = 1  # 押大，下面开大 -> 赢
-    rt["bet_amount"] = 1000
-    rt["warning_lose_count"] = 3
-    rt["lose_count"] = 3
-    rt["lose_notify_pending"] = True
-    rt["lose_start_info"] = {"round": 2, "seq": 56, "fund": 9_999_999}
-    rt["current_round"] = 1
-    rt["current_bet_seq"] = 1
-    rt["current_preset_name"] = "yc05"
-    rt["account_balance"] = 315_300
-    rt["gambling_fund"] = 314_800
     ctx.state.bet_sequence_log = [{"bet_id": "20260228_1_1", "profit": None}]
 
     sent_types = []
@@ -1859,20 +2036,21 @@ def test_process_settle_skips_lose_end_when_range_is_invalid(tmp_path, monkeypat
         sent_msgs.append(message)
         return None
 
-    async def fake_send_to_admin(client, message, user_ctx, global_cfg):
-        sent_msgs.append(message)
-        return SimpleNamespace(chat_id=5023, id=len(sent_msgs))
+    fake_send_to_admin = make_fake_send_to_admin(sent_msgs, 5023)
 
     async def fake_fetch_balance(user_ctx):
         return rt["account_balance"]
 
-    monkeypatch.setattr(zm, "send_message_v2", fake_send_message_v2)
-    monkeypatch.setattr(zm, "send_to_admin", fake_send_to_admin)
-    monkeypatch.setattr(zm, "fetch_balance", fake_fetch_balance)
+    patch_zm(
+        monkeypatch,
+        send_message_v2=fake_send_message_v2,
+        send_to_admin=fake_send_to_admin,
+        fetch_balance=fake_fetch_balance,
+    )
 
     class DummyClient:
         async def send_message(self, target, message, parse_mode=None):
-            return SimpleNamespace(chat_id=target, id=1)
+            return FakeSent(target, 1)
 
         async def delete_messages(self, chat_id, message_id):
             return None
@@ -1886,30 +2064,24 @@ def test_process_settle_skips_lose_end_when_range_is_invalid(tmp_path, monkeypat
     assert rt["lose_start_info"] == {}
 
 
-def test_process_settle_profit_pause_does_not_immediately_resume(tmp_path, monkeypatch):
-    user_dir = tmp_path / "users" / "5014"
-    _write_json(
-        user_dir / "config.json",
+def test_process_settle_profit_pause_does_not_immediately_resume(make_ctx, monkeypatch):
+    ctx = make_ctx(5014, "盈利暂停用户")
+    rt = ctx.state.runtime
+    rt.update(
         {
-            "account": {"name": "盈利暂停用户"},
-            "telegram": {"user_id": 5014},
-            "groups": {"admin_chat": 5014},
-            "notification": {"iyuu": {"enable": False}, "tg_bot": {"enable": False}},
-        },
+            "bet": True,
+            "bet_type": 1,  # 押大，下面开大 -> 赢
+            "bet_amount": 10_000,
+            "period_profit": 95_000,
+            "profit": 100_000,
+            "profit_stop": 2,
+            "flag": True,
+            "current_round": 1,
+            "current_bet_seq": 3,
+            "account_balance": 10_000_000,
+            "gambling_fund": 9_000_000,
+        }
     )
-    ctx = UserContext(str(user_dir))
-    rt = ctx.state.runtime
-    rt["bet"] = True
-    rt["bet_type"] = 1  # 押大，下面开大 -> 赢
-    rt["bet_amount"] = 10_000
-    rt["period_profit"] = 95_000
-    rt["profit"] = 100_000
-    rt["profit_stop"] = 2
-    rt["flag"] = True
-    rt["current_round"] = 1
-    rt["current_bet_seq"] = 3
-    rt["account_balance"] = 10_000_000
-    rt["gambling_fund"] = 9_000_000
     ctx.state.bet_sequence_log = [{"bet_id": "20260227_1_3", "profit": None}]
 
     sent_messages = []
@@ -1919,20 +2091,21 @@ def test_process_settle_profit_pause_does_not_immediately_resume(tmp_path, monke
         routed_messages.append((msg_type, message))
         return None
 
-    async def fake_send_to_admin(client, message, user_ctx, global_cfg):
-        sent_messages.append(message)
-        return SimpleNamespace(chat_id=5014, id=len(sent_messages))
+    fake_send_to_admin = make_fake_send_to_admin(sent_messages, 5014)
 
     async def fake_fetch_balance(user_ctx):
         return rt["account_balance"]
 
-    monkeypatch.setattr(zm, "send_message_v2", fake_send_message_v2)
-    monkeypatch.setattr(zm, "send_to_admin", fake_send_to_admin)
-    monkeypatch.setattr(zm, "fetch_balance", fake_fetch_balance)
+    patch_zm(
+        monkeypatch,
+        send_message_v2=fake_send_message_v2,
+        send_to_admin=fake_send_to_admin,
+        fetch_balance=fake_fetch_balance,
+    )
 
     class DummyClient:
         async def send_message(self, target, message, parse_mode=None):
-            return SimpleNamespace(chat_id=target, id=1)
+            return FakeSent(target, 1)
 
         async def delete_messages(self, chat_id, message_id):
             return None
@@ -1941,7 +2114,7 @@ def test_process_settle_profit_pause_does_not_immediately_resume(tmp_path, monke
     asyncio.run(zm.process_settle(DummyClient(), event, ctx, {}))
 
     assert any(msg_type == "goal_pause" and "原因：盈利达成" in m for msg_type, m in routed_messages)
-    assert any("暂停倒计时提醒" in m for m in sent_messages)
+    _assert_any_contains(sent_messages, "暂停倒计时提醒")
     assert not any(m.startswith("**恢复押注**") for m in sent_messages)
     assert rt["stop_count"] == 3  # profit_stop=2, 内部计数应为3
     assert rt["pause_countdown_active"] is True
@@ -1952,32 +2125,24 @@ def test_process_settle_profit_pause_does_not_immediately_resume(tmp_path, monke
     assert rt["bet_on"] is False
 
 
-def test_process_bet_on_pause_countdown_refreshes_while_paused(tmp_path, monkeypatch):
-    user_dir = tmp_path / "users" / "5017"
-    _write_json(
-        user_dir / "config.json",
+def test_process_bet_on_pause_countdown_refreshes_while_paused(make_ctx, monkeypatch):
+    ctx = make_ctx(5017, "倒计时用户")
+    rt = ctx.state.runtime
+    rt.update(
         {
-            "account": {"name": "倒计时用户"},
-            "telegram": {"user_id": 5017},
-            "groups": {"admin_chat": 5017},
-            "notification": {"iyuu": {"enable": False}, "tg_bot": {"enable": False}},
-        },
+            "switch": True,
+            "manual_pause": False,
+            "stop_count": 3,
+            "pause_countdown_active": True,
+            "pause_countdown_reason": "基础风控暂停",
+            "pause_countdown_total_rounds": 2,
+            "pause_countdown_last_remaining": -1,
+        }
     )
-    ctx = UserContext(str(user_dir))
-    rt = ctx.state.runtime
-    rt["switch"] = True
-    rt["manual_pause"] = False
-    rt["stop_count"] = 3
-    rt["pause_countdown_active"] = True
-    rt["pause_countdown_reason"] = "基础风控暂停"
-    rt["pause_countdown_total_rounds"] = 2
-    rt["pause_countdown_last_remaining"] = -1
 
     sent_messages = []
 
-    async def fake_send_to_admin(client, message, user_ctx, global_cfg):
-        sent_messages.append(message)
-        return SimpleNamespace(chat_id=5017, id=len(sent_messages))
+    fake_send_to_admin = make_fake_send_to_admin(sent_messages, 5017)
 
     monkeypatch.setattr(zm, "send_to_admin", fake_send_to_admin)
 
@@ -1985,31 +2150,24 @@ def test_process_bet_on_pause_countdown_refreshes_while_paused(tmp_path, monkeyp
     asyncio.run(zm.process_bet_on(SimpleNamespace(), event, ctx, {}))
 
     assert rt["stop_count"] == 2
-    assert any("暂停倒计时提醒" in m for m in sent_messages)
-    assert any("倒计时：1 局" in m for m in sent_messages)
+    _assert_any_contains(sent_messages, "暂停倒计时提醒", "倒计时：1 局")
     assert not any(m.startswith("**恢复押注**") for m in sent_messages)
 
 
-def test_process_bet_on_pause_countdown_clears_on_resume(tmp_path, monkeypatch):
-    user_dir = tmp_path / "users" / "5018"
-    _write_json(
-        user_dir / "config.json",
+def test_process_bet_on_pause_countdown_clears_on_resume(make_ctx, monkeypatch):
+    ctx = make_ctx(5018, "倒计时恢复用户")
+    rt = ctx.state.runtime
+    rt.update(
         {
-            "account": {"name": "倒计时恢复用户"},
-            "telegram": {"user_id": 5018},
-            "groups": {"admin_chat": 5018},
-            "notification": {"iyuu": {"enable": False}, "tg_bot": {"enable": False}},
-        },
+            "switch": True,
+            "manual_pause": False,
+            "stop_count": 1,
+            "pause_countdown_active": True,
+            "pause_countdown_reason": "盈利达成暂停",
+            "pause_countdown_total_rounds": 1,
+            "pause_countdown_last_remaining": 1,
+        }
     )
-    ctx = UserContext(str(user_dir))
-    rt = ctx.state.runtime
-    rt["switch"] = True
-    rt["manual_pause"] = False
-    rt["stop_count"] = 1
-    rt["pause_countdown_active"] = True
-    rt["pause_countdown_reason"] = "盈利达成暂停"
-    rt["pause_countdown_total_rounds"] = 1
-    rt["pause_countdown_last_remaining"] = 1
 
     class DummyMsg:
         chat_id = 5018
@@ -2021,9 +2179,7 @@ def test_process_bet_on_pause_countdown_clears_on_resume(tmp_path, monkeypatch):
     ctx.pause_countdown_message = DummyMsg()
     sent_messages = []
 
-    async def fake_send_to_admin(client, message, user_ctx, global_cfg):
-        sent_messages.append(message)
-        return SimpleNamespace(chat_id=5018, id=len(sent_messages))
+    fake_send_to_admin = make_fake_send_to_admin(sent_messages, 5018)
 
     async def fake_predict(user_ctx, global_cfg):
         user_ctx.state.runtime["last_predict_source"] = "model"
@@ -2031,8 +2187,7 @@ def test_process_bet_on_pause_countdown_clears_on_resume(tmp_path, monkeypatch):
         user_ctx.state.runtime["last_predict_confidence"] = 90
         return 1
 
-    monkeypatch.setattr(zm, "send_to_admin", fake_send_to_admin)
-    monkeypatch.setattr(zm, "predict_next_bet_v10", fake_predict)
+    patch_zm(monkeypatch, send_to_admin=fake_send_to_admin, predict_next_bet_v10=fake_predict)
 
     class DummyEvent:
         def __init__(self):
@@ -2050,31 +2205,25 @@ def test_process_bet_on_pause_countdown_clears_on_resume(tmp_path, monkeypatch):
     assert rt["stop_count"] == 0
     assert rt["pause_countdown_active"] is False
     assert ctx.pause_countdown_message is None
-    assert any("恢复押注（已执行）" in m for m in sent_messages)
+    _assert_any_contains(sent_messages, "恢复押注（已执行）")
 
 
-def test_process_bet_on_insufficient_fund_sends_pause_notice_even_without_pending_bet(tmp_path, monkeypatch):
-    user_dir = tmp_path / "users" / "5019"
-    _write_json(
-        user_dir / "config.json",
+def test_process_bet_on_insufficient_fund_sends_pause_notice_even_without_pending_bet(make_ctx, monkeypatch):
+    ctx = make_ctx(5019, "资金不足用户")
+    rt = ctx.state.runtime
+    rt.update(
         {
-            "account": {"name": "资金不足用户"},
-            "telegram": {"user_id": 5019},
-            "groups": {"admin_chat": 5019},
-            "notification": {"iyuu": {"enable": False}, "tg_bot": {"enable": False}},
-        },
+            "switch": True,
+            "manual_pause": False,
+            "stop_count": 0,
+            "bet": False,
+            "bet_on": True,
+            "mode_stop": True,
+            "initial_amount": 500,
+            "lose_count": 0,
+            "gambling_fund": 100,
+        }
     )
-    ctx = UserContext(str(user_dir))
-    rt = ctx.state.runtime
-    rt["switch"] = True
-    rt["manual_pause"] = False
-    rt["stop_count"] = 0
-    rt["bet"] = False
-    rt["bet_on"] = True
-    rt["mode_stop"] = True
-    rt["initial_amount"] = 500
-    rt["lose_count"] = 0
-    rt["gambling_fund"] = 100
 
     sent_messages = []
 
@@ -2088,77 +2237,63 @@ def test_process_bet_on_insufficient_fund_sends_pause_notice_even_without_pendin
     event = SimpleNamespace(reply_markup=object(), message=SimpleNamespace(message="unused"))
     asyncio.run(zm.process_bet_on(SimpleNamespace(), event, ctx, {}))
 
-    assert any("菠菜资金不足，已暂停押注" in m for m in sent_messages)
+    _assert_any_contains(sent_messages, "菠菜资金不足，已暂停押注")
     assert rt["fund_pause_notified"] is True
     assert rt["bet"] is False
     assert rt["bet_on"] is False
 
 
-def test_check_bet_status_does_not_resume_when_next_bet_amount_is_zero(tmp_path, monkeypatch):
-    user_dir = tmp_path / "users" / "5020"
-    _write_json(
-        user_dir / "config.json",
+def test_check_bet_status_does_not_resume_when_next_bet_amount_is_zero(make_ctx, monkeypatch):
+    ctx = make_ctx(5020, "上限暂停用户")
+    rt = ctx.state.runtime
+    rt.update(
         {
-            "account": {"name": "上限暂停用户"},
-            "telegram": {"user_id": 5020},
-            "groups": {"admin_chat": 5020},
-            "notification": {"iyuu": {"enable": False}, "tg_bot": {"enable": False}},
-        },
+            "switch": True,
+            "manual_pause": False,
+            "bet": False,
+            "bet_on": True,
+            "mode_stop": True,
+            "initial_amount": 10000,
+            "bet_amount": 10000,
+            "lose_stop": 3,
+            "lose_count": 3,  # 下一手将超过上限，calculate_bet_amount 返回0
+            "gambling_fund": 10_000_000,
+        }
     )
-    ctx = UserContext(str(user_dir))
-    rt = ctx.state.runtime
-    rt["switch"] = True
-    rt["manual_pause"] = False
-    rt["bet"] = False
-    rt["bet_on"] = True
-    rt["mode_stop"] = True
-    rt["initial_amount"] = 10000
-    rt["bet_amount"] = 10000
-    rt["lose_stop"] = 3
-    rt["lose_count"] = 3  # 下一手将超过上限，calculate_bet_amount 返回0
-    rt["gambling_fund"] = 10_000_000
 
     sent_messages = []
 
-    async def fake_send_to_admin(client, message, user_ctx, global_cfg):
-        sent_messages.append(message)
-        return SimpleNamespace(chat_id=5020, id=len(sent_messages))
+    fake_send_to_admin = make_fake_send_to_admin(sent_messages, 5020)
 
     monkeypatch.setattr(zm, "send_to_admin", fake_send_to_admin)
 
     asyncio.run(zm.check_bet_status(SimpleNamespace(), ctx, {}))
 
-    assert any("已达到预设连投上限" in m for m in sent_messages)
+    _assert_any_contains(sent_messages, "已达到预设连投上限")
     assert rt["limit_stop_notified"] is True
     assert rt["bet"] is False
     assert rt["bet_on"] is False
     assert not any("押注已恢复" in m for m in sent_messages)
 
 
-def test_process_settle_syncs_fund_from_balance_before_next_bet_check(tmp_path, monkeypatch):
-    user_dir = tmp_path / "users" / "5021"
-    _write_json(
-        user_dir / "config.json",
+def test_process_settle_syncs_fund_from_balance_before_next_bet_check(make_ctx, monkeypatch):
+    ctx = make_ctx(5021, "结算资金不足用户")
+    rt = ctx.state.runtime
+    rt.update(
         {
-            "account": {"name": "结算资金不足用户"},
-            "telegram": {"user_id": 5021},
-            "groups": {"admin_chat": 5021},
-            "notification": {"iyuu": {"enable": False}, "tg_bot": {"enable": False}},
-        },
+            "bet": True,
+            "bet_type": 0,  # 押小，下面开大 -> 输
+            "bet_amount": 730000,
+            "lose_count": 4,
+            "lose_stop": 9,
+            "lose_four": 2.05,
+            "current_round": 1,
+            "current_bet_seq": 9,
+            "account_balance": 2_200_000,
+            "gambling_fund": 1_417_800,
+            "fund_pause_notified": True,
+        }
     )
-    ctx = UserContext(str(user_dir))
-    rt = ctx.state.runtime
-    rt["bet"] = True
-    rt["bet_type"] = 0  # 押小，下面开大 -> 输
-    rt["bet_amount"] = 730000
-    rt["lose_count"] = 4
-    rt["lose_stop"] = 9
-    rt["lose_four"] = 2.05
-    rt["current_round"] = 1
-    rt["current_bet_seq"] = 9
-    rt["account_balance"] = 2_200_000
-    rt["gambling_fund"] = 1_417_800
-    rt["fund_pause_notified"] = True
     ctx.state.bet_sequence_log = [{"bet_id": "20260228_1_9", "profit": None}]
 
     sent_messages = []
@@ -2166,20 +2301,21 @@ def test_process_settle_syncs_fund_from_balance_before_next_bet_check(tmp_path,
     async def fake_send_message_v2(*args, **kwargs):
         return None
 
-    async def fake_send_to_admin(client, message, user_ctx, global_cfg):
-        sent_messages.append(message)
-        return SimpleNamespace(chat_id=5021, id=len(sent_messages))
+    fake_send_to_admin = make_fake_send_to_admin(sent_messages, 5021)
 
     async def fake_fetch_balance(user_ctx):
         return rt["account_balance"]
 
-    monkeypatch.setattr(zm, "send_message_v2", fake_send_message_v2)
-    monkeypatch.setattr(zm, "send_to_admin", fake_send_to_admin)
-    monkeypatch.setattr(zm, "fetch_balance", fake_fetch_balance)
+    patch_zm(
+        monkeypatch,
+        send_message_v2=fake_send_message_v2,
+        send_to_admin=fake_send_to_admin,
+        fetch_balance=fake_fetch_balance,
+    )
 
     class DummyClient:
         async def send_message(self, target, message, parse_mode=None):
-            return SimpleNamespace(chat_id=target, id=1)
+            return FakeSent(target, 1)
 
         async def delete_messages(self, chat_id, message_id):
             return None
@@ -2194,30 +2330,24 @@ def test_process_settle_syncs_fund_from_balance_before_next_bet_check(tmp_path,
     assert not any("菠菜资金不足，已暂停押注" in m for m in sent_messages)
 
 
-def test_process_settle_keeps_pending_bet_settlement_before_fund_pause(tmp_path, monkeypatch):
-    user_dir = tmp_path / "users" / "5022"
-    _write_json(
-        user_dir / "config.json",
+def test_process_settle_keeps_pending_bet_settlement_before_fund_pause(make_ctx, monkeypatch):
+    ctx = make_ctx(5024, "结算时序用户")
+    rt = ctx.state.runtime
+    rt.update(
         {
-            "account": {"name": "结算时序用户"},
-            "telegram": {"user_id": 5022},
-            "groups": {"admin_chat": 5022},
-            "notification": {"iyuu": {"enable": False}, "tg_bot": {"enable": False}},
-        },
+            "bet": True,
+            "bet_type": 0,  # 押小，开大 -> 输
+            "bet_amount": 1_322_000,
+            "bet_sequence_count": 8,
+            "lose_count": 7,
+            "lose_stop": 12,
+            "lose_four": 2.05,
+            "current_round": 1,
+            "current_bet_seq": 90,
+            "account_balance": 1_334_559,
+            "gambling_fund": 1_334_559,
+        }
     )
-    ctx = UserContext(str(user_dir))
-    rt = ctx.state.runtime
-    rt["bet"] = True
-    rt["bet_type"] = 0  # 押小，开大 -> 输
-    rt["bet_amount"] = 1_322_000
-    rt["bet_sequence_count"] = 8
-    rt["lose_count"] = 7
-    rt["lose_stop"] = 12
-    rt["lose_four"] = 2.05
-    rt["current_round"] = 1
-    rt["current_bet_seq"] = 90
-    rt["account_balance"] = 1_334_559
-    rt["gambling_fund"] = 1_334_559
     ctx.state.bet_sequence_log = [{"bet_id": "20260302_1_90", "result": None, "profit": 0}]
 
     sent_messages = []
@@ -2228,21 +2358,22 @@ def test_process_settle_keeps_pending_bet_settlement_before_fund_pause(tmp_path,
         sent_messages.append(message)
         return None
 
-    async def fake_send_to_admin(client, message, user_ctx, global_cfg):
-        sent_messages.append(message)
-        return SimpleNamespace(chat_id=5022, id=len(sent_messages))
+    fake_send_to_admin = make_fake_send_to_admin(sent_messages, 5024)
 
     async def fake_fetch_balance(user_ctx):
         # 模拟远端余额已变化（比如该笔下注已在平台侧扣减）
         return 12_559
 
-    monkeypatch.setattr(zm, "send_message_v2", fake_send_message_v2)
-    monkeypatch.setattr(zm, "send_to_admin", fake_send_to_admin)
-    monkeypatch.setattr(zm, "fetch_balance", fake_fetch_balance)
+    patch_zm(
+        monkeypatch,
+        send_message_v2=fake_send_message_v2,
+        send_to_admin=fake_send_to_admin,
+        fetch_balance=fake_fetch_balance,
+    )
 
     class DummyClient:
         async def send_message(self, target, message, parse_mode=None):
-            return SimpleNamespace(chat_id=target, id=1)
+            return FakeSent(target, 1)
 
         async def delete_messages(self, chat_id, message_id):
             return None
@@ -2255,29 +2386,23 @@ def test_process_settle_keeps_pending_bet_settlement_before_fund_pause(tmp_path,
     assert rt["gambling_fund"] == 12_559
     assert rt["bet"] is False
     assert "fund_pause" in sent_types
-    assert any("菠菜资金不足，已暂停押注" in m for m in sent_messages)
+    _assert_any_contains(sent_messages, "菠菜资金不足，已暂停押注")
 
 
-def test_process_settle_only_consumes_pending_bet_once(tmp_path, monkeypatch):
-    user_dir = tmp_path / "users" / "5015"
-    _write_json(
-        user_dir / "config.json",
+def test_process_settle_only_consumes_pending_bet_once(make_ctx, monkeypatch):
+    ctx = make_ctx(5015, "单次结算用户")
+    rt = ctx.state.runtime
+    rt.update(
         {
-            "account": {"name": "单次结算用户"},
-            "telegram": {"user_id": 5015},
-            "groups": {"admin_chat": 5015},
-            "notification": {"iyuu": {"enable": False}, "tg_bot": {"enable": False}},
-        },
+            "bet": True,
+            "bet_type": 1,
+            "bet_amount": 1_000,
+            "current_round": 1,
+            "current_bet_seq": 1,
+            "account_balance": 10_000_000,
+            "gambling_fund": 9_000_000,
+        }
     )
-    ctx = UserContext(str(user_dir))
-    rt = ctx.state.runtime
-    rt["bet"] = True
-    rt["bet_type"] = 1
-    rt["bet_amount"] = 1_000
-    rt["current_round"] = 1
-    rt["current_bet_seq"] = 1
-    rt["account_balance"] = 10_000_000
-    rt["gambling_fund"] = 9_000_000
     ctx.state.bet_sequence_log = [{"bet_id": "20260227_1_1", "profit": None}]
 
     sent_messages = []
@@ -2285,20 +2410,21 @@ def test_process_settle_only_consumes_pending_bet_once(tmp_path, monkeypatch):
     async def fake_send_message_v2(*args, **kwargs):
         return None
 
-    async def fake_send_to_admin(client, message, user_ctx, global_cfg):
-        sent_messages.append(message)
-        return SimpleNamespace(chat_id=5015, id=len(sent_messages))
+    fake_send_to_admin = make_fake_send_to_admin(sent_messages, 5015)
 
     async def fake_fetch_balance(user_ctx):
         return rt["account_balance"]
 
-    monkeypatch.setattr(zm, "send_message_v2", fake_send_message_v2)
-    monkeypatch.setattr(zm, "send_to_admin", fake_send_to_admin)
-    monkeypatch.setattr(zm, "fetch_balance", fake_fetch_balance)
+    patch_zm(
+        monkeypatch,
+        send_message_v2=fake_send_message_v2,
+        send_to_admin=fake_send_to_admin,
+        fetch_balance=fake_fetch_balance,
+    )
 
     class DummyClient:
         async def send_message(self, target, message, parse_mode=None):
-            return SimpleNamespace(chat_id=target, id=1)
+            return FakeSent(target, 1)
 
         async def delete_messages(self, chat_id, message_id):
             return None
@@ -2316,45 +2442,37 @@ def test_process_settle_only_consumes_pending_bet_once(tmp_path, monkeypatch):
     assert len(second_result_msgs) == 0
 
 
-def test_process_settle_triggers_deep_risk_pause_immediately_on_loss_milestone(tmp_path, monkeypatch):
-    user_dir = tmp_path / "users" / "5016"
-    _write_json(
-        user_dir / "config.json",
+def test_process_settle_triggers_deep_risk_pause_immediately_on_loss_milestone(make_ctx, monkeypatch, run_async):
+    ctx = make_ctx(5016, "深度风控用户")
+    rt = ctx.state.runtime
+    rt.update(
         {
-            "account": {"name": "深度风控用户"},
-            "telegram": {"user_id": 5016},
-            "groups": {"admin_chat": 5016},
-            "notification": {"iyuu": {"enable": False}, "tg_bot": {"enable": False}},
-        },
+            "bet": True,
+            "bet_type": 1,  # 押大，下面开小 -> 输
+            "bet_amount": 1000,
+            "bet_sequence_count": 3,
+            "lose_count": 2,
+            "lose_stop": 20,
+            "current_preset_name": "yc10",
+            "current_round": 1,
+            "current_bet_seq": 3,
+            "account_balance": 10_000_000,
+            "gambling_fund": 9_000_000,
+            "current_model_id": "qwen3-max",
+        }
     )
-    ctx = UserContext(str(user_dir))
-    rt = ctx.state.runtime
-    rt["bet"] = True
-    rt["bet_type"] = 1  # 押大，下面开小 -> 输
-    rt["bet_amount"] = 1000
-    rt["bet_sequence_count"] = 3
-    rt["lose_count"] = 2
-    rt["lose_stop"] = 20
-    rt["current_preset_name"] = "yc10"
-    rt["current_round"] = 1
-    rt["current_bet_seq"] = 3
-    rt["account_balance"] = 10_000_000
-    rt["gambling_fund"] = 9_000_000
-    rt["current_model_id"] = "qwen3-max"
     ctx.state.bet_sequence_log = [
         {"bet_id": "20260227_1_1", "result": "赢", "profit": 990},
         {"bet_id": "20260227_1_2", "result": "输", "profit": -1000},
         {"bet_id": "20260227_1_3", "result": None, "profit": None},
     ]
 
-    sent_messages = []
+    sent_messages = deque()
 
     async def fake_send_message_v2(*args, **kwargs):
         return None
 
-    async def fake_send_to_admin(client, message, user_ctx, global_cfg):
-        sent_messages.append(message)
-        return SimpleNamespace(chat_id=5016, id=len(sent_messages))
+    fake_send_to_admin = make_fake_send_to_admin(sent_messages, 5016)
 
     async def fake_fetch_balance(user_ctx):
         return rt["account_balance"]
@@ -2363,42 +2481,34 @@ def test_process_settle_triggers_deep_risk_pause_immediately_on_loss_milestone(t
         assert risk_eval.get("deep_milestone") == 3
         return 3, "测试建议", "model"
 
-    monkeypatch.setattr(zm, "send_message_v2", fake_send_message_v2)
-    monkeypatch.setattr(zm, "send_to_admin", fake_send_to_admin)
-    monkeypatch.setattr(zm, "fetch_balance", fake_fetch_balance)
-    monkeypatch.setattr(zm, "_suggest_pause_rounds_by_model", fake_suggest_pause_rounds_by_model)
+    patch_zm(
+        monkeypatch,
+        send_message_v2=fake_send_message_v2,
+        send_to_admin=fake_send_to_admin,
+        fetch_balance=fake_fetch_balance,
+        _suggest_pause_rounds_by_model=fake_suggest_pause_rounds_by_model,
+    )
 
     class DummyClient:
         async def send_message(self, target, message, parse_mode=None):
-            return SimpleNamespace(chat_id=target, id=1)
+            return FakeSent(target, 1)
 
         async def delete_messages(self, chat_id, message_id):
             return None
 
     event = SimpleNamespace(id=43001, message=SimpleNamespace(message="已结算: 结果为 8 小"))
-    asyncio.run(zm.process_settle(DummyClient(), event, ctx, {}))
+    run_async(zm.process_settle(DummyClient(), event, ctx, {}))
 
-    settle_idx = next(i for i, msg in enumerate(sent_messages) if "押注结果" in msg)
-    pause_idx = next(i for i, msg in enumerate(sent_messages) if "触发层级：深度风控（3连输档）" in msg)
-    assert pause_idx > settle_idx
+    idx = _first_indices(sent_messages, "押注结果", "触发层级：深度风控（3连输档）")
+    assert idx["触发层级：深度风控（3连输档）"] > idx["押注结果"]
     assert rt["stop_count"] == 4  # 模型建议暂停3局，内部计数为3+1
     assert rt["bet_on"] is False
     assert rt["bet"] is False
     assert 3 in rt.get("risk_deep_triggered_milestones", [])
 
 
-def test_trigger_deep_risk_pause_skips_when_deep_switch_off(tmp_path, monkeypatch):
-    user_dir = tmp_path / "users" / "5031"
-    _write_json(
-        user_dir / "config.json",
-        {
-            "account": {"name": "深度关闭用户"},
-            "telegram": {"user_id": 5031},
-            "groups": {"admin_chat": 5031},
-            "notification": {"iyuu": {"enable": False}, "tg_bot": {"enable": False}},
-        },
-    )
-    ctx = UserContext(str(user_dir))
+def test_trigger_deep_risk_pause_skips_when_deep_switch_off(make_ctx, monkeypatch, run_async):
+    ctx = make_ctx(5031, "深度关闭用户")
     rt = ctx.state.runtime
     rt["risk_deep_enabled"] = False
     rt["stop_count"] = 0
@@ -2418,7 +2528,7 @@ def test_trigger_deep_risk_pause_skips_when_deep_switch_off(tmp_path, monkeypatc
         "reasons": ["连输达到3局档位（每3局触发）"],
     }
 
-    triggered = asyncio.run(
+    triggered = run_async(
         zm._trigger_deep_risk_pause_after_settle(
             SimpleNamespace(),
             ctx,
@@ -2432,33 +2542,24 @@ def test_trigger_deep_risk_pause_skips_when_deep_switch_off(tmp_path, monkeypatc
     assert rt["stop_count"] == 0
 
 
-def test_trigger_deep_risk_pause_relaxes_cap_on_long_dragon(tmp_path, monkeypatch):
-    user_dir = tmp_path / "users" / "5032"
-    _write_json(
-        user_dir / "config.json",
-        {
-            "account": {"name": "长龙放宽用户"},
-            "telegram": {"user_id": 5032},
-            "groups": {"admin_chat": 5032},
-            "notification": {"iyuu": {"enable": False}, "tg_bot": {"enable": False}},
-        },
-    )
-    ctx = UserContext(str(user_dir))
+def test_trigger_deep_risk_pause_relaxes_cap_on_long_dragon(make_ctx, monkeypatch, run_async):
+    ctx = make_ctx(5032, "长龙放宽用户")
     rt = ctx.state.runtime
     rt["risk_deep_enabled"] = True
     ctx.state.history = [1, 0, 1, 1, 1, 1, 1, 1]  # 尾部6连大
-    sent_messages = []
+    sent_messages = deque()
 
     async def fake_suggest_pause_rounds_by_model(user_ctx, risk_eval, max_pause):
         assert max_pause == zm.RISK_DEEP_LONG_DRAGON_MAX_PAUSE_ROUNDS
         return 5, "模型建议", "model"
 
-    async def fake_send_to_admin(client, message, user_ctx, global_cfg):
-        sent_messages.append(message)
-        return SimpleNamespace(chat_id=5032, id=len(sent_messages))
+    fake_send_to_admin = make_fake_send_to_admin(sent_messages, 5032)
 
-    monkeypatch.setattr(zm, "_suggest_pause_rounds_by_model", fake_suggest_pause_rounds_by_model)
-    monkeypatch.setattr(zm, "send_to_admin", fake_send_to_admin)
+    patch_zm(
+        monkeypatch,
+        _suggest_pause_rounds_by_model=fake_suggest_pause_rounds_by_model,
+        send_to_admin=fake_send_to_admin,
+    )
 
     risk_eval = {
         "deep_trigger": True,
@@ -2470,7 +2571,7 @@ def test_trigger_deep_risk_pause_relaxes_cap_on_long_dragon(tmp_path, monkeypatc
         "reasons": ["连输达到3局档位（每3局触发）"],
     }
 
-    triggered = asyncio.run(
+    triggered = run_async(
         zm._trigger_deep_risk_pause_after_settle(
             SimpleNamespace(),
             ctx,
@@ -2486,28 +2587,22 @@ def test_trigger_deep_risk_pause_relaxes_cap_on_long_dragon(tmp_path, monkeypatc
     assert any("本层暂停上限由 5 调整为 2" in msg for msg in sent_messages)
 
 
-def test_format_dashboard_shows_software_version_and_preset_lines(tmp_path, monkeypatch):
-    user_dir = tmp_path / "users" / "5013"
-    _write_json(
-        user_dir / "config.json",
+def test_format_dashboard_shows_software_version_and_preset_lines(make_ctx, monkeypatch):
+    ctx = make_ctx(5013, "仪表盘用户")
+    rt = ctx.state.runtime
+    rt.update(
         {
-            "account": {"name": "仪表盘用户"},
-            "telegram": {"user_id": 5013},
-            "groups": {"admin_chat": 5013},
-            "notification": {"iyuu": {"enable": False}, "tg_bot": {"enable": False}},
-        },
+            "current_preset_name": "yc10",
+            "continuous": 1,
+            "lose_stop": 11,
+            "lose_once": 2.8,
+            "lose_twice": 2.3,
+            "lose_three": 2.2,
+            "lose_four": 2.05,
+            "initial_amount": 10000,
+        }
     )
-    ctx = UserContext(str(user_dir))
-    rt = ctx.state.runtime
-    rt["current_preset_name"] = "yc10"
-    rt["continuous"] = 1
-    rt["lose_stop"] = 11
-    rt["lose_once"] = 2.8
-    rt["lose_twice"] = 2.3
-    rt["lose_three"] = 2.2
-    rt["lose_four"] = 2.05
-    rt["initial_amount"] = 10000
-    ctx.state.history = [1, 0] * 20
+    ctx.state.history = _DASHBOARD_HISTORY
 
     monkeypatch.setattr(zm, "get_current_repo_info", lambda: {"current_tag": "v1.0.10", "nearest_tag": "v1.0.10", "short_commit": "abcd1234"})
 
@@ -2517,72 +2612,36 @@ def test_format_dashboard_shows_software_version_and_preset_lines(tmp_path, monk
     assert "🤖 **预设参数：1 11 2.8 2.3 2.2 2.05 10000**" in msg
 
 
-def test_st_command_triggers_auto_yc_report(tmp_path, monkeypatch):
-    user_dir = tmp_path / "users" / "5008"
-    _write_json(
-        user_dir / "config.json",
-        {
-            "account": {"name": "预设测算用户"},
-            "telegram": {"user_id": 5008},
-            "groups": {"admin_chat": 5008},
-            "notification": {"iyuu": {"enable": False}, "tg_bot": {"enable": False}},
-        },
-    )
-    ctx = UserContext(str(user_dir))
+def test_st_command_triggers_auto_yc_report(make_ctx, monkeypatch, run_async):
+    ctx = make_ctx(5008, "预设测算用户")
 
-    sent_messages = []
-
-    async def fake_send_to_admin(client, message, user_ctx, global_cfg):
-        sent_messages.append(message)
-        return SimpleNamespace(chat_id=5008, id=len(sent_messages))
+    sent_messages = deque()
 
-    def fake_create_task(coro):
-        coro.close()
-        return None
+    fake_send_to_admin = make_fake_send_to_admin(sent_messages, 5008)
 
     monkeypatch.setattr(zm, "send_to_admin", fake_send_to_admin)
-    monkeypatch.setattr(zm.asyncio, "create_task", fake_create_task)
+    monkeypatch.setattr(zm.asyncio, "create_task", suppress_create_task)
 
     cmd_event = SimpleNamespace(raw_text="st yc05", chat_id=5008, id=21)
-    asyncio.run(zm.process_user_command(SimpleNamespace(), cmd_event, ctx, {}))
+    run_async(zm.process_user_command(SimpleNamespace(), cmd_event, ctx, {}))
 
     assert ctx.state.runtime.get("current_preset_name") == "yc05"
-    assert any("预设启动成功: yc05" in msg for msg in sent_messages)
-    assert any("🔮 已根据当前预设自动测算" in msg for msg in sent_messages)
-    assert any("🎯 策略参数" in msg for msg in sent_messages)
-    assert any("连数|倍率|下注| 盈利 |所需本金" in msg for msg in sent_messages)
+    _assert_any_contains(sent_messages, "预设启动成功: yc05", "🔮 已根据当前预设自动测算", "🎯 策略参数", "连数|倍率|下注| 盈利 |所需本金")
 
 
-def test_xx_command_cleans_messages_in_config_groups(tmp_path, monkeypatch):
-    user_dir = tmp_path / "users" / "5009"
-    _write_json(
-        user_dir / "config.json",
-        {
-            "account": {"name": "清理用户"},
-            "telegram": {"user_id": 5009},
-            "groups": {"admin_chat": 5009, "zq_group": [111], "monitor": [222]},
-            "notification": {"iyuu": {"enable": False}, "tg_bot": {"enable": False}},
-        },
-    )
-    ctx = UserContext(str(user_dir))
-
-    sent_messages = []
-    deleted_calls = []
+def test_xx_command_cleans_messages_in_config_groups(make_ctx, monkeypatch, run_async):
+    ctx = make_ctx(5009, "清理用户", groups={"admin_chat": 5009, "zq_group": [111], "monitor": [222]})
 
-    async def fake_send_to_admin(client, message, user_ctx, global_cfg):
-        sent_messages.append(message)
-        return SimpleNamespace(chat_id=5009, id=len(sent_messages))
+    sent_messages = deque()
+    deleted_calls = deque()
 
-    def fake_create_task(coro):
-        coro.close()
-        return None
+    fake_send_to_admin = make_fake_send_to_admin(sent_messages, 5009)
 
     class DummyClient:
         def iter_messages(self, chat_id, from_user=None, limit=None):
             async def _gen():
-                sample = {111: [1, 2, 3], 222: [10]}
-                for msg_id in sample.get(chat_id, []):
-                    yield SimpleNamespace(id=msg_id)
+                for msg in _XX_SAMPLE.get(chat_id, ()):
+                    yield msg
 
             return _gen()
 
@@ -2590,128 +2649,56 @@ def test_xx_command_cleans_messages_in_config_groups(tmp_path, monkeypatch):
             deleted_calls.append((chat_id, list(message_ids)))
 
     monkeypatch.setattr(zm, "send_to_admin", fake_send_to_admin)
-    monkeypatch.setattr(zm.asyncio, "create_task", fake_create_task)
+    monkeypatch.setattr(zm.asyncio, "create_task", suppress_create_task)
 
     cmd_event = SimpleNamespace(raw_text="xx", chat_id=5009, id=30)
-    asyncio.run(zm.process_user_command(DummyClient(), cmd_event, ctx, {}))
-
-    assert (111, [1, 2, 3]) in deleted_calls
-    assert (222, [10]) in deleted_calls
-    assert any("群组消息已清理" in msg for msg in sent_messages)
-    assert any("删除消息：4" in msg for msg in sent_messages)
-
-
-def test_process_red_packet_claim_success_sends_admin_notice(tmp_path, monkeypatch):
-    user_dir = tmp_path / "users" / "5010"
-    _write_json(
-        user_dir / "config.json",
-        {
-            "account": {"name": "红包用户"},
-            "telegram": {"user_id": 5010},
-            "groups": {"admin_chat": 5010, "zq_bot": 9001},
-            "notification": {"iyuu": {"enable": False}, "tg_bot": {"enable": False}},
-        },
-    )
-    ctx = UserContext(str(user_dir))
+    run_async(zm.process_user_command(DummyClient(), cmd_event, ctx, {}))
+
+    # 每个群组只发起一次批量删除
+    assert list(deleted_calls) == [(111, [1, 2, 3]), (222, [10])]
+    _assert_any_contains(sent_messages, "群组消息已清理", "删除消息：4")
+
+
+@pytest.mark.parametrize(
+    "user_id, raw_text, markup, expect_click, expect_msg",
+    [
+        (5010, "恭喜领取灵石红包", _RED_PACKET_MARKUP, True, "🎉 抢到红包88灵石！"),
+        (5012, "灵石对战游戏开始啦", _GAME_START_MARKUP, False, None),
+    ],
+    ids=["claim_success_sends_admin_notice", "ignores_game_message"],
+)
+def test_process_red_packet(make_ctx, monkeypatch, run_async, user_id, raw_text, markup, expect_click, expect_msg):
+    ctx = make_ctx(user_id, "红包用户", groups={"admin_chat": user_id, "zq_bot": 9001})
     sent = {}
 
     async def fake_send_to_admin(client, message, user_ctx, global_cfg):
         sent["message"] = message
-        return SimpleNamespace(chat_id=5010, id=1)
-
-    async def fake_sleep(*args, **kwargs):
-        return None
+        return FakeSent(user_id, 1)
 
-    monkeypatch.setattr(zm, "send_to_admin", fake_send_to_admin)
-    monkeypatch.setattr(zm.asyncio, "sleep", fake_sleep)
+    patch_zm(monkeypatch, send_to_admin=fake_send_to_admin)
+    patch_zm_asyncio(monkeypatch, sleep=noop_sleep)
 
     class DummyClient:
         async def __call__(self, request):
+            if not expect_click:
+                raise AssertionError("游戏消息不应触发红包回调请求")
             return SimpleNamespace(message="已获得 88 灵石")
 
-    class DummyButton:
-        data = b"red-packet"
-
-    class DummyRow:
-        buttons = [DummyButton()]
+    event = FakeRedPacketEvent(raw_text, markup)
+    run_async(zm.process_red_packet(DummyClient(), event, ctx, {}))
 
-    class DummyMarkup:
-        rows = [DummyRow()]
+    assert bool(event.clicked) == expect_click
+    assert sent.get("message") == expect_msg
 
-    class DummyEvent:
-        sender_id = 9001
-        raw_text = "恭喜领取灵石红包"
-        text = "恭喜领取灵石红包"
-        chat_id = -10001
-        id = 99
-        reply_markup = DummyMarkup()
-
-        def __init__(self):
-            self.clicked = []
-
-        async def click(self, *args):
-            self.clicked.append(args)
 
-    event = DummyEvent()
-    asyncio.run(zm.process_red_packet(DummyClient(), event, ctx, {}))
+def test_select_red_packet_button_filters_game_message():
+    red_event = SimpleNamespace(raw_text="恭喜领取灵石红包", reply_markup=_RED_PACKET_MARKUP)
+    game_event = SimpleNamespace(raw_text="灵石对战游戏开始啦", reply_markup=_GAME_START_MARKUP)
 
-    assert event.clicked
-    assert sent.get("message") == "🎉 抢到红包88灵石！"
+    assert zm._select_red_packet_button(red_event) == (0, 0, b"red-packet")
+    assert zm._select_red_packet_button(game_event) is None
 
 
-def test_process_red_packet_ignores_game_message(tmp_path, monkeypatch):
-    user_dir = tmp_path / "users" / "5012"
-    _write_json(
-        user_dir / "config.json",
-        {
-            "account": {"name": "游戏过滤用户"},
-            "telegram": {"user_id": 5012},
-            "groups": {"admin_chat": 5012, "zq_bot": 9001},
-            "notification": {"iyuu": {"enable": False}, "tg_bot": {"enable": False}},
-        },
-    )
-    ctx = UserContext(str(user_dir))
-    sent = {"called": False}
-
-    async def fake_send_to_admin(client, message, user_ctx, global_cfg):
-        sent["called"] = True
-        return SimpleNamespace(chat_id=5012, id=1)
-
-    monkeypatch.setattr(zm, "send_to_admin", fake_send_to_admin)
-
-    class DummyClient:
-        async def __call__(self, request):
-            raise AssertionError("游戏消息不应触发红包回调请求")
-
-    class DummyButton:
-        data = b"game-start"
-        text = "开始游戏"
-
-    class DummyRow:
-        buttons = [DummyButton()]
-
-    class DummyMarkup:
-        rows = [DummyRow()]
-
-    class DummyEvent:
-        sender_id = 9001
-        raw_text = "灵石对战游戏开始啦"
-        text = "灵石对战游戏开始啦"
-        chat_id = -10001
-        id = 109
-        reply_markup = DummyMarkup()
-
-        def __init__(self):
-            self.clicked = []
-
-        async def click(self, *args):
-            self.clicked.append(args)
-
-    event = DummyEvent()
-    asyncio.run(zm.process_red_packet(DummyClient(), event, ctx, {}))
-
-    assert event.clicked == []
-    assert sent["called"] is False
 def test_compute_replay_linkage_coverage_only_counts_settled_records():
     settled_tokens = next(
         const
@@ -2779,16 +2766,10 @@ def test_process_user_command_replay_outputs_focus_message(tmp_path, monkeypatch
 
     sent_messages = []
 
-    async def fake_send_to_admin(client, message, user_ctx, global_cfg):
-        sent_messages.append(message)
-        return SimpleNamespace(chat_id=7011, id=len(sent_messages))
-
-    def fake_create_task(coro):
-        coro.close()
-        return None
+    fake_send_to_admin = make_fake_send_to_admin(sent_messages, 7011)
 
     monkeypatch.setattr(zm, "send_to_admin", fake_send_to_admin)
-    monkeypatch.setattr(zm.asyncio, "create_task", fake_create_task)
+    monkeypatch.setattr(zm.asyncio, "create_task", suppress_create_task)
 
     cmd_event = SimpleNamespace(raw_text="replay 2", chat_id=7011, id=1)
     asyncio.run(zm.process_user_command(SimpleNamespace(), cmd_event, ctx, {}))
@@ -2813,13 +2794,17 @@ def test_process_bet_on_records_decision_linkage_fields(tmp_path, monkeypatch):
     )
     ctx = UserContext(str(user_dir))
     rt = ctx.state.runtime
-    rt["switch"] = True
-    rt["bet_on"] = True
-    rt["mode_stop"] = True
-    rt["stop_count"] = 0
-    rt["bet_amount"] = 500
-    rt["lose_count"] = 0
-    rt["win_count"] = 0
+    rt.update(
+        {
+            "switch": True,
+            "bet_on": True,
+            "mode_stop": True,
+            "stop_count": 0,
+            "bet_amount": 500,
+            "lose_count": 0,
+            "win_count": 0,
+        }
+    )
 
     async def fake_predict(user_ctx, global_cfg):
         runtime = user_ctx.state.runtime
@@ -2838,23 +2823,15 @@ def test_process_bet_on_records_decision_linkage_fields(tmp_path, monkeypatch):
         return 1
 
     async def fake_send_to_admin(client, message, user_ctx, global_cfg):
-        return SimpleNamespace(chat_id=7012, id=1)
-
-    async def fake_delete_later(*args, **kwargs):
-        return None
-
-    async def fake_sleep(*args, **kwargs):
-        return None
+        return FakeSent(7012, 1)
 
-    def fake_create_task(coro):
-        coro.close()
-        return None
-
-    monkeypatch.setattr(zm, "predict_next_bet_v10", fake_predict)
-    monkeypatch.setattr(zm, "send_to_admin", fake_send_to_admin)
-    monkeypatch.setattr(zm, "delete_later", fake_delete_later)
-    monkeypatch.setattr(zm.asyncio, "sleep", fake_sleep)
-    monkeypatch.setattr(zm.asyncio, "create_task", fake_create_task)
+    patch_zm(
+        monkeypatch,
+        predict_next_bet_v10=fake_predict,
+        send_to_admin=fake_send_to_admin,
+        schedule_delete=lambda *args, **kwargs: None,
+    )
+    patch_zm_asyncio(monkeypatch, sleep=noop_sleep, create_task=suppress_create_task)
 
     class DummyEvent:
         def __init__(self):
@@ -2946,16 +2923,20 @@ def test_process_settle_updates_target_pending_entry_by_pending_bet_id(tmp_path,
     )
     ctx = UserContext(str(user_dir))
     rt = ctx.state.runtime
-    rt["bet"] = True
-    rt["bet_type"] = 1
-    rt["bet_amount"] = 1_000
-    rt["bet_sequence_count"] = 1
-    rt["current_round"] = 1
-    rt["current_bet_seq"] = 2
-    rt["account_balance"] = 10_000_000
-    rt["gambling_fund"] = 9_000_000
-    rt["pending_bet_id"] = "bet_pending_1"
-    rt["last_predict_info"] = "settle-link-test"
+    rt.update(
+        {
+            "bet": True,
+            "bet_type": 1,
+            "bet_amount": 1_000,
+            "bet_sequence_count": 1,
+            "current_round": 1,
+            "current_bet_seq": 2,
+            "account_balance": 10_000_000,
+            "gambling_fund": 9_000_000,
+            "pending_bet_id": "bet_pending_1",
+            "last_predict_info": "settle-link-test",
+        }
+    )
     ctx.state.bet_sequence_log = [
         {
             "bet_id": "bet_pending_1",
@@ -2977,18 +2958,21 @@ def test_process_settle_updates_target_pending_entry_by_pending_bet_id(tmp_path,
         return None
 
     async def fake_send_to_admin(client, message, user_ctx, global_cfg):
-        return SimpleNamespace(chat_id=7013, id=1)
+        return FakeSent(7013, 1)
 
     async def fake_fetch_balance(user_ctx):
         return rt["account_balance"]
 
-    monkeypatch.setattr(zm, "send_message_v2", fake_send_message_v2)
-    monkeypatch.setattr(zm, "send_to_admin", fake_send_to_admin)
-    monkeypatch.setattr(zm, "fetch_balance", fake_fetch_balance)
+    patch_zm(
+        monkeypatch,
+        send_message_v2=fake_send_message_v2,
+        send_to_admin=fake_send_to_admin,
+        fetch_balance=fake_fetch_balance,
+    )
 
     class DummyClient:
         async def send_message(self, target, message, parse_mode=None):
-            return SimpleNamespace(chat_id=target, id=1)
+            return FakeSent(target, 1)
 
         async def delete_messages(self, chat_id, message_id):
             return None
@@ -14,25 +14,73 @@ from __future__ import annotations
 import asyncio
 import json
 import os
+import py_compile
+import random
 import re
 import shutil
 import subprocess
 import sys
+import threading
 import time
 import base64
+import hashlib
+import hmac
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Awaitable, Callable, Dict, List, Optional
-from urllib.parse import urlparse
+from typing import Any, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
-import requests
+from user_manager import get_aio_session
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+try:
+    import pygit2
+    from pygit2.enums import DescribeStrategy, RepositoryOpenFlag
+    HAS_PYGIT2 = True
+except ImportError:
+    HAS_PYGIT2 = False
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
 
 
 DEFAULT_RELEASE_CHECK_INTERVAL = 30 * 60  # 30 分钟
+RELEASE_CHECK_MAX_BACKOFF = 4  # release 连续未变化（304）时检查间隔逐次翻倍，最多放大到基础间隔的倍数
+RELEASE_CHECK_JITTER = 0.1  # 间隔随机浮动 ±10%，避免多实例在同一时刻请求 GitHub
+DEFAULT_RELEASE_WEBHOOK_PORT = 8787
+DEFAULT_RELEASE_WEBHOOK_HOST = "127.0.0.1"  # 默认仅监听本机，由反向代理转发；需直接对外时显式配置 host
+RELEASE_WEBHOOK_BACKSTOP_INTERVAL = 6 * 60 * 60  # webhook 模式下的兜底轮询间隔，补漏投递失败的事件
 RELEASE_STATE_FILE = ".release_state.json"
 ROLLBACK_FILE = ".release_rollback.json"
 UPDATE_LOCK_FILE = ".update.lock"
+CACHE_DIR = ".cache"
+HEALTHCHECK_CACHE_FILE = "healthcheck.json"
+HEALTHCHECK_COMMITS_FILE = "healthcheck_commits.json"
+HEALTHCHECK_COMMITS_KEEP = 32
 GITHUB_TOKEN_ENV_KEYS = ("YDXBOT_GITHUB_TOKEN", "GITHUB_TOKEN", "GH_TOKEN")
 SYSTEMD_SERVICE_ENV_KEYS = ("YDXBOT_SYSTEMD_SERVICE", "SYSTEMD_SERVICE")
+HUGE_REPO_BYTES_ENV_KEY = "YDXBOT_HUGE_REPO_BYTES"
+DEFAULT_HUGE_INDEX_BYTES = 32 * 1024 * 1024  # .git/index 超过该大小视为超大仓库
+BLOCKING_PATHS_LIMIT = 50  # 阻塞路径只需展示前若干条，收集够即停止扫描
+LATEST_TAG_CACHE_TTL = 60  # 秒
+RELEASE_CACHE_FRESH_SECONDS = 60  # 秒，窗口内重复检查直接用缓存
+# 请求 GitHub 的重试策略（同步与异步请求共用）：网关类错误或网络异常时退避重试
+HTTP_RETRY_TOTAL = 2
+HTTP_RETRY_BACKOFF = 0.3  # 秒，第 n 次重试前等待 backoff * 2**(n-1)
+HTTP_RETRY_STATUSES = (502, 503, 504)
+GITHUB_API_HEADERS = {
+    "Accept": "application/vnd.github+json",
+    "X-GitHub-Api-Version": "2022-11-28",
+    "User-Agent": "YdxbotV2-updater",
+}
 GLOBAL_CONFIG_CANDIDATES = (
     "global_config.json",
     "global_config.example.json",
@@ -42,109 +90,262 @@ GLOBAL_CONFIG_CANDIDATES = (
 )
 
 
-def _repo_root(repo_root: Optional[str] = None) -> Path:
+@lru_cache(maxsize=16)
+def _resolve_repo_root(repo_root: str) -> Path:
     return Path(repo_root or Path(__file__).resolve().parent).resolve()
 
 
+def _repo_root(repo_root: Optional[str] = None) -> Path:
+    # 每个入口都会解析一次仓库路径：绝对路径的 resolve 结果缓存复用，相对路径依赖 cwd 不缓存
+    if repo_root and not os.path.isabs(repo_root):
+        return Path(repo_root).resolve()
+    return _resolve_repo_root(str(repo_root or ""))
+
+
+# Python 创建的 fd 默认不可继承（PEP 446），POSIX 下无需在子进程中逐个关闭
+_CLOSE_FDS = os.name == "nt"
+# 只读命令（status/config 等）不抢占可选锁，fetch 遇到鉴权时直接失败而不是等待终端输入
+_GIT_ENV_OVERRIDES = {"GIT_OPTIONAL_LOCKS": "0", "GIT_TERMINAL_PROMPT": "0"}
+
+
+def _cmd_env() -> Dict[str, str]:
+    # 保留完整环境：git 依赖 HOME 读取全局配置（safe.directory、凭据等）
+    return {**os.environ, **_GIT_ENV_OVERRIDES}
+
+
 def _run_cmd(args: List[str], cwd: Path, timeout: int = 30) -> subprocess.CompletedProcess:
-    return subprocess.run(
+    result = subprocess.run(
         args,
         cwd=str(cwd),
-        text=True,
         capture_output=True,
         timeout=timeout,
         check=False,
+        close_fds=_CLOSE_FDS,
+        env=_cmd_env(),
+    )
+    # 按字节捕获后统一以 UTF-8 解码一次（git 输出含中文提交说明时不受系统 locale 影响）
+    return subprocess.CompletedProcess(
+        args=result.args,
+        returncode=result.returncode,
+        stdout=result.stdout.decode("utf-8", errors="replace"),
+        stderr=result.stderr.decode("utf-8", errors="replace"),
     )
 
 
-def _parse_repo_slug(remote_url: str) -> Optional[str]:
-    if not remote_url:
-        return None
 
-    raw = remote_url.strip()
+async def _run_cmd_async(args: List[str], cwd: Path, timeout: int = 30) -> subprocess.CompletedProcess:
+    """_run_cmd 的异步版本：子进程由事件循环等待，不占用线程池。"""
+    proc = await asyncio.create_subprocess_exec(
+        *args,
+        cwd=str(cwd),
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        close_fds=_CLOSE_FDS,
+        env=_cmd_env(),
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        raise subprocess.TimeoutExpired(args, timeout)
+    return subprocess.CompletedProcess(
+        args=args,
+        returncode=proc.returncode,
+        stdout=stdout.decode("utf-8", errors="replace"),
+        stderr=stderr.decode("utf-8", errors="replace"),
+    )
+
 
-    # SCP-like SSH URL, e.g. git@github.com:owner/repo.git
-    ssh_match = re.match(
-        r"(?i)git@github\.com:(?P<owner>[^/\s]+)/(?P<repo>[^/\s]+?)(?:\.git)?/?$",
-        raw,
+def _run_cmd_stream(args: List[str], cwd: Path, timeout: int = 30, sep: bytes = b"\0") -> Iterator[str]:
+    """
+    流式执行命令，按 sep 切分 stdout 逐条产出记录，内存占用与输出总量无关。
+    调用方提前停止迭代时终止子进程；超时抛 TimeoutExpired，非零退出抛 CalledProcessError。
+    """
+    proc = subprocess.Popen(
+        args,
+        cwd=str(cwd),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        close_fds=_CLOSE_FDS,
+        env=_cmd_env(),
     )
-    if ssh_match:
-        return f"{ssh_match.group('owner')}/{ssh_match.group('repo')}"
-
-    # URL form, e.g.
-    # - https://github.com/owner/repo(.git)
-    # - https://token@github.com/owner/repo(.git)
-    # - ssh://git@github.com/owner/repo.git
-    # - git://github.com/owner/repo.git
-    parsed = urlparse(raw)
-    host = (parsed.hostname or "").lower()
-    if host == "github.com" and parsed.path:
-        path = parsed.path.strip("/")
-        if path.endswith(".git"):
-            path = path[:-4]
-        parts = [p for p in path.split("/") if p]
-        if len(parts) >= 2:
-            owner, repo = parts[0], parts[1]
-            if owner and repo:
-                return f"{owner}/{repo}"
+    timer = threading.Timer(timeout, proc.kill)
+    timer.start()
+    try:
+        pending = b""
+        while True:
+            chunk = proc.stdout.read1(65536)
+            if not chunk:
+                break
+            pending += chunk
+            *records, pending = pending.split(sep)
+            for record in records:
+                yield record.decode("utf-8", errors="replace")
+        if pending:
+            yield pending.decode("utf-8", errors="replace")
+        proc.wait()
+        if not timer.is_alive():
+            raise subprocess.TimeoutExpired(args, timeout)
+        if proc.returncode != 0:
+            raise subprocess.CalledProcessError(proc.returncode, args)
+    finally:
+        timer.cancel()
+        if proc.poll() is None:
+            proc.terminate()
+            proc.wait()
+        proc.stdout.close()
 
-    return None
+class _GitSession:
+    """
+    长驻 `git cat-file --batch-check` 进程：同一流程内多次解析 ref 时复用一个 git 进程，
+    免去每次 fork/exec 与仓库初始化开销。未传入会话的调用方仍走 _run_cmd。
+    """
+
+    def __init__(self, root: Path):
+        self.root = root
+        self._proc: Optional[subprocess.Popen] = None
+
+    def __enter__(self) -> "_GitSession":
+        try:
+            self._proc = subprocess.Popen(
+                ["git", "cat-file", "--batch-check=%(objectname) %(objecttype)"],
+                cwd=str(self.root),
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                text=True,
+                bufsize=1,
+            )
+        except OSError:
+            # 启动失败时 resolve 自动退回逐次 rev-parse
+            self._proc = None
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def close(self) -> None:
+        proc, self._proc = self._proc, None
+        if proc is None:
+            return
+        try:
+            proc.stdin.close()
+            proc.wait(timeout=5)
+        except Exception:
+            proc.kill()
+
+    def resolve(self, ref: str) -> str:
+        """解析 ref（支持 `v1.0.0^{commit}` 等表达式），不存在时返回空串。"""
+        proc = self._proc
+        if not ref or "\n" in ref:
+            return ""
+        if proc is None or proc.poll() is not None:
+            res = _run_cmd(["git", "rev-parse", "--verify", "--quiet", ref], self.root, timeout=10)
+            return res.stdout.strip() if res.returncode == 0 else ""
+        try:
+            proc.stdin.write(ref + "\n")
+            proc.stdin.flush()
+            line = proc.stdout.readline()
+        except (OSError, ValueError):
+            return ""
+        parts = line.split()
+        if len(parts) != 2 or parts[1] in {"missing", "ambiguous"}:
+            return ""
+        return parts[0]
+
+    def for_each_ref(self, pattern: str, fmt: str, sort: str = "") -> subprocess.CompletedProcess:
+        args = ["git", "for-each-ref"]
+        if sort:
+            args.append(f"--sort={sort}")
+        args += [f"--format={fmt}", pattern]
+        return _run_cmd(args, self.root, timeout=20)
+
+
+# GitHub 远程地址解析，支持：
+# - git@github.com:owner/repo(.git)
+# - https://github.com/owner/repo(.git)
+# - https://token@github.com/owner/repo(.git)
+# - ssh://git@github.com/owner/repo.git
+# - git://github.com/owner/repo.git
+_REPO_SLUG_RE = re.compile(
+    r"^(?:"
+    r"git@github\.com:(?P<ssh_owner>[^/\s]+)/(?P<ssh_repo>[^/\s]+?)(?:\.git)?/?"
+    r"|[a-z][a-z0-9+.-]*://(?:(?P<userinfo>[^@/\s]+)@)?github\.com(?::\d+)?/+"
+    r"(?P<owner>[^/?#\s]+)/+(?P<repo>[^/?#\s]+?)(?:\.git)?/*(?:[/?#].*)?"
+    r")$",
+    re.IGNORECASE,
+)
+
+
+@lru_cache(maxsize=64)
+def _match_github_remote(remote_url: str) -> Optional[Tuple[str, str, str]]:
+    """解析 GitHub 远程地址为 (owner, repo, userinfo)；slug 与 token 提取共用这一次匹配。"""
+    # 非 GitHub 地址直接返回，不进正则引擎
+    if not remote_url or "github.com" not in remote_url.lower():
+        return None
+    match = _REPO_SLUG_RE.match(remote_url.strip())
+    if not match:
+        return None
+    owner = match.group("ssh_owner") or match.group("owner")
+    repo = match.group("ssh_repo") or match.group("repo")
+    return owner, repo, match.group("userinfo") or ""
+
+
+def _parse_repo_slug(remote_url: str) -> Optional[str]:
+    matched = _match_github_remote(remote_url)
+    return f"{matched[0]}/{matched[1]}" if matched else None
+
+
+# 注释剥离：字符串字面量（含转义）原样保留，其余位置的 # 或 // 到行尾视为注释
+_JSONC_COMMENT_RE = re.compile(r'"(?:\\.|[^"\\\n])*"|(?:#|//)[^\n]*')
+
+
+def _keep_json_string(match: "re.Match[str]") -> str:
+    text = match.group(0)
+    return text if text.startswith('"') else ""
 
 
 def _load_json_with_comments(path: Path) -> Dict[str, Any]:
     if not path.exists():
         return {}
     try:
-        raw_text = path.read_text(encoding="utf-8")
+        raw = path.read_bytes()
+        if not raw.strip():
+            return {}
+        # 先按纯 JSON 直接解析字节：无注释（或 # 与 // 仅出现在 URL 等字符串里）时省去解码与正则替换；
+        # 含注释时解析在第一个注释处即失败，再剥离注释重试
+        try:
+            return orjson.loads(raw) if HAS_ORJSON else json.loads(raw)
+        except ValueError:
+            pass
+        cleaned_text = _JSONC_COMMENT_RE.sub(_keep_json_string, raw.decode("utf-8"))
+        if not cleaned_text.strip():
+            return {}
+        if HAS_ORJSON:
+            return orjson.loads(cleaned_text)
+        return json.loads(cleaned_text)
     except Exception:
         return {}
 
-    cleaned_lines: List[str] = []
-    for raw_line in raw_text.splitlines():
-        stripped = raw_line.lstrip()
-        if stripped.startswith("#") or stripped.startswith("//"):
-            continue
-
-        in_string = False
-        escaped = False
-        cleaned: List[str] = []
-        i = 0
-        while i < len(raw_line):
-            ch = raw_line[i]
-            if escaped:
-                cleaned.append(ch)
-                escaped = False
-                i += 1
-                continue
-            if ch == "\\":
-                cleaned.append(ch)
-                escaped = True
-                i += 1
-                continue
-            if ch == '"':
-                in_string = not in_string
-                cleaned.append(ch)
-                i += 1
-                continue
-            if not in_string:
-                if ch == "#":
-                    break
-                if ch == "/" and i + 1 < len(raw_line) and raw_line[i + 1] == "/":
-                    break
-            cleaned.append(ch)
-            i += 1
 
-        line = "".join(cleaned).rstrip()
-        if line:
-            cleaned_lines.append(line)
+# 共享配置解析缓存：路径 -> ((mtime_ns, size), data)；文件未改动时跳过重复解析
+_SHARED_CONFIG_CACHE: Dict[str, Any] = {}
 
-    if not cleaned_lines:
-        return {}
 
+def _load_json_with_comments_cached(path: Path) -> Dict[str, Any]:
+    """按 (mtime_ns, size) 缓存解析结果；返回值由调用方只读使用。"""
     try:
-        return json.loads("\n".join(cleaned_lines))
-    except Exception:
+        st = path.stat()
+    except OSError:
         return {}
+    key = (st.st_mtime_ns, st.st_size)
+    cache_key = str(path)
+    cached = _SHARED_CONFIG_CACHE.get(cache_key)
+    if cached is None or cached[0] != key:
+        cached = (key, _load_json_with_comments(path))
+        _SHARED_CONFIG_CACHE[cache_key] = cached
+    return cached[1]
 
 
 def _load_shared_global_config(repo_root: Path) -> Dict[str, Any]:
@@ -159,7 +360,7 @@ def _load_shared_global_config(repo_root: Path) -> Dict[str, Any]:
             path = config_dir / filename
             if not path.exists():
                 continue
-            return _load_json_with_comments(path)
+            return _load_json_with_comments_cached(path)
     return {}
 
 
@@ -172,25 +373,28 @@ def _looks_like_github_token(value: str) -> bool:
 
 
 def _extract_github_token_from_remote(remote_url: str) -> str:
-    raw = (remote_url or "").strip()
-    if not raw:
-        return ""
-    parsed = urlparse(raw)
-    host = (parsed.hostname or "").lower()
-    if host != "github.com":
+    matched = _match_github_remote(remote_url)
+    if not matched or not matched[2]:
         return ""
-    if parsed.password:
-        return parsed.password
-    if parsed.username and _looks_like_github_token(parsed.username):
-        return parsed.username
+    # userinfo 形如 user:token 或单独的 token
+    username, _, password = matched[2].partition(":")
+    if password:
+        return password
+    if _looks_like_github_token(username):
+        return username
     return ""
 
 
+def _first_env(keys) -> str:
+    """按顺序返回第一个非空（去除首尾空白后）的环境变量值，均未设置时返回空串。"""
+    environ = os.environ
+    return next(filter(None, (environ.get(key, "").strip() for key in keys)), "")
+
+
 def resolve_github_token(repo_root: Optional[str] = None, remote_url: str = "") -> str:
-    for env_key in GITHUB_TOKEN_ENV_KEYS:
-        token = (os.getenv(env_key) or "").strip()
-        if token:
-            return token
+    token = _first_env(GITHUB_TOKEN_ENV_KEYS)
+    if token:
+        return token
 
     root = _repo_root(repo_root)
     shared_cfg = _load_shared_global_config(root)
@@ -212,10 +416,9 @@ def resolve_github_token(repo_root: Optional[str] = None, remote_url: str = "")
 
 def resolve_systemd_service_name(repo_root: Optional[str] = None) -> str:
     """读取 systemd 服务名（环境变量优先，其次 shared 配置）。"""
-    for env_key in SYSTEMD_SERVICE_ENV_KEYS:
-        service_name = (os.getenv(env_key) or "").strip()
-        if service_name:
-            return service_name
+    service_name = _first_env(SYSTEMD_SERVICE_ENV_KEYS)
+    if service_name:
+        return service_name
 
     root = _repo_root(repo_root)
     shared_cfg = _load_shared_global_config(root)
@@ -234,6 +437,32 @@ def resolve_systemd_service_name(repo_root: Optional[str] = None) -> str:
     return ""
 
 
+def resolve_release_webhook_config(repo_root: Optional[str] = None) -> Dict[str, Any]:
+    """
+    读取发布 webhook 配置（shared 配置 update.release_webhook）。
+    enabled 为真且配置了 secret 时才启用；否则调用方应回退到周期轮询。
+    """
+    root = _repo_root(repo_root)
+    shared_cfg = _load_shared_global_config(root)
+    update_cfg = shared_cfg.get("update", {}) if isinstance(shared_cfg.get("update", {}), dict) else {}
+    webhook_cfg = update_cfg.get("release_webhook", {})
+    if not isinstance(webhook_cfg, dict):
+        webhook_cfg = {}
+
+    secret = str(webhook_cfg.get("secret") or "").strip()
+    try:
+        port = int(webhook_cfg.get("port") or DEFAULT_RELEASE_WEBHOOK_PORT)
+    except (TypeError, ValueError):
+        port = DEFAULT_RELEASE_WEBHOOK_PORT
+    return {
+        "enabled": bool(webhook_cfg.get("enabled")) and bool(secret),
+        "secret": secret,
+        "host": str(webhook_cfg.get("host") or DEFAULT_RELEASE_WEBHOOK_HOST).strip(),
+        "port": port,
+        "path": str(webhook_cfg.get("path") or "/github/release").strip(),
+    }
+
+
 def _run_systemd_restart(service_name: str) -> Dict[str, Any]:
     if not service_name:
         return {"success": False, "error": "未配置 systemd 服务名"}
@@ -264,6 +493,7 @@ def _build_git_auth_header(token: str) -> str:
 
 
 def _git_fetch_tags(root: Path, remote_name: str, github_token: str = "") -> subprocess.CompletedProcess:
+    """一次 fetch 同时更新远端分支（remote 配置的 refspec）与全部 tag。"""
     if not remote_name:
         return subprocess.CompletedProcess(args=[], returncode=0, stdout="", stderr="")
     cmd = ["git"]
@@ -274,13 +504,99 @@ def _git_fetch_tags(root: Path, remote_name: str, github_token: str = "") -> sub
     return _run_cmd(cmd, root, timeout=120)
 
 
+_FULL_SHA_RE = re.compile(r"^[0-9a-fA-F]{40}$")
+
+
+def _resolve_local_commit(root: Path, ref: str, session: Optional[_GitSession] = None) -> str:
+    if session is not None:
+        return session.resolve(f"{ref}^{{commit}}")
+    res = _run_cmd(["git", "rev-parse", "--verify", "--quiet", f"{ref}^{{commit}}"], root, timeout=20)
+    return res.stdout.strip() if res.returncode == 0 else ""
+
+
+def _ensure_local_tag(
+    root: Path,
+    remote_name: str,
+    tag: str,
+    github_token: str = "",
+    session: Optional[_GitSession] = None,
+) -> subprocess.CompletedProcess:
+    """
+    确保 tag 在本地可用：已存在则不访问网络；否则只拉取这一个 tag，失败再回退全量 fetch --tags。
+    """
+    if not remote_name or _resolve_local_commit(root, f"refs/tags/{tag}", session):
+        return subprocess.CompletedProcess(args=[], returncode=0, stdout="", stderr="")
+    cmd = ["git"]
+    token = (github_token or "").strip()
+    if token:
+        cmd += ["-c", f"http.extraheader={_build_git_auth_header(token)}"]
+    cmd += ["fetch", "--force", "--no-tags", remote_name, f"refs/tags/{tag}:refs/tags/{tag}"]
+    result = _run_cmd(cmd, root, timeout=120)
+    if result.returncode == 0:
+        return result
+    return _git_fetch_tags(root, remote_name, github_token)
+
+
 def detect_repo_slug(repo_root: Optional[str] = None) -> Optional[str]:
     remote = detect_repo_remote(repo_root)
     return remote.get("slug") or None
 
 
+# 远端信息缓存：仓库路径 -> (.git/config 的 mtime_ns, remote)；执行 git remote set-url 等改动后自动失效
+_REPO_REMOTE_CACHE: Dict[str, Any] = {}
+
+
 def detect_repo_remote(repo_root: Optional[str] = None) -> Dict[str, str]:
     root = _repo_root(repo_root)
+    try:
+        config_mtime = os.stat(root / ".git" / "config").st_mtime_ns
+    except OSError:
+        return _detect_repo_remote_uncached(root)
+
+    cache_key = str(root)
+    cached = _REPO_REMOTE_CACHE.get(cache_key)
+    if cached is not None and cached[0] == config_mtime:
+        return dict(cached[1])
+    remote = _detect_repo_remote_uncached(root)
+    if remote:
+        _REPO_REMOTE_CACHE[cache_key] = (config_mtime, remote)
+    return dict(remote)
+
+
+def _open_pygit2_repo(root: Path):
+    """可选依赖 pygit2：安装时直接用 libgit2 读取仓库，免去 git 子进程；打开失败返回 None 走子进程。"""
+    if not HAS_PYGIT2:
+        return None
+    try:
+        return pygit2.Repository(str(root), flags=RepositoryOpenFlag.NO_SEARCH)
+    except (pygit2.GitError, OSError, ValueError):
+        return None
+
+
+def _pick_fetch_remote(fetch_remotes: List[Dict[str, str]]) -> Dict[str, str]:
+    if not fetch_remotes:
+        return {}
+    for item in fetch_remotes:
+        if item.get("slug"):
+            return item
+    return fetch_remotes[0]
+
+
+def _detect_repo_remote_uncached(root: Path) -> Dict[str, str]:
+    repo = _open_pygit2_repo(root)
+    if repo is not None:
+        try:
+            remotes = {remote.name: remote.url for remote in repo.remotes}
+        except pygit2.GitError:
+            remotes = None
+        if remotes is not None:
+            if remotes.get("origin"):
+                url = remotes["origin"]
+                return {"name": "origin", "url": url, "slug": _parse_repo_slug(url) or ""}
+            return _pick_fetch_remote(
+                [{"name": name, "url": url, "slug": _parse_repo_slug(url) or ""} for name, url in remotes.items() if url]
+            )
+
     result = _run_cmd(["git", "config", "--get", "remote.origin.url"], root, timeout=10)
     if result.returncode == 0 and result.stdout.strip():
         url = result.stdout.strip()
@@ -299,31 +615,165 @@ def detect_repo_remote(repo_root: Optional[str] = None) -> Dict[str, str]:
         if kind != "(fetch)":
             continue
         fetch_remotes.append({"name": name, "url": url, "slug": _parse_repo_slug(url) or ""})
+    return _pick_fetch_remote(fetch_remotes)
 
-    if not fetch_remotes:
-        return {}
 
-    for item in fetch_remotes:
-        if item.get("slug"):
-            return item
-    return fetch_remotes[0]
+# 当前版本信息缓存：仓库路径 -> (HEAD 相关文件指纹, info)
+_REPO_INFO_CACHE: Dict[str, Any] = {}
+# HEAD 切换/提交（HEAD 与其 reflog）及 tag 增删（packed-refs 与 refs/tags）都会改动这些文件的 mtime
+_REPO_INFO_STAMP_FILES = ("HEAD", "logs/HEAD", "packed-refs", "refs/tags")
+
+
+def _repo_info_stamp(root: Path) -> Optional[tuple]:
+    git_dir = root / ".git"
+    if not git_dir.is_dir():
+        return None
+    stamp = []
+    for name in _REPO_INFO_STAMP_FILES:
+        try:
+            stamp.append(os.stat(git_dir / name).st_mtime_ns)
+        except OSError:
+            stamp.append(None)
+    return tuple(stamp)
+
+
+def _get_cached_repo_info(root: Path, stamp: Optional[tuple]) -> Optional[Dict[str, Any]]:
+    if stamp is None:
+        return None
+    cached = _REPO_INFO_CACHE.get(str(root))
+    if cached is not None and cached[0] == stamp:
+        return dict(cached[1])
+    return None
+
+
+def _store_repo_info(root: Path, stamp: Optional[tuple], info: Dict[str, Any]) -> Dict[str, Any]:
+    if stamp is not None and info.get("commit"):
+        _REPO_INFO_CACHE[str(root)] = (stamp, info)
+    return dict(info)
+
+
+def _invalidate_caches(root: Path) -> None:
+    """切换 HEAD 后主动丢弃版本信息缓存，不依赖文件 mtime 的精度。"""
+    _REPO_INFO_CACHE.pop(str(root), None)
+
+
+def _checkout(root: Path, ref: str) -> subprocess.CompletedProcess:
+    res = _run_cmd(["git", "checkout", ref], root, timeout=60)
+    _invalidate_caches(root)
+    return res
 
 
 def get_current_repo_info(repo_root: Optional[str] = None) -> Dict[str, Any]:
     root = _repo_root(repo_root)
+    stamp = _repo_info_stamp(root)
+    cached = _get_cached_repo_info(root, stamp)
+    if cached is not None:
+        return cached
+    return _store_repo_info(root, stamp, _get_current_repo_info_uncached(root))
+
+
+async def get_current_repo_info_async(repo_root: Optional[str] = None) -> Dict[str, Any]:
+    """get_current_repo_info 的异步版本：缓存未命中时两条 git 命令并发执行。"""
+    root = _repo_root(repo_root)
+    stamp = _repo_info_stamp(root)
+    cached = _get_cached_repo_info(root, stamp)
+    if cached is not None:
+        return cached
+
+    info = _repo_info_from_pygit2(root)
+    if info is None:
+        commit, branch, tags = _parse_head_output(await _run_cmd_async(_HEAD_CMD, root))
+        if not commit:
+            branch_res = await _run_cmd_async(["git", "branch", "--show-current"], root)
+            branch = branch_res.stdout.strip() if branch_res.returncode == 0 else ""
+        describe = _describe_from_tags(commit, tags)
+        if not describe:
+            describe_res = await _run_cmd_async(_DESCRIBE_CMD, root)
+            describe = describe_res.stdout if describe_res.returncode == 0 else ""
+        info = _build_repo_info(commit, branch, describe)
+    return _store_repo_info(root, stamp, info)
+
+
+def _repo_info_from_pygit2(root: Path) -> Optional[Dict[str, Any]]:
+    repo = _open_pygit2_repo(root)
+    if repo is None:
+        return None
+    try:
+        head = repo.head
+        commit = str(head.target)
+        branch = "" if repo.head_is_detached else head.shorthand
+    except pygit2.GitError:
+        return None
+    try:
+        describe = repo.describe(describe_strategy=DescribeStrategy.TAGS, always_use_long_format=True)
+    except (KeyError, pygit2.GitError):
+        describe = ""
+    return _build_repo_info(commit, branch, describe)
+
+
+def _get_current_repo_info_uncached(root: Path) -> Dict[str, Any]:
+    info = _repo_info_from_pygit2(root)
+    if info is not None:
+        return info
+
+    commit, branch, tags = _parse_head_output(_run_cmd(_HEAD_CMD, root))
+    if not commit:
+        branch_res = _run_cmd(["git", "branch", "--show-current"], root)
+        branch = branch_res.stdout.strip() if branch_res.returncode == 0 else ""
+
+    # HEAD 上有 tag 时一次 git log 即可取齐，仅在不位于 tag 时才需要 describe 找最近 tag
+    describe = _describe_from_tags(commit, tags)
+    if not describe:
+        describe_res = _run_cmd(_DESCRIBE_CMD, root)
+        describe = describe_res.stdout if describe_res.returncode == 0 else ""
+    return _build_repo_info(commit, branch, describe)
 
-    commit_res = _run_cmd(["git", "rev-parse", "HEAD"], root)
-    commit = commit_res.stdout.strip() if commit_res.returncode == 0 else ""
-    short_commit = commit[:8] if commit else ""
 
-    branch_res = _run_cmd(["git", "branch", "--show-current"], root)
-    branch = branch_res.stdout.strip() if branch_res.returncode == 0 else ""
+# 一次 git log 同时取 HEAD 提交与其上的引用（当前分支 "HEAD -> main"、tag "tag: v1.0.7"）；
+# 固定 log.decorate=short，避免用户配置成 full 后引用带 refs/ 前缀
+_HEAD_CMD = ["git", "-c", "log.decorate=short", "log", "-1", "--format=%H%n%D", "HEAD"]
+_DESCRIBE_CMD = ["git", "describe", "--tags", "--long"]
 
-    tag_exact_res = _run_cmd(["git", "describe", "--tags", "--exact-match"], root)
-    current_tag = tag_exact_res.stdout.strip() if tag_exact_res.returncode == 0 else ""
 
-    nearest_tag_res = _run_cmd(["git", "describe", "--tags", "--abbrev=0"], root)
-    nearest_tag = nearest_tag_res.stdout.strip() if nearest_tag_res.returncode == 0 else ""
+def _parse_head_output(head_res: subprocess.CompletedProcess) -> Tuple[str, str, List[str]]:
+    """解析 git log 输出为 (commit, branch, HEAD 上的 tag 列表)；失败时 commit 为空，分离 HEAD 时 branch 为空。"""
+    lines = head_res.stdout.splitlines() if head_res.returncode == 0 else []
+    commit = lines[0].strip() if lines else ""
+    if not commit:
+        return "", "", []
+    branch = ""
+    tags: List[str] = []
+    for ref in (lines[1] if len(lines) > 1 else "").split(", "):
+        ref = ref.strip()
+        if ref.startswith("HEAD -> "):
+            branch = ref[len("HEAD -> "):]
+        elif ref.startswith("tag: "):
+            tags.append(ref[len("tag: "):])
+    return commit, branch, tags
+
+
+def _tag_version_key(tag: str) -> Tuple[Tuple[int, ...], str]:
+    return tuple(int(part) for part in re.findall(r"\d+", tag)), tag
+
+
+def _describe_from_tags(commit: str, tags: List[str]) -> str:
+    """HEAD 恰好位于 tag 时拼出与 describe --long 相同格式的结果；多个 tag 取版本号最高者。"""
+    if not commit or not tags:
+        return ""
+    return f"{max(tags, key=_tag_version_key)}-0-g{commit[:7]}"
+
+
+def _build_repo_info(commit: str, branch: str, describe: str) -> Dict[str, Any]:
+    short_commit = commit[:8] if commit else ""
+
+    # describe --long 恒输出 <tag>-<距离>-g<提交>，距离为 0 即 HEAD 恰好位于该 tag
+    nearest_tag = ""
+    current_tag = ""
+    parts = describe.strip().rsplit("-", 2)
+    if len(parts) == 3:
+        nearest_tag = parts[0]
+        if parts[1] == "0":
+            current_tag = nearest_tag
 
     display_version = current_tag or (f"{branch}@{short_commit}" if branch else short_commit or "unknown")
     return {
@@ -371,7 +821,12 @@ def _list_recent_commits(root: Path, ref: str, limit: int) -> List[Dict[str, str
     return entries
 
 
-def _resolve_remote_ref(root: Path, remote_name: str, preferred_branch: str = "") -> str:
+def _resolve_remote_ref(
+    root: Path,
+    remote_name: str,
+    preferred_branch: str = "",
+    session: Optional[_GitSession] = None,
+) -> str:
     if not remote_name:
         return ""
 
@@ -391,58 +846,59 @@ def _resolve_remote_ref(root: Path, remote_name: str, preferred_branch: str = ""
         if not ref or ref in seen:
             continue
         seen.add(ref)
+        if session is not None:
+            if session.resolve(ref):
+                return ref
+            continue
         verify = _run_cmd(["git", "rev-parse", "--verify", ref], root, timeout=10)
         if verify.returncode == 0:
             return ref
     return ""
 
 
-def _list_version_tags(root: Path, limit: int = 0) -> List[str]:
-    tags_res = _run_cmd(["git", "tag", "--list", "v*", "--sort=-version:refname"], root, timeout=20)
-    if tags_res.returncode != 0:
-        return []
-    tags = [line.strip() for line in tags_res.stdout.splitlines() if line.strip()]
-    if limit and limit > 0:
-        return tags[:limit]
-    return tags
-
-
-def _get_tag_date(root: Path, tag: str) -> str:
-    date_res = _run_cmd(["git", "log", "-1", "--format=%cs", tag], root, timeout=10)
-    if date_res.returncode != 0:
-        return ""
-    return date_res.stdout.strip()
-
+# 版本 tag 列表一次取齐：名称、提交日期（附注 tag 取其指向提交）、摘要（附注 tag 说明为空时回退提交标题）、指向的提交
+_VERSION_TAG_FORMAT = (
+    "%(refname:strip=2)%1f"
+    "%(if)%(*objectname)%(then)%(*committerdate:short)%(else)%(committerdate:short)%(end)%1f"
+    "%(subject)%1f%(*subject)%1f"
+    "%(if)%(*objectname)%(then)%(*objectname)%(else)%(objectname)%(end)"
+)
 
-def _get_tag_summary(root: Path, tag: str) -> str:
-    summary_res = _run_cmd(["git", "for-each-ref", f"refs/tags/{tag}", "--format=%(subject)"], root, timeout=10)
-    summary = summary_res.stdout.strip() if summary_res.returncode == 0 else ""
-    if summary:
-        return summary
-    commit_subject_res = _run_cmd(["git", "log", "-1", "--format=%s", tag], root, timeout=10)
-    if commit_subject_res.returncode != 0:
-        return ""
-    return commit_subject_res.stdout.strip()
 
+def _list_version_tag_entries(
+    root: Path,
+    session: Optional[_GitSession] = None,
+    tag_by_commit: Optional[Dict[str, str]] = None,
+) -> List[Dict[str, str]]:
+    """按版本号倒序返回 tag 列表；传入 tag_by_commit 时顺带填充 提交 -> 最高版本 tag 映射。"""
+    if session is not None:
+        res = session.for_each_ref("refs/tags/v*", _VERSION_TAG_FORMAT, sort="-version:refname")
+    else:
+        res = _run_cmd(
+            ["git", "for-each-ref", "--sort=-version:refname", f"--format={_VERSION_TAG_FORMAT}", "refs/tags/v*"],
+            root,
+            timeout=20,
+        )
+    if res.returncode != 0:
+        return []
 
-def _get_commit_tag(root: Path, commit: str) -> str:
-    if not commit:
-        return ""
-    tag_res = _run_cmd(
-        ["git", "tag", "--list", "v*", "--points-at", commit, "--sort=-version:refname"],
-        root,
-        timeout=10,
-    )
-    if tag_res.returncode != 0:
-        return ""
-    for line in tag_res.stdout.splitlines():
-        tag = line.strip()
-        if tag:
-            return tag
-    return ""
+    entries: List[Dict[str, str]] = []
+    for line in res.stdout.splitlines():
+        parts = line.split("\x1f")
+        if len(parts) != 5 or not parts[0].strip():
+            continue
+        tag, date, subject, commit_subject, commit = (part.strip() for part in parts)
+        entries.append({"tag": tag, "date": date, "summary": subject or commit_subject})
+        if tag_by_commit is not None and commit:
+            tag_by_commit.setdefault(commit, tag)
+    return entries
 
 
-def list_version_catalog(repo_root: Optional[str] = None, limit: int = 20) -> Dict[str, Any]:
+def list_version_catalog(
+    repo_root: Optional[str] = None,
+    limit: int = 20,
+    session: Optional[_GitSession] = None,
+) -> Dict[str, Any]:
     """
     版本目录（面向公开仓库）：
     - 历史版本（tag）及摘要
@@ -457,18 +913,19 @@ def list_version_catalog(repo_root: Optional[str] = None, limit: int = 20) -> Di
 
     fetch_warning = ""
     if remote_name:
-        fetch_main_res = _run_cmd(["git", "fetch", remote_name], root, timeout=120)
-        if fetch_main_res.returncode != 0:
-            fetch_warning = (fetch_main_res.stderr or fetch_main_res.stdout).strip()[:200]
-        fetch_tag_res = _git_fetch_tags(root, remote_name, github_token)
-        if fetch_tag_res.returncode != 0 and not fetch_warning:
-            fetch_warning = (fetch_tag_res.stderr or fetch_tag_res.stdout).strip()[:200]
-
-    all_tags = _list_version_tags(root)
-    remote_ref = _resolve_remote_ref(root, remote_name, current.get("branch", ""))
-    remote_commits = _list_recent_commits(root, remote_ref, max(1, int(limit)) if isinstance(limit, int) else 20)
+        fetch_res = _git_fetch_tags(root, remote_name, github_token)
+        if fetch_res.returncode != 0:
+            fetch_warning = (fetch_res.stderr or fetch_res.stdout).strip()[:200]
+
+    # 远端最新提交对应的 tag 直接从 tag 列表的提交映射中查出，无需再逐个 `git tag --points-at`
+    tag_by_commit: Dict[str, str] = {}
+    tag_entries = _list_version_tag_entries(root, session, tag_by_commit)
+    all_tags = [entry["tag"] for entry in tag_entries]
+    max_entries = max(1, int(limit)) if isinstance(limit, int) else 20
+    remote_ref = _resolve_remote_ref(root, remote_name, current.get("branch", ""), session)
+    remote_commits = _list_recent_commits(root, remote_ref, max_entries)
     remote_head = remote_commits[0] if remote_commits else {}
-    remote_head_tag = _get_commit_tag(root, remote_head.get("commit", ""))
+    remote_head_tag = tag_by_commit.get(remote_head.get("commit", ""), "")
     pending_commits_count = 0
     if remote_ref:
         pending_count_res = _run_cmd(["git", "rev-list", "--count", f"HEAD..{remote_ref}"], root, timeout=20)
@@ -478,11 +935,17 @@ def list_version_catalog(repo_root: Optional[str] = None, limit: int = 20) -> Di
             except ValueError:
                 pending_commits_count = 0
 
+    # HEAD 恰好位于某个 tag 时，日期直接取 tag 列表中的提交日期，省去一次 git show
+    current_date = next(
+        (entry["date"] for entry in tag_entries if entry["tag"] == current.get("current_tag") and entry["date"]),
+        "",
+    ) or _get_ref_date(root, "HEAD")
+
     if not all_tags:
         return {
             "success": True,
             "current": current,
-            "current_date": _get_ref_date(root, "HEAD"),
+            "current_date": current_date,
             "latest_tag": "",
             "current_tag": current.get("current_tag", ""),
             "pending_tags": [],
@@ -496,18 +959,7 @@ def list_version_catalog(repo_root: Optional[str] = None, limit: int = 20) -> Di
             "fetch_warning": fetch_warning,
         }
 
-    max_entries = max(1, int(limit)) if isinstance(limit, int) else 20
-    display_tags = all_tags[:max_entries]
-
-    entries: List[Dict[str, str]] = []
-    for tag in display_tags:
-        entries.append(
-            {
-                "tag": tag,
-                "date": _get_tag_date(root, tag),
-                "summary": _get_tag_summary(root, tag),
-            }
-        )
+    entries = tag_entries[:max_entries]
 
     current_tag = current.get("current_tag", "") or current.get("nearest_tag", "")
     pending_tags: List[str] = []
@@ -518,14 +970,10 @@ def list_version_catalog(repo_root: Optional[str] = None, limit: int = 20) -> Di
     else:
         pending_tags = list(all_tags)
 
-    remote_commits = _list_recent_commits(root, remote_ref, max_entries)
-    remote_head = remote_commits[0] if remote_commits else remote_head
-    remote_head_tag = _get_commit_tag(root, remote_head.get("commit", ""))
-
     return {
         "success": True,
         "current": current,
-        "current_date": _get_ref_date(root, "HEAD"),
+        "current_date": current_date,
         "latest_tag": all_tags[0],
         "current_tag": current.get("current_tag", ""),
         "pending_tags": pending_tags,
@@ -540,6 +988,14 @@ def list_version_catalog(repo_root: Optional[str] = None, limit: int = 20) -> Di
     }
 
 
+# 最新 tag 短时缓存：仓库路径 -> (monotonic 时间, tag)；TTL 内重复“更新到最新”不再 fetch + 列 tag
+_LATEST_TAG_CACHE: Dict[str, Any] = {}
+
+
+def clear_latest_tag_cache() -> None:
+    _LATEST_TAG_CACHE.clear()
+
+
 def update_to_version(repo_root: Optional[str] = None, target: Optional[str] = None) -> Dict[str, Any]:
     """
     更新到指定版本（tag/commit/branch），若未指定则更新到最新 tag。
@@ -549,14 +1005,23 @@ def update_to_version(repo_root: Optional[str] = None, target: Optional[str] = N
     if target_ref:
         return update_to_ref(repo_root, target_ref)
 
-    catalog = list_version_catalog(repo_root, limit=1)
-    if not catalog.get("success"):
-        return {"success": False, "error": catalog.get("error", "获取版本列表失败")}
-    latest_tag = catalog.get("latest_tag", "")
-    if not latest_tag:
-        return {"success": False, "error": "未找到可更新的版本标签"}
-
-    result = update_to_ref(repo_root, latest_tag)
+    # 查询版本目录与切换版本共用一个 git 会话
+    root = _repo_root(repo_root)
+    with _GitSession(root) as session:
+        cache_key = str(root)
+        cached = _LATEST_TAG_CACHE.get(cache_key)
+        if cached and time.monotonic() - cached[0] < LATEST_TAG_CACHE_TTL:
+            latest_tag = cached[1]
+        else:
+            catalog = list_version_catalog(repo_root, limit=1, session=session)
+            if not catalog.get("success"):
+                return {"success": False, "error": catalog.get("error", "获取版本列表失败")}
+            latest_tag = catalog.get("latest_tag", "")
+            if not latest_tag:
+                return {"success": False, "error": "未找到可更新的版本标签"}
+            _LATEST_TAG_CACHE[cache_key] = (time.monotonic(), latest_tag)
+
+        result = update_to_ref(repo_root, latest_tag, session=session)
     if result.get("success"):
         result["resolved_target"] = latest_tag
     return result
@@ -575,35 +1040,133 @@ def reback_to_version(repo_root: Optional[str] = None, target: Optional[str] = N
     return result
 
 
-def get_latest_release(repo_slug: str, timeout: int = 10, github_token: str = "") -> Dict[str, Any]:
+# 最新 release 的条件请求缓存：repo_slug -> {"etag", "last_modified", "fetched_at", "release"}
+_RELEASE_ETAG_CACHE: Dict[str, Dict[str, Any]] = {}
+_RELEASE_CACHE_LOCK = threading.Lock()
+# GitHub 速率限制耗尽时的恢复时间戳（X-RateLimit-Reset），到点前不再发请求
+_RELEASE_RATE_LIMIT_RESET = 0.0
+
+
+def _release_cache_path(root: Path, repo_slug: str) -> Path:
+    digest = hashlib.blake2b(repo_slug.encode("utf-8"), digest_size=8).hexdigest()
+    return root / CACHE_DIR / f"release_{digest}.json"
+
+
+# GitHub API 复用同一个 requests.Session：连接池保活，省去每次检查的 TCP/TLS 握手
+_HTTP_SESSION = None
+_HTTP_SESSION_LOCK = threading.Lock()
+
+
+def _get_http_session():
+    global _HTTP_SESSION
+    session = _HTTP_SESSION
+    if session is not None:
+        return session
+    with _HTTP_SESSION_LOCK:
+        if _HTTP_SESSION is None:
+            # 延迟导入：仅检查发布时才加载 requests/urllib3
+            import requests
+            from requests.adapters import HTTPAdapter
+            from urllib3.util.retry import Retry
+
+            session = requests.Session()
+            session.headers.update(GITHUB_API_HEADERS)
+            retry = Retry(
+                total=HTTP_RETRY_TOTAL,
+                backoff_factor=HTTP_RETRY_BACKOFF,
+                status_forcelist=list(HTTP_RETRY_STATUSES),
+                raise_on_status=False,
+            )
+            session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=retry))
+            _HTTP_SESSION = session
+        return _HTTP_SESSION
+
+
+def _prepare_release_request(repo_slug: str, github_token: str, repo_root: Optional[str]) -> Dict[str, Any]:
+    """
+    组装 release 请求：URL、条件请求头与缓存。
+    缓存仍新鲜、或速率限制尚未恢复时，fresh 为可直接返回的结果（限流期间优先返回旧缓存）。
+    """
     url = f"https://api.github.com/repos/{repo_slug}/releases/latest"
-    headers = {"Accept": "application/vnd.github+json"}
+    headers: Dict[str, str] = {}
     token = (github_token or "").strip()
     if token:
-        headers["Authorization"] = f"token {token}"
+        headers["Authorization"] = f"Bearer {token}"
+
+    cache_path = _release_cache_path(_repo_root(repo_root), repo_slug) if repo_root else None
+    with _RELEASE_CACHE_LOCK:
+        cached = _RELEASE_ETAG_CACHE.get(repo_slug)
+    if cached is None and cache_path is not None:
+        cached = _load_json(cache_path, default={})
+    cached = cached or {}
+    fresh = None
+    now = time.time()
+    if now < _RELEASE_RATE_LIMIT_RESET:
+        if cached.get("release"):
+            fresh = dict(cached["release"])
+        else:
+            fresh = _rate_limited_result(url, _RELEASE_RATE_LIMIT_RESET)
+    if cached.get("release"):
+        if now - float(cached.get("fetched_at") or 0) < RELEASE_CACHE_FRESH_SECONDS:
+            fresh = dict(cached["release"])
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+    return {"url": url, "headers": headers, "cached": cached, "cache_path": cache_path, "fresh": fresh}
+
+
+def _rate_limited_result(url: str, reset: float) -> Dict[str, Any]:
+    reset_text = time.strftime("%H:%M:%S", time.localtime(reset))
+    return {
+        "success": False,
+        "error": f"GitHub API 速率限制已用尽，{reset_text} 后恢复（配置 GitHub Token 可提高额度）",
+        "url": url,
+        "reset": int(reset),
+    }
 
-    try:
-        response = requests.get(url, headers=headers, timeout=timeout)
-    except Exception as e:
-        return {
-            "success": False,
-            "error": f"请求 GitHub 失败: {str(e)}",
-            "url": url,
-        }
 
-    if response.status_code != 200:
-        if response.status_code in {401, 403, 404}:
+def _handle_release_response(
+    repo_slug: str,
+    request: Dict[str, Any],
+    status_code: int,
+    response_headers: Any,
+    data: Optional[Dict[str, Any]],
+) -> Dict[str, Any]:
+    """解析 release 响应（data 仅在 200 时提供）并更新 ETag 缓存。"""
+    global _RELEASE_RATE_LIMIT_RESET
+    url = request["url"]
+    cached = request["cached"]
+    response_headers = response_headers or {}
+    if status_code == 304 and cached.get("release"):
+        cached = dict(cached, fetched_at=time.time())
+        with _RELEASE_CACHE_LOCK:
+            _RELEASE_ETAG_CACHE[repo_slug] = cached
+        return dict(cached["release"], not_modified=True)
+
+    if status_code in {403, 429} and response_headers.get("X-RateLimit-Remaining") == "0":
+        try:
+            reset = float(response_headers.get("X-RateLimit-Reset") or 0)
+        except (TypeError, ValueError):
+            reset = 0.0
+        reset = max(reset, time.time() + 60)
+        with _RELEASE_CACHE_LOCK:
+            _RELEASE_RATE_LIMIT_RESET = reset
+        return _rate_limited_result(url, reset)
+
+    if status_code != 200:
+        if status_code in {401, 403, 404}:
             hint = "（私有仓库请配置 GitHub Token：环境变量 YDXBOT_GITHUB_TOKEN/GITHUB_TOKEN，或 config/global_config.json -> update.github_token）"
         else:
             hint = ""
         return {
             "success": False,
-            "error": f"GitHub API 返回 {response.status_code}{hint}",
+            "error": f"GitHub API 返回 {status_code}{hint}",
             "url": url,
         }
 
-    data = response.json()
-    return {
+    data = data or {}
+    release = {
         "success": True,
         "tag_name": data.get("tag_name", ""),
         "name": data.get("name", ""),
@@ -612,18 +1175,162 @@ def get_latest_release(repo_slug: str, timeout: int = 10, github_token: str = ""
         "body": data.get("body", ""),
     }
 
+    etag = response_headers.get("ETag", "")
+    last_modified = response_headers.get("Last-Modified", "")
+    if etag or last_modified:
+        entry = {"etag": etag, "last_modified": last_modified, "fetched_at": time.time(), "release": release}
+        with _RELEASE_CACHE_LOCK:
+            _RELEASE_ETAG_CACHE[repo_slug] = entry
+        cache_path = request["cache_path"]
+        if cache_path is not None:
+            try:
+                cache_path.parent.mkdir(parents=True, exist_ok=True)
+                _save_json(cache_path, entry)
+            except OSError:
+                pass
+    return dict(release)
+
+
+def get_latest_release(
+    repo_slug: str,
+    timeout: int = 10,
+    github_token: str = "",
+    repo_root: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    查询最新 release。
+    距上次拉取不足 RELEASE_CACHE_FRESH_SECONDS 时直接返回缓存，不发请求；
+    否则带 ETag/Last-Modified 条件请求，GitHub 返回 304 时复用上次结果（不计入速率限制）；
+    传入 repo_root 时缓存同时落盘到 .cache/，进程重启后仍可复用。
+    """
+    request = _prepare_release_request(repo_slug, github_token, repo_root)
+    if request["fresh"] is not None:
+        return request["fresh"]
+
+    try:
+        response = _get_http_session().get(request["url"], headers=request["headers"], timeout=timeout)
+    except Exception as e:
+        return {
+            "success": False,
+            "error": f"请求 GitHub 失败: {str(e)}",
+            "url": request["url"],
+        }
+
+    data = response.json() if response.status_code == 200 else None
+    return _handle_release_response(repo_slug, request, response.status_code, getattr(response, "headers", None), data)
+
+
+async def get_latest_release_async(
+    repo_slug: str,
+    timeout: int = 10,
+    github_token: str = "",
+    repo_root: Optional[str] = None,
+) -> Dict[str, Any]:
+    """get_latest_release 的异步版本（aiohttp），缓存与返回结构一致。"""
+    import aiohttp
+
+    request = _prepare_release_request(repo_slug, github_token, repo_root)
+    if request["fresh"] is not None:
+        return request["fresh"]
+
+    # aiohttp 没有重试适配器，按同步会话的策略手动退避重试
+    for attempt in range(HTTP_RETRY_TOTAL + 1):
+        if attempt:
+            await asyncio.sleep(HTTP_RETRY_BACKOFF * 2 ** (attempt - 1))
+        try:
+            # 与通知推送共用进程内会话（trust_env 代理一致）；GitHub 公共请求头逐次附带
+            async with get_aio_session().get(
+                request["url"],
+                headers={**GITHUB_API_HEADERS, **request["headers"]},
+                timeout=aiohttp.ClientTimeout(total=timeout),
+            ) as response:
+                status_code = response.status
+                if status_code in HTTP_RETRY_STATUSES and attempt < HTTP_RETRY_TOTAL:
+                    continue
+                data = await response.json(content_type=None) if status_code == 200 else None
+                response_headers = response.headers
+                break
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            if attempt < HTTP_RETRY_TOTAL:
+                continue
+            return {
+                "success": False,
+                "error": f"请求 GitHub 失败: {str(e)}",
+                "url": request["url"],
+            }
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"请求 GitHub 失败: {str(e)}",
+                "url": request["url"],
+            }
+    return _handle_release_response(repo_slug, request, status_code, response_headers, data)
+
+
+# 状态/缓存文件解析缓存：路径 -> ((mtime_ns, size), data)；_save_json 写穿，文件被外部改写后自动失效
+_JSON_FILE_CACHE: Dict[str, Any] = {}
+
+
+def _file_stamp(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
 
 def _load_json(path: Path, default: Dict[str, Any]) -> Dict[str, Any]:
-    if not path.exists():
+    """读取 JSON 文件；文件未改动时直接返回缓存的浅拷贝，不再读盘解析。"""
+    stamp = _file_stamp(path)
+    if stamp is None:
         return dict(default)
+    cached = _JSON_FILE_CACHE.get(str(path))
+    if cached is not None and cached[0] == stamp:
+        return dict(cached[1])
     try:
-        return json.loads(path.read_text(encoding="utf-8"))
+        if HAS_ORJSON:
+            data = orjson.loads(path.read_bytes())
+        else:
+            data = json.loads(path.read_text(encoding="utf-8"))
     except Exception:
         return dict(default)
+    if not isinstance(data, dict):
+        return data
+    _JSON_FILE_CACHE[str(path)] = (stamp, data)
+    return dict(data)
+
+
+def _dump_json(payload: Dict[str, Any]) -> bytes:
+    """编码为带缩进的 UTF-8 JSON 字节（优先 orjson，直接产出 bytes）。"""
+    if HAS_ORJSON:
+        return orjson.dumps(payload, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS) + b"\n"
+    return (json.dumps(payload, ensure_ascii=False, indent=2) + "\n").encode("utf-8")
 
 
 def _save_json(path: Path, payload: Dict[str, Any]) -> None:
-    path.write_text(json.dumps(payload, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    # 内容未变化时不重写文件：缓存仍对应磁盘文件时直接比较对象，免去编码与读盘
+    cached = _JSON_FILE_CACHE.get(str(path))
+    if cached is not None and cached[1] == payload and cached[0] == _file_stamp(path):
+        return
+    data = _dump_json(payload)
+    try:
+        if path.read_bytes() == data:
+            return
+    except OSError:
+        pass
+
+    # 先写临时文件再 os.replace，读方只会看到完整的旧文件或新文件
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            tmp_path.unlink()
+        except OSError:
+            pass
+        raise
+    _JSON_FILE_CACHE[str(path)] = (_file_stamp(path), dict(payload))
 
 
 def get_release_state(repo_root: Optional[str] = None) -> Dict[str, Any]:
@@ -631,36 +1338,26 @@ def get_release_state(repo_root: Optional[str] = None) -> Dict[str, Any]:
     return _load_json(root / RELEASE_STATE_FILE, default={})
 
 
-def mark_release_notified(tag_name: str, repo_root: Optional[str] = None) -> None:
+def update_release_state(repo_root: Optional[str] = None, **fields: Any) -> None:
+    """合并写入 release 状态：一次读取、一次落盘；字段均未变化时不写文件。"""
     root = _repo_root(repo_root)
     state = get_release_state(root)
-    state["last_notified_tag"] = tag_name
+    if all(state.get(key) == value for key, value in fields.items()):
+        return
+    state.update(fields)
     state["updated_at"] = int(time.time())
     _save_json(root / RELEASE_STATE_FILE, state)
 
 
-def mark_release_applied(tag_name: str, repo_root: Optional[str] = None) -> None:
-    root = _repo_root(repo_root)
-    state = get_release_state(root)
-    state["last_applied_tag"] = tag_name
-    state["updated_at"] = int(time.time())
-    _save_json(root / RELEASE_STATE_FILE, state)
+def mark_release_notified(tag_name: str, repo_root: Optional[str] = None) -> None:
+    update_release_state(repo_root, last_notified_tag=tag_name)
 
 
-def check_release_update(repo_root: Optional[str] = None) -> Dict[str, Any]:
-    root = _repo_root(repo_root)
-    info = get_current_repo_info(root)
-    remote = detect_repo_remote(root)
-    repo_slug = remote.get("slug", "")
-    if not repo_slug:
-        return {
-            "success": False,
-            "error": "无法识别 GitHub 仓库地址(remote.origin.url)",
-            "current": info,
-        }
+def mark_release_applied(tag_name: str, repo_root: Optional[str] = None) -> None:
+    update_release_state(repo_root, last_applied_tag=tag_name)
 
-    github_token = resolve_github_token(root, remote.get("url", ""))
-    latest = get_latest_release(repo_slug, github_token=github_token)
+
+def _build_release_check_result(info: Dict[str, Any], repo_slug: str, latest: Dict[str, Any]) -> Dict[str, Any]:
     if not latest.get("success"):
         return {
             "success": False,
@@ -682,100 +1379,199 @@ def check_release_update(repo_root: Optional[str] = None) -> Dict[str, Any]:
     }
 
 
+def _missing_slug_result(info: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "success": False,
+        "error": "无法识别 GitHub 仓库地址(remote.origin.url)",
+        "current": info,
+    }
+
+
+def check_release_update(repo_root: Optional[str] = None) -> Dict[str, Any]:
+    root = _repo_root(repo_root)
+    info = get_current_repo_info(root)
+    remote = detect_repo_remote(root)
+    repo_slug = remote.get("slug", "")
+    if not repo_slug:
+        return _missing_slug_result(info)
+
+    github_token = resolve_github_token(root, remote.get("url", ""))
+    latest = get_latest_release(repo_slug, github_token=github_token, repo_root=str(root))
+    result = _build_release_check_result(info, repo_slug, latest)
+    if result.get("success") and result.get("has_update"):
+        # 手动检查发现新版本时唤醒周期循环，尽快向管理员推送通知
+        trigger_release_check()
+    return result
+
+
+async def check_release_update_async(repo_root: Optional[str] = None) -> Dict[str, Any]:
+    """
+    check_release_update 的异步版本：版本信息与 release 请求都在事件循环内完成。
+    远端与 token 读取走 mtime 缓存，命中时不触发 IO，直接同步调用。
+    """
+    root = _repo_root(repo_root)
+    info = await get_current_repo_info_async(root)
+    remote = detect_repo_remote(root)
+    repo_slug = remote.get("slug", "")
+    if not repo_slug:
+        return _missing_slug_result(info)
+
+    github_token = resolve_github_token(root, remote.get("url", ""))
+    latest = await get_latest_release_async(repo_slug, github_token=github_token, repo_root=str(root))
+    return _build_release_check_result(info, repo_slug, latest)
+
+
+_RUNTIME_EXACT_PATHS = frozenset((
+    "state.json",
+    "account_funds.json",
+    "MULTIUSER_TEST_RESULTS.json",
+    "shared/global.local.json",
+    "shared/global.json",
+    "config/global.local.json",
+    "config/global.json",
+    "config/global_config.json",
+    "global.json",
+    RELEASE_STATE_FILE,
+    ROLLBACK_FILE,
+    UPDATE_LOCK_FILE,
+))
+
+# 运行时产物匹配（精确路径走 _RUNTIME_EXACT_PATHS 集合）：日志/会话文件、测试与 legacy 用户目录、缓存目录、账号目录下的敏感文件
+_RUNTIME_FILE_RE = re.compile(
+    r"(?:^|/)\.DS_Store$"
+    r"|\.log$|\.log\.[^/]*$"
+    r"|\.session(?:-journal|-wal|-shm)?$"
+    r"|^(?:tests_multiuser/users|user|" + re.escape(CACHE_DIR) + r")/"
+    # users/<账号>/... 下的配置与状态（"_" 开头的模板目录除外）
+    r"|^users/+[^_/][^/]*/(?:.*/)?(?:config\.json|state\.json|account_funds\.json|[^/]*_config\.json)$"
+)
+
+
+# 每次检查出现的运行时文件基本相同，按路径记忆分类结果
+@lru_cache(maxsize=4096)
 def _is_runtime_file(path: str) -> bool:
     if not path:
         return True
     normalized = path.replace("\\", "/")
-    filename = Path(normalized).name
-    parts = [p for p in normalized.split("/") if p]
-    if filename == ".DS_Store":
-        return True
-    if normalized in {"state.json", "account_funds.json", "MULTIUSER_TEST_RESULTS.json"}:
-        return True
-    if normalized.endswith(".log"):
-        return True
-    if ".log." in filename:
-        return True
-    if normalized.endswith(".session") or normalized.endswith(".session-journal"):
-        return True
-    if normalized.endswith(".session-wal") or normalized.endswith(".session-shm"):
-        return True
-    if normalized in {
-        "shared/global.local.json",
-        "shared/global.json",
-        "config/global.local.json",
-        "config/global.json",
-        "config/global_config.json",
-        "global.json",
-    }:
-        return True
-    if normalized.startswith("tests_multiuser/users/"):
-        return True
-    if normalized.startswith("user/"):
-        # legacy 单用户目录统一视为运行时数据
-        return True
-    if len(parts) >= 3 and parts[0] == "users" and not parts[1].startswith("_"):
-        user_sensitive = {"config.json", "state.json", "account_funds.json"}
-        if filename in user_sensitive:
-            return True
-        if filename.endswith("_config.json"):
-            return True
-        if filename.endswith(".session") or filename.endswith(".session-journal"):
-            return True
-        if filename.endswith(".session-wal") or filename.endswith(".session-shm"):
-            return True
-        # 账户目录里的日志属于运行时产物，避免阻塞更新。
-        if filename.endswith(".log") or ".log." in filename:
-            return True
-    if normalized in {RELEASE_STATE_FILE, ROLLBACK_FILE, UPDATE_LOCK_FILE}:
-        return True
-    return False
+    return normalized in _RUNTIME_EXACT_PATHS or _RUNTIME_FILE_RE.search(normalized) is not None
 
 
-def _parse_status_path(line: str) -> str:
-    if len(line) < 4:
-        return ""
-    path_part = line[3:].strip()
-    if " -> " in path_part:
-        return path_part.split(" -> ", 1)[1].strip()
-    return path_part
+# porcelain v2 各记录类型在路径前的空格分隔字段数
+_STATUS_V2_FIELDS = {"1": 8, "2": 9, "u": 10, "?": 1, "!": 1}
 
 
-def get_blocking_dirty_paths(repo_root: Optional[str] = None) -> List[str]:
-    root = _repo_root(repo_root)
-    result = _run_cmd(["git", "status", "--porcelain"], root)
-    if result.returncode != 0:
-        return ["<git status 执行失败>"]
+def _iter_status_paths(records: Iterable[str]) -> Iterator[str]:
+    """解析 `git status --porcelain=v2 -z` 的 NUL 分隔记录，逐条产出变更路径（重命名取新路径）。"""
+    records = iter(records)
+    for record in records:
+        if not record:
+            continue
+        fields = _STATUS_V2_FIELDS.get(record[0])
+        if fields is None:
+            continue
+        parts = record.split(" ", fields)
+        if len(parts) <= fields:
+            continue
+        if record[0] == "2":
+            # 重命名/复制记录后紧跟原路径，跳过
+            next(records, None)
+        yield parts[fields]
 
+
+def _huge_index_bytes() -> int:
+    raw = (os.getenv(HUGE_REPO_BYTES_ENV_KEY) or "").strip()
+    try:
+        return int(raw) if raw else DEFAULT_HUGE_INDEX_BYTES
+    except ValueError:
+        return DEFAULT_HUGE_INDEX_BYTES
+
+
+def _is_huge_repo(repo_root: Path) -> bool:
+    try:
+        return os.path.getsize(repo_root / ".git" / "index") > _huge_index_bytes()
+    except OSError:
+        return False
+
+
+def get_blocking_dirty_paths(repo_root: Optional[str] = None, limit: Optional[int] = None) -> List[str]:
+    """返回阻止更新的未提交路径；给定 limit 时收集够即停止读取并终止 git status。"""
+    root = _repo_root(repo_root)
+    args = ["git", "status", "--porcelain=v2", "-z", "--ignore-submodules=all"]
+    if _is_huge_repo(root):
+        # 超大仓库跳过未跟踪文件扫描；与目标版本冲突的未跟踪文件仍会被 git checkout 拒绝覆盖
+        args.append("--untracked-files=no")
     blocking: List[str] = []
-    for line in result.stdout.splitlines():
-        path = _parse_status_path(line)
-        if path and not _is_runtime_file(path):
-            blocking.append(path)
+    try:
+        for path in _iter_status_paths(_run_cmd_stream(args, root)):
+            if path and not _is_runtime_file(path):
+                blocking.append(path)
+                if limit is not None and len(blocking) >= limit:
+                    break
+    except (OSError, subprocess.SubprocessError):
+        return ["<git status 执行失败>"]
     return blocking
 
 
-def _acquire_update_lock(repo_root: Path) -> Dict[str, Any]:
-    lock_path = repo_root / UPDATE_LOCK_FILE
+# 已持有的更新锁：仓库路径 -> fd；进程退出时由操作系统自动释放，崩溃不会留下“卡死”的锁
+_UPDATE_LOCK_FDS: Dict[str, int] = {}
+
+
+def _try_lock_fd(fd: int) -> None:
+    """非阻塞加排他锁，已被占用时抛 OSError。"""
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    else:
+        msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+
+
+def _unlock_fd(fd: int) -> None:
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+def _read_lock_holder(lock_path: Path) -> Any:
+    # 锁文件由持有者原地改写，不经 _load_json 的 mtime 缓存，避免时间戳精度不足时读到上一任持有者
     try:
-        fd = os.open(str(lock_path), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
-    except FileExistsError:
-        return {"success": False, "error": "已有更新任务在执行，请稍后重试", "lock_path": str(lock_path)}
+        return json.loads(lock_path.read_bytes()).get("pid")
+    except (OSError, ValueError, AttributeError):
+        return None
 
+
+def _acquire_update_lock(repo_root: Path) -> Dict[str, Any]:
+    lock_path = repo_root / UPDATE_LOCK_FILE
+    fd = os.open(str(lock_path), os.O_CREAT | os.O_RDWR, 0o600)
     try:
-        payload = {"pid": os.getpid(), "timestamp": int(time.time())}
-        os.write(fd, json.dumps(payload, ensure_ascii=False).encode("utf-8"))
-    finally:
+        _try_lock_fd(fd)
+    except OSError:
         os.close(fd)
+        holder = _read_lock_holder(lock_path)
+        error = "已有更新任务在执行，请稍后重试"
+        if holder:
+            error += f"（进程 {holder}）"
+        return {"success": False, "error": error, "lock_path": str(lock_path)}
+
+    # 锁文件内容仅用于排查：记录持有者 pid 与时间
+    payload = {"pid": os.getpid(), "timestamp": int(time.time())}
+    os.ftruncate(fd, 0)
+    os.write(fd, json.dumps(payload, ensure_ascii=False).encode("utf-8"))
+    _UPDATE_LOCK_FDS[str(repo_root)] = fd
     return {"success": True, "lock_path": str(lock_path)}
 
 
 def _release_update_lock(repo_root: Path) -> None:
-    lock_path = repo_root / UPDATE_LOCK_FILE
+    fd = _UPDATE_LOCK_FDS.pop(str(repo_root), None)
+    if fd is None:
+        return
     try:
-        if lock_path.exists():
-            lock_path.unlink()
-    except Exception:
+        _unlock_fd(fd)
+    except OSError:
+        pass
+    try:
+        os.close(fd)
+    except OSError:
         pass
 
 
@@ -790,13 +1586,42 @@ def _save_rollback_point(repo_root: Path, info: Dict[str, Any], target_tag: str)
     _save_json(repo_root / ROLLBACK_FILE, payload)
 
 
+def _file_signature(path: Path) -> List[int]:
+    st = path.stat()
+    return [st.st_mtime_ns, st.st_size]
+
+
+def _compile_file(path: Path) -> None:
+    py_compile.compile(str(path), doraise=True)
+
+
+def _health_commit_key(root: Path) -> str:
+    """整体健康检查缓存键：HEAD 提交 + requirements.txt 内容摘要；非 git 目录返回空串（不缓存）。"""
+    commit = get_current_repo_info(root).get("commit", "")
+    if not commit:
+        return ""
+    try:
+        requirements = (root / "requirements.txt").read_bytes()
+    except OSError:
+        requirements = b""
+    return f"{commit}:{hashlib.blake2b(requirements, digest_size=16).hexdigest()}"
+
+
 def run_health_check(repo_root: Optional[str] = None) -> Dict[str, Any]:
     root = _repo_root(repo_root)
-    commands: List[List[str]] = []
+
+    # 同一提交、同一依赖清单此前已通过检查（如回滚到更新前版本）时直接放行
+    commit_cache_path = root / CACHE_DIR / HEALTHCHECK_COMMITS_FILE
+    commit_key = _health_commit_key(root)
+    passed_keys = _load_json(commit_cache_path, default={}).get("passed", []) if commit_key else []
+    if commit_key and commit_key in passed_keys:
+        return {"success": True, "cached": True}
+
+    verify_cmd: Optional[List[str]] = None
 
     verify_script = root / "verify_deps.py"
     if verify_script.exists():
-        commands.append([sys.executable, "verify_deps.py"])
+        verify_cmd = [sys.executable, "verify_deps.py"]
 
     compile_candidates = [
         "main.py",
@@ -806,18 +1631,56 @@ def run_health_check(repo_root: Optional[str] = None) -> Dict[str, Any]:
         "user_manager.py",
     ]
     compile_targets = [path for path in compile_candidates if (root / path).exists()]
-    if compile_targets:
-        commands.append([sys.executable, "-m", "py_compile", *compile_targets])
 
-    for cmd in commands:
-        result = _run_cmd(cmd, root, timeout=120)
-        if result.returncode != 0:
-            detail = (result.stderr or result.stdout or "").strip()
-            return {
-                "success": False,
-                "error": f"健康检查失败: {' '.join(cmd)}",
-                "detail": detail[:600],
-            }
+    # 编译检查按 (mtime_ns, size) 缓存：上次通过后未改动的文件不再重复编译
+    cache_path = root / CACHE_DIR / HEALTHCHECK_CACHE_FILE
+    compiled_ok = _load_json(cache_path, default={})
+    signatures = {path: _file_signature(root / path) for path in compile_targets}
+    changed_targets = [path for path in compile_targets if compiled_ok.get(path) != signatures[path]]
+
+    # 依赖校验（子进程）与编译检查（当前进程）互不依赖，并行执行，总耗时取两者较大值
+    executor = ThreadPoolExecutor(max_workers=1)
+    verify_future = executor.submit(_run_cmd, verify_cmd, root, 120) if verify_cmd else None
+    try:
+        # 编译检查在当前进程内完成，省去再起一个解释器的启动开销
+        for path in changed_targets:
+            try:
+                _compile_file(root / path)
+            except py_compile.PyCompileError as e:
+                return {
+                    "success": False,
+                    "error": f"健康检查失败: 编译 {path}",
+                    "detail": str(e).strip()[:600],
+                }
+
+        if verify_future is not None:
+            result = verify_future.result()
+            if result.returncode != 0:
+                detail = (result.stderr or result.stdout or "").strip()
+                return {
+                    "success": False,
+                    "error": f"健康检查失败: {' '.join(verify_cmd)}",
+                    "detail": detail[:600],
+                }
+    finally:
+        # 编译失败时不再等待依赖校验结束
+        executor.shutdown(wait=False)
+
+    if changed_targets:
+        compiled_ok.update(signatures)
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            _save_json(cache_path, compiled_ok)
+        except OSError:
+            pass
+    if commit_key:
+        passed_keys = [key for key in passed_keys if key != commit_key][-(HEALTHCHECK_COMMITS_KEEP - 1):]
+        passed_keys.append(commit_key)
+        try:
+            commit_cache_path.parent.mkdir(parents=True, exist_ok=True)
+            _save_json(commit_cache_path, {"passed": passed_keys})
+        except OSError:
+            pass
     return {"success": True}
 
 
@@ -827,7 +1690,7 @@ def _rollback_to_last_release_unlocked(root: Path) -> Dict[str, Any]:
     if not commit:
         return {"success": False, "error": "未找到可回滚版本，请先执行一次 upnow"}
 
-    checkout_res = _run_cmd(["git", "checkout", commit], root, timeout=60)
+    checkout_res = _checkout(root, commit)
     if checkout_res.returncode != 0:
         return {
             "success": False,
@@ -850,7 +1713,7 @@ def rollback_to_last_release(repo_root: Optional[str] = None) -> Dict[str, Any]:
         return lock
 
     try:
-        blocking = get_blocking_dirty_paths(root)
+        blocking = get_blocking_dirty_paths(root, limit=BLOCKING_PATHS_LIMIT)
         if blocking:
             return {
                 "success": False,
@@ -862,14 +1725,22 @@ def rollback_to_last_release(repo_root: Optional[str] = None) -> Dict[str, Any]:
         _release_update_lock(root)
 
 
-def update_to_release(repo_root: Optional[str] = None, target_tag: Optional[str] = None) -> Dict[str, Any]:
+def update_to_release(
+    repo_root: Optional[str] = None,
+    target_tag: Optional[str] = None,
+    precomputed: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    更新到指定 tag，未指定时更新到最新 release。
+    precomputed 传入 check_release_update 的结果时（仓库一致且成功），直接复用其中的最新 release，不再请求 GitHub。
+    """
     root = _repo_root(repo_root)
     lock = _acquire_update_lock(root)
     if not lock.get("success"):
         return lock
 
     try:
-        blocking = get_blocking_dirty_paths(root)
+        blocking = get_blocking_dirty_paths(root, limit=BLOCKING_PATHS_LIMIT)
         if blocking:
             return {
                 "success": False,
@@ -892,30 +1763,26 @@ def update_to_release(repo_root: Optional[str] = None, target_tag: Optional[str]
                     "error": "无法识别 GitHub 仓库地址(remote.origin.url)",
                     "detail": "请检查 git 远程配置，例如：git remote add origin https://github.com/<owner>/<repo>.git",
                 }
-            if remote_name:
-                fetch_res = _git_fetch_tags(root, remote_name, github_token)
-                if fetch_res.returncode != 0:
-                    return {
-                        "success": False,
-                        "error": f"git fetch --tags {remote_name} 失败",
-                        "detail": (fetch_res.stderr or fetch_res.stdout).strip()[:600],
-                    }
-            latest = get_latest_release(repo_slug, github_token=github_token)
+            if precomputed and precomputed.get("success") and precomputed.get("repo_slug") == repo_slug:
+                latest = precomputed.get("latest") or {}
+            else:
+                latest = get_latest_release(repo_slug, github_token=github_token, repo_root=str(root))
             if not latest.get("success"):
                 return {"success": False, "error": latest.get("error", "获取最新 release 失败")}
             final_tag = latest.get("tag_name", "").strip()
-        elif remote_name:
-            fetch_res = _git_fetch_tags(root, remote_name, github_token)
-            if fetch_res.returncode != 0:
-                return {
-                    "success": False,
-                    "error": f"git fetch --tags {remote_name} 失败",
-                    "detail": (fetch_res.stderr or fetch_res.stdout).strip()[:600],
-                }
 
         if not final_tag:
             return {"success": False, "error": "未找到可用的 release tag"}
 
+        # 只确保目标 tag 在本地：已存在则跳过 fetch，否则单独拉取该 tag
+        fetch_res = _ensure_local_tag(root, remote_name, final_tag, github_token)
+        if fetch_res.returncode != 0:
+            return {
+                "success": False,
+                "error": f"git fetch --tags {remote_name} 失败",
+                "detail": (fetch_res.stderr or fetch_res.stdout).strip()[:600],
+            }
+
         if current.get("current_tag") == final_tag:
             return {
                 "success": True,
@@ -927,7 +1794,7 @@ def update_to_release(repo_root: Optional[str] = None, target_tag: Optional[str]
 
         _save_rollback_point(root, current, final_tag)
 
-        checkout_res = _run_cmd(["git", "checkout", final_tag], root, timeout=60)
+        checkout_res = _checkout(root, final_tag)
         if checkout_res.returncode != 0:
             return {
                 "success": False,
@@ -945,8 +1812,7 @@ def update_to_release(repo_root: Optional[str] = None, target_tag: Optional[str]
                 "rollback": rollback_result,
             }
 
-        mark_release_applied(final_tag, root)
-        mark_release_notified(final_tag, root)
+        update_release_state(root, last_applied_tag=final_tag, last_notified_tag=final_tag)
         after = get_current_repo_info(root)
         return {
             "success": True,
@@ -959,7 +1825,11 @@ def update_to_release(repo_root: Optional[str] = None, target_tag: Optional[str]
         _release_update_lock(root)
 
 
-def update_to_ref(repo_root: Optional[str] = None, target_ref: Optional[str] = None) -> Dict[str, Any]:
+def update_to_ref(
+    repo_root: Optional[str] = None,
+    target_ref: Optional[str] = None,
+    session: Optional[_GitSession] = None,
+) -> Dict[str, Any]:
     """更新到任意 git 引用（commit/tag/branch）。"""
     root = _repo_root(repo_root)
     lock = _acquire_update_lock(root)
@@ -967,7 +1837,7 @@ def update_to_ref(repo_root: Optional[str] = None, target_ref: Optional[str] = N
         return lock
 
     try:
-        blocking = get_blocking_dirty_paths(root)
+        blocking = get_blocking_dirty_paths(root, limit=BLOCKING_PATHS_LIMIT)
         if blocking:
             return {
                 "success": False,
@@ -984,26 +1854,34 @@ def update_to_ref(repo_root: Optional[str] = None, target_ref: Optional[str] = N
         remote_name = remote.get("name", "")
         github_token = resolve_github_token(root, remote.get("url", ""))
 
-        if remote_name:
-            fetch_main_res = _run_cmd(["git", "fetch", remote_name], root, timeout=120)
-            fetch_tag_res = _git_fetch_tags(root, remote_name, github_token)
-            if fetch_main_res.returncode != 0 and fetch_tag_res.returncode != 0:
-                verify_local = _run_cmd(["git", "rev-parse", "--verify", f"{final_ref}^{{commit}}"], root, timeout=20)
-                if verify_local.returncode != 0:
+        # 本地已有的 tag 或完整提交号不会再变化，无需访问远端；分支等其余 ref 仍先 fetch
+        is_pinned_local = bool(_resolve_local_commit(root, f"refs/tags/{final_ref}", session)) or (
+            _FULL_SHA_RE.match(final_ref) is not None and bool(_resolve_local_commit(root, final_ref, session))
+        )
+        if remote_name and not is_pinned_local:
+            fetch_res = _git_fetch_tags(root, remote_name, github_token)
+            if fetch_res.returncode != 0:
+                local_exists = bool(_resolve_local_commit(root, final_ref, session))
+                if not local_exists:
                     return {
                         "success": False,
                         "error": f"git fetch --tags {remote_name} 失败，且本地不存在目标 ref",
-                        "detail": ((fetch_main_res.stderr or fetch_main_res.stdout or fetch_tag_res.stderr or fetch_tag_res.stdout).strip())[:600],
+                        "detail": (fetch_res.stderr or fetch_res.stdout).strip()[:600],
                     }
 
-        resolve_res = _run_cmd(["git", "rev-parse", "--verify", f"{final_ref}^{{commit}}"], root, timeout=20)
-        if resolve_res.returncode != 0:
-            return {
-                "success": False,
-                "error": f"目标 ref 不存在: {final_ref}",
-                "detail": (resolve_res.stderr or resolve_res.stdout).strip()[:600],
-            }
-        target_commit = resolve_res.stdout.strip()
+        if session is not None:
+            target_commit = session.resolve(f"{final_ref}^{{commit}}")
+            if not target_commit:
+                return {"success": False, "error": f"目标 ref 不存在: {final_ref}", "detail": ""}
+        else:
+            resolve_res = _run_cmd(["git", "rev-parse", "--verify", f"{final_ref}^{{commit}}"], root, timeout=20)
+            if resolve_res.returncode != 0:
+                return {
+                    "success": False,
+                    "error": f"目标 ref 不存在: {final_ref}",
+                    "detail": (resolve_res.stderr or resolve_res.stdout).strip()[:600],
+                }
+            target_commit = resolve_res.stdout.strip()
 
         if current.get("commit") == target_commit:
             return {
@@ -1017,7 +1895,7 @@ def update_to_ref(repo_root: Optional[str] = None, target_ref: Optional[str] = N
 
         _save_rollback_point(root, current, final_ref)
 
-        checkout_res = _run_cmd(["git", "checkout", final_ref], root, timeout=60)
+        checkout_res = _checkout(root, final_ref)
         if checkout_res.returncode != 0:
             return {
                 "success": False,
@@ -1037,8 +1915,7 @@ def update_to_ref(repo_root: Optional[str] = None, target_ref: Optional[str] = N
 
         after = get_current_repo_info(root)
         if after.get("current_tag"):
-            mark_release_applied(after.get("current_tag"), root)
-            mark_release_notified(after.get("current_tag"), root)
+            update_release_state(root, last_applied_tag=after["current_tag"], last_notified_tag=after["current_tag"])
 
         return {
             "success": True,
@@ -1074,15 +1951,50 @@ def build_release_update_message(check_result: Dict[str, Any]) -> str:
     )
 
 
+def _next_release_check_interval(current: float, base: float, result: Dict[str, Any]) -> float:
+    """自适应检查间隔：release 未变化（304）时翻倍至上限，拿到新内容时恢复基础间隔，请求失败保持不变。"""
+    if not result.get("success"):
+        return current
+    if result.get("latest", {}).get("not_modified"):
+        return min(current * 2, base * RELEASE_CHECK_MAX_BACKOFF)
+    return float(base)
+
+
+_RELEASE_WAKE_EVENT: Optional[asyncio.Event] = None
+_RELEASE_WAKE_LOOP: Optional[asyncio.AbstractEventLoop] = None
+
+
+def trigger_release_check() -> bool:
+    """唤醒周期检查循环立即复查；可从任意线程调用，循环未运行时返回 False。"""
+    loop, event = _RELEASE_WAKE_LOOP, _RELEASE_WAKE_EVENT
+    if loop is None or event is None or loop.is_closed():
+        return False
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        event.set()
+    else:
+        loop.call_soon_threadsafe(event.set)
+    return True
+
+
 async def periodic_release_check_loop(
     notify_callback: Callable[[str], Awaitable[None]],
     repo_root: Optional[str] = None,
     interval_seconds: int = DEFAULT_RELEASE_CHECK_INTERVAL,
 ) -> None:
+    global _RELEASE_WAKE_EVENT, _RELEASE_WAKE_LOOP
     root = _repo_root(repo_root)
+    # Event 绑定当前事件循环，在循环内创建，供 trigger_release_check 跨线程唤醒
+    wake = asyncio.Event()
+    _RELEASE_WAKE_EVENT, _RELEASE_WAKE_LOOP = wake, asyncio.get_running_loop()
+    current_interval = float(interval_seconds)
     while True:
         try:
-            result = await asyncio.to_thread(check_release_update, root)
+            result = await check_release_update_async(root)
+            current_interval = _next_release_check_interval(current_interval, interval_seconds, result)
             if result.get("success") and result.get("has_update"):
                 latest_tag = result.get("latest", {}).get("tag_name", "")
                 state = get_release_state(root)
@@ -1092,4 +2004,99 @@ async def periodic_release_check_loop(
         except Exception:
             # 周期任务不抛出异常，避免影响主流程
             pass
-        await asyncio.sleep(interval_seconds)
+        delay = current_interval * random.uniform(1 - RELEASE_CHECK_JITTER, 1 + RELEASE_CHECK_JITTER)
+        try:
+            await asyncio.wait_for(wake.wait(), timeout=delay)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            wake.clear()
+
+
+def _verify_webhook_signature(secret: str, body: bytes, signature: str) -> bool:
+    expected = "sha256=" + hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature or "")
+
+
+async def _handle_release_event(
+    payload: Dict[str, Any],
+    notify_callback: Callable[[str], Awaitable[None]],
+    root: Path,
+) -> bool:
+    """处理 release 事件；正式发布（released）且未通知过时推送更新消息，返回是否已推送。"""
+    if payload.get("action") != "released":
+        return False
+    release = payload.get("release") or {}
+    if release.get("draft") or release.get("prerelease"):
+        return False
+    latest_tag = str(release.get("tag_name") or "")
+    if not latest_tag:
+        return False
+
+    info = await asyncio.to_thread(get_current_repo_info, root)
+    if latest_tag == info.get("current_tag", ""):
+        return False
+    state = get_release_state(root)
+    if state.get("last_notified_tag") == latest_tag:
+        return False
+
+    latest = {
+        "success": True,
+        "tag_name": latest_tag,
+        "name": release.get("name", ""),
+        "html_url": release.get("html_url", ""),
+        "published_at": release.get("published_at", ""),
+        "body": release.get("body", ""),
+    }
+    check_result = {"success": True, "current": info, "latest": latest, "has_update": True}
+    await notify_callback(build_release_update_message(check_result))
+    mark_release_notified(latest_tag, root)
+    return True
+
+
+async def release_webhook_server(
+    notify_callback: Callable[[str], Awaitable[None]],
+    secret: str,
+    repo_root: Optional[str] = None,
+    host: str = DEFAULT_RELEASE_WEBHOOK_HOST,
+    port: int = DEFAULT_RELEASE_WEBHOOK_PORT,
+    path: str = "/github/release",
+) -> None:
+    """
+    接收 GitHub release webhook（Content type 选 application/json），收到正式发布即推送通知，
+    替代常规周期轮询（调用方另以长间隔轮询兜底）。签名按 X-Hub-Signature-256 校验。
+    监听失败（如端口占用）时直接抛出，由调用方回退到周期轮询。
+    """
+    from aiohttp import web  # 延迟导入：仅启用 webhook 时才加载 aiohttp.web
+
+    root = _repo_root(repo_root)
+
+    async def handle(request: "web.Request") -> "web.Response":
+        body = await request.read()
+        if not _verify_webhook_signature(secret, body, request.headers.get("X-Hub-Signature-256", "")):
+            return web.Response(status=401, text="invalid signature")
+        event = request.headers.get("X-GitHub-Event", "")
+        if event == "ping":
+            return web.Response(text="pong")
+        if event != "release":
+            return web.Response(status=202, text="ignored")
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return web.Response(status=400, text="invalid payload")
+        try:
+            await _handle_release_event(payload, notify_callback, root)
+        except Exception:
+            # 通知失败不影响 webhook 应答，避免 GitHub 反复重投
+            pass
+        return web.Response(text="ok")
+
+    app = web.Application()
+    app.router.add_post(path, handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    try:
+        await web.TCPSite(runner, host, port).start()
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
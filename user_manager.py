@@ -6,6 +6,10 @@ user_manager.py - 多用户管理模块
 """
 
 import os
+import re
+import copy
+import asyncio
+import hashlib
 import json
 import threading
 import logging
@@ -15,6 +19,12 @@ from typing import Dict, Any, Optional, List
 from logging.handlers import TimedRotatingFileHandler
 import constants
 
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
 # 日志配置
 logger = logging.getLogger('user_manager')
 logger.setLevel(logging.DEBUG)
@@ -33,6 +43,108 @@ def log_event(level, module, event, message=None, **kwargs):
     logger.log(level, f"[{module}:{event}] {message} | {data}")
 
 
+def read_json_file(filepath: str) -> Any:
+    """读取 JSON 文件（优先 orjson，直接解析字节，省去一次解码）。"""
+    if HAS_ORJSON:
+        with open(filepath, 'rb') as f:
+            return orjson.loads(f.read())
+    with open(filepath, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def encode_json(data: Any) -> bytes:
+    """编码为 UTF-8 JSON 字节（优先 orjson；orjson 仅支持 2 空格缩进，回退路径保持一致）。"""
+    if HAS_ORJSON:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8')
+
+
+def write_json_file(filepath: str, data: Any):
+    """
+    原子写入 JSON 文件。
+    说明：先完整编码到内存，再单次写入临时文件并 fsync，最后 os.replace 覆盖，
+    读者只会看到旧文件或新文件，不会读到写了一半的内容。
+    """
+    write_bytes_atomic(filepath, encode_json(data))
+
+
+def write_bytes_atomic(filepath: str, data: bytes):
+    """将已编码的字节原子写入文件（临时文件 + fsync + os.replace）。"""
+    payload = memoryview(data)
+    tmp_path = f"{filepath}.{os.getpid()}.{threading.get_ident()}.tmp"
+    flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0)
+    fd = os.open(tmp_path, flags, 0o644)
+    try:
+        try:
+            while payload:
+                written = os.write(fd, payload)
+                payload = payload[written:]
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+# 进程内共享的 aiohttp 会话（通知推送、发布检查共用）：按事件循环复用连接池；
+# trust_env=True 以沿用 HTTP(S)_PROXY / NO_PROXY 等环境代理，与 requests 行为一致
+_AIO_SESSION = None
+_AIO_SESSION_LOOP = None
+
+
+def get_aio_session():
+    """返回当前事件循环的共享 aiohttp 会话；事件循环切换时先关闭旧会话再新建。"""
+    global _AIO_SESSION, _AIO_SESSION_LOOP
+    import aiohttp  # 延迟导入：仅发起异步 HTTP 请求时才加载
+
+    loop = asyncio.get_running_loop()
+    session = _AIO_SESSION
+    if session is not None and not session.closed and _AIO_SESSION_LOOP is loop:
+        return session
+    if session is not None and not session.closed:
+        old_loop = _AIO_SESSION_LOOP
+        # 旧会话的连接绑定在旧事件循环上，只能交回该循环关闭；旧循环已关闭时连接随之失效
+        if old_loop is not None and not old_loop.is_closed():
+            asyncio.run_coroutine_threadsafe(session.close(), old_loop)
+    _AIO_SESSION = aiohttp.ClientSession(
+        trust_env=True,
+        connector=aiohttp.TCPConnector(limit=32),
+    )
+    _AIO_SESSION_LOOP = loop
+    return _AIO_SESSION
+
+
+async def close_aio_session():
+    """关闭共享 aiohttp 会话（进程退出前在同一事件循环内调用）。"""
+    global _AIO_SESSION, _AIO_SESSION_LOOP
+    session = _AIO_SESSION
+    _AIO_SESSION = None
+    _AIO_SESSION_LOOP = None
+    if session is not None and not session.closed:
+        await session.close()
+
+
+def _tail(items: List, limit: int) -> List:
+    """取列表末尾 limit 项；未超限时直接返回原列表，保存时免去整段复制。"""
+    if len(items) <= limit:
+        return items
+    return items[-limit:]
+
+
+# 注释剥离：字符串字面量（含转义）原样保留，其余位置的 # 或 // 到行尾视为注释
+_JSON_COMMENT_RE = re.compile(r'"(?:\\.|[^"\\\n])*"|(?:#|//)[^\n]*')
+
+
+def _keep_json_string(match: "re.Match") -> str:
+    text = match.group(0)
+    return text if text.startswith('"') else ''
+
+
 def load_json_with_comments(filepath: str) -> Dict[str, Any]:
     """
     读取支持注释的 JSON 文件。
@@ -40,59 +152,52 @@ def load_json_with_comments(filepath: str) -> Dict[str, Any]:
     - 支持整行注释：# ... 或 // ...
     - 支持行尾注释：... # ... 或 ... // ...
     """
-    with open(filepath, 'r', encoding='utf-8') as f:
-        raw_text = f.read()
-
-    cleaned_lines = []
-    for raw_line in raw_text.splitlines():
-        stripped = raw_line.lstrip()
-        if stripped.startswith('#') or stripped.startswith('//'):
-            continue
-
-        in_string = False
-        escaped = False
-        cleaned = []
-        i = 0
-        while i < len(raw_line):
-            ch = raw_line[i]
-            if escaped:
-                cleaned.append(ch)
-                escaped = False
-                i += 1
-                continue
-            if ch == '\\':
-                cleaned.append(ch)
-                escaped = True
-                i += 1
-                continue
-            if ch == '"':
-                in_string = not in_string
-                cleaned.append(ch)
-                i += 1
-                continue
-            if not in_string:
-                if ch == '#':
-                    break
-                if ch == '/' and i + 1 < len(raw_line) and raw_line[i + 1] == '/':
-                    break
-            cleaned.append(ch)
-            i += 1
-
-        line = ''.join(cleaned).rstrip()
-        if line:
-            cleaned_lines.append(line)
-
-    return json.loads('\n'.join(cleaned_lines))
+    with open(filepath, 'rb') as f:
+        raw = f.read()
+
+    # 无任何注释标记时直接解析字节，省去解码与正则替换
+    if HAS_ORJSON and b'#' not in raw and b'//' not in raw:
+        return orjson.loads(raw)
+
+    cleaned_text = _JSON_COMMENT_RE.sub(_keep_json_string, raw.decode('utf-8'))
+    if HAS_ORJSON:
+        return orjson.loads(cleaned_text)
+    return json.loads(cleaned_text)
+
+
+# 全局配置解析缓存：path -> ((mtime_ns, size), data)
+_GLOBAL_CONFIG_CACHE: Dict[str, tuple] = {}
+
+
+def load_global_config_cached(filepath: str) -> Dict[str, Any]:
+    """读取全局配置；文件 mtime/大小未变化时复用上次解析结果（返回深拷贝，调用方可自由修改）。"""
+    st = os.stat(filepath)
+    key = (st.st_mtime_ns, st.st_size)
+    cache_key = os.path.abspath(filepath)
+    cached = _GLOBAL_CONFIG_CACHE.get(cache_key)
+    if cached is None or cached[0] != key:
+        cached = (key, load_json_with_comments(filepath))
+        _GLOBAL_CONFIG_CACHE[cache_key] = cached
+    if HAS_ORJSON:
+        # 缓存内容均来自 JSON，序列化往返即可得到独立副本，比 deepcopy 快
+        return orjson.loads(orjson.dumps(cached[1]))
+    return copy.deepcopy(cached[1])
 
 
 def merge_dict(base: Dict[str, Any], override: Dict[str, Any]) -> Dict[str, Any]:
-    """深度合并字典: override 覆盖 base。"""
+    """深度合并字典: override 覆盖 base（显式栈迭代，不修改 base）。"""
     result = dict(base or {})
-    for key, value in (override or {}).items():
-        if isinstance(result.get(key), dict) and isinstance(value, dict):
-            result[key] = merge_dict(result[key], value)
-        else:
-            result[key] = value
+    stack = [(result, override or {})]
+    while stack:
+        dst, src = stack.pop()
+        for key, value in src.items():
+            current = dst.get(key)
+            if isinstance(current, dict) and isinstance(value, dict):
+                merged = dict(current)
+                dst[key] = merged
+                stack.append((merged, value))
+            else:
+                dst[key] = value
     return result
 
 
@@ -107,6 +212,10 @@ class UserConfig:
     ai: Dict[str, Any] = field(default_factory=dict)
 
 
+# 开奖历史保留局数；超出后原地删除最旧的局，避免每局都复制整段列表
+HISTORY_KEEP = 2000
+
+
 @dataclass
 class UserState:
     """
@@ -122,6 +231,13 @@ class UserState:
     # 运行时变量（存储在 runtime 字典中）
     runtime: Dict[str, Any] = field(default_factory=dict)
     
+    def append_history(self, result: int):
+        """追加一局开奖结果，原地裁剪到保留局数（切片消费方不受影响）"""
+        history = self.history
+        history.append(result)
+        if len(history) > HISTORY_KEEP:
+            del history[:-HISTORY_KEEP]
+    
     def get_runtime(self, key: str, default: Any = None) -> Any:
         """获取运行时变量，支持类型转换"""
         value = self.runtime.get(key, default)
@@ -273,7 +389,10 @@ class UserContext:
         self._model_manager_ai_sig = ""
         self._config_path = ""
         self._config_data = {}
-        self._lock = threading.Lock()
+        # 可重入：同一线程内 set_runtime 与 save_state 可嵌套持锁；跨线程串行化“改状态-落盘”。
+        self._lock = threading.RLock()
+        # 最近一次写入 state.json 的内容摘要，未变化时 save_state 跳过写盘
+        self._saved_state_digest: Optional[bytes] = None
         self._load_all()
     
     def _load_all(self):
@@ -414,8 +533,7 @@ class UserContext:
         
         if os.path.exists(state_path):
             try:
-                with open(state_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
+                data = read_json_file(state_path)
                 
                 # 合并默认运行时变量和保存的运行时变量
                 saved_runtime = data.get("runtime", {})
@@ -473,8 +591,7 @@ class UserContext:
             return False
 
         try:
-            with open(legacy_state_path, 'r', encoding='utf-8') as f:
-                legacy_state = json.load(f)
+            legacy_state = read_json_file(legacy_state_path)
         except Exception as e:
             log_event(logging.WARNING, 'load_state', '读取legacy状态失败', f'user_id={self.user_id}, error={str(e)}')
             return False
@@ -507,50 +624,54 @@ class UserContext:
         
         # 内置预设作为权威基线（代码更新后应覆盖同名旧值）
         self.presets = dict(constants.PRESETS)
+        user_presets = None
         
         if os.path.exists(presets_path):
             try:
-                with open(presets_path, 'r', encoding='utf-8') as f:
-                    user_presets = json.load(f)
-                    if not isinstance(user_presets, dict):
-                        raise ValueError("presets.json 必须是对象(dict)")
-
-                    overridden_builtins = 0
-                    custom_count = 0
-                    for key, value in user_presets.items():
-                        if key in constants.PRESETS:
-                            overridden_builtins += 1
-                            continue
-                        self.presets[key] = value
-                        custom_count += 1
+                user_presets = read_json_file(presets_path)
+                if not isinstance(user_presets, dict):
+                    raise ValueError("presets.json 必须是对象(dict)")
+
+                custom_presets = {
+                    key: value for key, value in user_presets.items() if key not in constants.PRESETS
+                }
+                self.presets.update(custom_presets)
 
                 log_event(
                     logging.DEBUG,
                     'load_presets',
                     '加载用户预设成功',
-                    f'user_id={self.user_id}, custom={custom_count}, builtin_refreshed={overridden_builtins}'
+                    f'user_id={self.user_id}, custom={len(custom_presets)}, '
+                    f'builtin_refreshed={len(user_presets) - len(custom_presets)}'
                 )
             except Exception as e:
+                user_presets = None
                 log_event(logging.ERROR, 'load_presets', '加载用户预设失败', f'user_id={self.user_id}, error={str(e)}')
         else:
             log_event(logging.INFO, 'load_presets', '初始化默认预设', f'user_id={self.user_id}')
         
-        # 保存合并后的预设到文件（确保文件是最新的）
-        self.save_presets()
+        # 文件内容与合并结果一致时跳过回写，避免批量加载账号时重复写盘
+        if user_presets != self.presets:
+            self.save_presets()
     
     def save_state(self):
         with self._lock:
             state_path = os.path.join(self.user_dir, "state.json")
             data = {
-                "history": self.state.history[-2000:],
-                "bet_type_history": self.state.bet_type_history[-2000:],
-                "predictions": self.state.predictions[-2000:],
-                "bet_sequence_log": self.state.bet_sequence_log[-5000:],
+                "history": _tail(self.state.history, HISTORY_KEEP),
+                "bet_type_history": _tail(self.state.bet_type_history, 2000),
+                "predictions": _tail(self.state.predictions, 2000),
+                "bet_sequence_log": _tail(self.state.bet_sequence_log, 5000),
                 "runtime": self.state.runtime
             }
             try:
-                with open(state_path, 'w', encoding='utf-8') as f:
-                    json.dump(data, f, indent=4, ensure_ascii=False)
+                payload = encode_json(data)
+                digest = hashlib.blake2b(payload, digest_size=16).digest()
+                # 内容与上次落盘一致且文件仍在时跳过写盘
+                if digest == self._saved_state_digest and os.path.exists(state_path):
+                    return
+                write_bytes_atomic(state_path, payload)
+                self._saved_state_digest = digest
                 log_event(logging.DEBUG, 'save_state', '保存用户状态成功', f'user_id={self.user_id}')
             except Exception as e:
                 log_event(logging.ERROR, 'save_state', '保存用户状态失败', f'user_id={self.user_id}, error={str(e)}')
@@ -559,8 +680,7 @@ class UserContext:
         with self._lock:
             presets_path = os.path.join(self.user_dir, "presets.json")
             try:
-                with open(presets_path, 'w', encoding='utf-8') as f:
-                    json.dump(self.presets, f, indent=4, ensure_ascii=False)
+                write_json_file(presets_path, self.presets)
                 log_event(logging.DEBUG, 'save_presets', '保存用户预设成功', f'user_id={self.user_id}')
             except Exception as e:
                 log_event(logging.ERROR, 'save_presets', '保存用户预设失败', f'user_id={self.user_id}, error={str(e)}')
@@ -569,7 +689,8 @@ class UserContext:
         return self.state.runtime.get(key, default)
     
     def set_runtime(self, key: str, value: Any):
-        self.state.runtime[key] = value
+        with self._lock:
+            self.state.runtime[key] = value
 
     def get_model_manager(self):
         """
@@ -595,6 +716,7 @@ class UserManager:
         self.users_dir = users_dir
         self.config_dir = config_dir
         self.shared_dir = shared_dir
+        # 写时复制：增删账号时构建新字典后整体替换引用，读路径（get_user/get_all_users）无需加锁。
         self.users: Dict[int, UserContext] = {}
         self.global_config: Dict[str, Any] = {}
         log_event(logging.INFO, 'init', '用户管理器初始化', f'users_dir={users_dir}')
@@ -628,7 +750,7 @@ class UserManager:
         self.global_config = {}
         for path in candidates:
             if os.path.exists(path):
-                self.global_config = load_json_with_comments(path)
+                self.global_config = load_global_config_cached(path)
                 chosen_path = path
                 break
 
@@ -656,18 +778,22 @@ class UserManager:
             return 0
         
         loaded_count = 0
-        for user_id_str in os.listdir(self.users_dir):
-            if user_id_str.startswith('_'):
-                continue
-            
-            user_dir = os.path.join(self.users_dir, user_id_str)
-            if os.path.isdir(user_dir):
-                try:
-                    ctx = UserContext(user_dir, self.global_config)
-                    self.users[ctx.user_id] = ctx
-                    loaded_count += 1
-                except Exception as e:
-                    log_event(logging.ERROR, 'load_user', '加载用户失败', f'user_dir={user_dir}, error={str(e)}')
+        users = dict(self.users)
+        # scandir 的目录项自带类型信息，普通目录无需再逐个 stat
+        with os.scandir(self.users_dir) as entries:
+            user_dirs = [
+                entry.path for entry in entries
+                if not entry.name.startswith('_') and entry.is_dir()
+            ]
+
+        for user_dir in user_dirs:
+            try:
+                ctx = UserContext(user_dir, self.global_config)
+                users[ctx.user_id] = ctx
+                loaded_count += 1
+            except Exception as e:
+                log_event(logging.ERROR, 'load_user', '加载用户失败', f'user_dir={user_dir}, error={str(e)}')
+        self.users = users
         
         log_event(logging.INFO, 'load_users', '加载用户完成', f'count={loaded_count}')
         return loaded_count
@@ -688,7 +814,9 @@ class UserManager:
             json.dump(config, f, indent=4, ensure_ascii=False)
         
         ctx = UserContext(user_dir)
-        self.users[user_id] = ctx
+        users = dict(self.users)
+        users[user_id] = ctx
+        self.users = users
         log_event(logging.INFO, 'create_user', '创建用户成功', f'user_id={user_id}')
         return ctx
     
@@ -699,7 +827,9 @@ class UserManager:
         user_dir = os.path.join(self.users_dir, str(user_id))
         import shutil
         shutil.rmtree(user_dir)
-        del self.users[user_id]
+        users = dict(self.users)
+        del users[user_id]
+        self.users = users
         log_event(logging.INFO, 'delete_user', '删除用户成功', f'user_id={user_id}')
         return True
     
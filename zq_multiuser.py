@@ -10,14 +10,16 @@ import asyncio
 import json
 import os
 import random
-import requests
+import re
 import aiohttp
 import time
 import math
+import heapq
+import itertools
 from collections import Counter
 from logging.handlers import TimedRotatingFileHandler
 from datetime import datetime
-from user_manager import UserContext
+from user_manager import HISTORY_KEEP, UserContext, get_aio_session
 from typing import Dict, Any, List
 import constants
 from update_manager import (
@@ -36,6 +38,16 @@ logger.setLevel(logging.DEBUG)
 ACCOUNT_LOG_ROOT = os.path.join("logs", "accounts")
 _ACCOUNT_NAME_REGISTRY: Dict[str, str] = {}
 
+# 高频消息解析正则：模块加载时编译一次，避免每条事件重复查找正则缓存。
+_SETTLE_RE = re.compile(r"已结算: 结果为 (\d+) (大|小)")
+_HISTORY_RE = re.compile(r"\[0\s*小\s*1\s*大\]([\s\S]*)")
+_HISTORY_BIT_RE = re.compile(r"(?<!\d)[01](?!\d)")
+_BET_ID_RE = re.compile(r"^\d{8}_(\d+)_(\d+)$")
+
+def _wan(value) -> str:
+    """金额按“万”两位小数格式化（不含单位）。"""
+    return f"{value / 10000:.2f}"
+
 
 def _sanitize_account_slug(text: str, fallback: str = "unknown") -> str:
     raw = str(text or "").strip().lower().replace(" ", "-")
@@ -437,13 +449,13 @@ def format_dashboard(user_ctx: UserContext) -> str:
     elif account_balance == 0 and balance_status == "unknown":
         balance_str = "⏳ 获取中..."
     else:
-        balance_str = f"{account_balance / 10000:.2f} 万"
+        balance_str = f"{_wan(account_balance)} 万"
         
     mes += f"💰 **账户余额：{balance_str}**\n"
     # 防止资金显示为负数
     display_fund = max(0, rt.get('gambling_fund', 0))
-    mes += f"💰 **菠菜余额：{display_fund / 10000:.2f} 万**\n📈 **盈利目标：{rt.get('profit', 1000000) / 10000:.2f} 万，暂停 {rt.get('profit_stop', 5)} 局**\n"
-    mes += f"📈 **本轮盈利：{rt.get('period_profit', 0) / 10000:.2f} 万**\n📈 **总盈利：{rt.get('earnings', 0) / 10000:.2f} 万**\n\n"
+    mes += f"💰 **菠菜余额：{_wan(display_fund)} 万**\n📈 **盈利目标：{_wan(rt.get('profit', 1000000))} 万，暂停 {rt.get('profit_stop', 5)} 局**\n"
+    mes += f"📈 **本轮盈利：{_wan(rt.get('period_profit', 0))} 万**\n📈 **总盈利：{_wan(rt.get('earnings', 0))} 万**\n\n"
     
     win_total = rt.get('win_total', 0)
     total = rt.get('total', 0)
@@ -646,14 +658,27 @@ def _resolve_admin_chat(user_ctx: UserContext):
     return admin_chat
 
 
+async def _post(url: str, data: dict = None, json: dict = None, timeout: int = 5):
+    """通知推送统一出口：经共享会话异步 POST，并读完响应体以便连接回池。"""
+    session = get_aio_session()
+    async with session.post(
+        url,
+        data=data,
+        json=json,
+        timeout=aiohttp.ClientTimeout(total=timeout),
+    ) as response:
+        await response.read()
+        return response
+
+
 async def _post_form_async(url: str, payload: dict, timeout: int = 5):
-    """在异步上下文中安全发送 form 请求，避免阻塞事件循环。"""
-    return await asyncio.to_thread(requests.post, url, data=payload, timeout=timeout)
+    """在异步上下文中发送 form 请求。"""
+    return await _post(url, data=payload, timeout=timeout)
 
 
 async def _post_json_async(url: str, payload: dict, timeout: int = 5):
-    """在异步上下文中安全发送 json 请求，避免阻塞事件循环。"""
-    return await asyncio.to_thread(requests.post, url, json=payload, timeout=timeout)
+    """在异步上下文中发送 json 请求。"""
+    return await _post(url, json=payload, timeout=timeout)
 
 
 async def send_message_v2(
@@ -804,7 +829,7 @@ async def _send_transient_admin_notice(
         chat_id = getattr(sent, "chat_id", None)
         msg_id = getattr(sent, "id", None)
         if chat_id is not None and msg_id is not None and ttl_seconds > 0:
-            asyncio.create_task(delete_later(client, chat_id, msg_id, ttl_seconds))
+            schedule_delete(client, chat_id, msg_id, ttl_seconds)
     return sent
 
 
@@ -1325,13 +1350,12 @@ async def process_bet_on(client, event, user_ctx: UserContext, global_config: di
 
     # 修复：多用户分支 - 更稳健解析历史串（支持换行/多空格），尽量回填更多历史。
     try:
-        import re
-        history_match = re.search(r"\[0\s*小\s*1\s*大\]([\s\S]*)", text)
+        history_match = _HISTORY_RE.search(text)
         if history_match:
             history_str = history_match.group(1)
-            new_history = [int(x) for x in re.findall(r"(?<!\d)[01](?!\d)", history_str)]
+            new_history = list(map(int, _HISTORY_BIT_RE.findall(history_str)))
             if new_history and len(new_history) >= len(state.history):
-                state.history = new_history[-2000:]
+                state.history = new_history[-HISTORY_KEEP:]
     except Exception as e:
         log_event(logging.WARNING, 'bet_on', '解析历史数据失败', user_id=user_ctx.user_id, data=str(e))
 
@@ -1629,7 +1653,7 @@ async def process_bet_on(client, event, user_ctx: UserContext, global_config: di
         if not is_fund_available(user_ctx, bet_amount):
             if not rt.get("fund_pause_notified", False):
                 display_fund = max(0, rt.get("gambling_fund", 0))
-                mes = f"**菠菜资金不足，已暂停押注**\n当前剩余：{display_fund / 10000:.2f} 万\n请使用 `gf [金额]` 恢复"
+                mes = f"**菠菜资金不足，已暂停押注**\n当前剩余：{_wan(display_fund)} 万\n请使用 `gf [金额]` 恢复"
                 await send_message_v2(
                     client,
                     "fund_pause",
@@ -1939,9 +1963,9 @@ async def process_bet_on(client, event, user_ctx: UserContext, global_config: di
             bet_id
         )
         message = await send_to_admin(client, bet_report, user_ctx, global_config)
-        asyncio.create_task(delete_later(client, event.chat_id, event.id, 10))
+        schedule_delete(client, event.chat_id, event.id, 10)
         if message:
-            asyncio.create_task(delete_later(client, message.chat_id, message.id, 100))
+            schedule_delete(client, message.chat_id, message.id, 100)
 
         # 仅在“暂停后首次真正下单”时发送恢复说明，避免倒计时结束后反复刷“恢复押注”。
         if rt.get("pause_resume_pending", False):
@@ -1995,22 +2019,16 @@ async def cleanup_message(client, message_ref):
         pass
 
 
-async def process_red_packet(client, event, user_ctx: UserContext, global_config: dict):
-    """处理红包消息，尝试领取。"""
-    sender_id = getattr(event, "sender_id", None)
-    zq_bot = user_ctx.config.groups.get("zq_bot")
-    zq_bot_targets = {str(item) for item in _iter_targets(zq_bot)}
-    if zq_bot_targets and str(sender_id) not in zq_bot_targets:
-        return
-
+def _select_red_packet_button(event):
+    """识别红包消息并返回待点击按钮 (row_idx, btn_idx, data)；非红包消息返回 None。"""
     text = (getattr(event, "raw_text", None) or getattr(event, "text", None) or "").strip()
     if not text:
-        return
+        return None
 
     reply_markup = getattr(event, "reply_markup", None)
     rows = getattr(reply_markup, "rows", None) if reply_markup else None
     if not rows:
-        return
+        return None
 
     red_keywords = ("红包", "领取", "抢红包", "red", "packet", "hongbao", "claim")
     game_keywords = ("游戏", "对战", "闯关", "开局", "竞猜", "匹配", "挑战", "start game")
@@ -2037,21 +2055,34 @@ async def process_red_packet(client, event, user_ctx: UserContext, global_config
                 red_button_candidates.append((row_idx, btn_idx, btn_data, text_l, data_l))
 
     if not callback_buttons:
-        return
+        return None
 
     has_red_text = ("灵石" in text and "红包" in text) or any(k in lower_text for k in ("抢红包", "领取红包"))
     has_game_hint = any(k in lower_text for k in game_keywords)
 
     # 仅处理明确红包消息；若是游戏提示且没有红包信号，直接忽略
     if not has_red_text and not red_button_candidates:
-        return
+        return None
     if has_game_hint and not has_red_text and not red_button_candidates:
-        return
+        return None
 
     # 优先红包候选按钮，否则回退第一个可点击按钮（兼容旧脚本）
-    target_row_idx, target_btn_idx, button_data, _, _ = (
-        red_button_candidates[0] if red_button_candidates else callback_buttons[0]
-    )
+    row_idx, btn_idx, btn_data, _, _ = red_button_candidates[0] if red_button_candidates else callback_buttons[0]
+    return row_idx, btn_idx, btn_data
+
+
+async def process_red_packet(client, event, user_ctx: UserContext, global_config: dict):
+    """处理红包消息，尝试领取。"""
+    sender_id = getattr(event, "sender_id", None)
+    zq_bot = user_ctx.config.groups.get("zq_bot")
+    zq_bot_targets = {str(item) for item in _iter_targets(zq_bot)}
+    if zq_bot_targets and str(sender_id) not in zq_bot_targets:
+        return
+
+    target = _select_red_packet_button(event)
+    if target is None:
+        return
+    target_row_idx, target_btn_idx, button_data = target
 
     log_event(
         logging.INFO,
@@ -2062,7 +2093,6 @@ async def process_red_packet(client, event, user_ctx: UserContext, global_config
     )
 
     from telethon.tl import functions as tl_functions
-    import re
 
     max_attempts = 30
     for attempt in range(max_attempts):
@@ -3211,12 +3241,12 @@ async def _handle_goal_pause_after_settle(
         )
         win_msg = (
             f"😄📈 {date_str}第 {rt.get('current_round', 1)} 轮 赢了\n"
-            f"收益：{period_profit / 10000:.2f} 万\n"
+            f"收益：{_wan(period_profit)} 万\n"
             f"共下注：{round_bet_count} 次"
         )
         await send_message_v2(client, "win", win_msg, user_ctx, global_config)
     else:
-        explode_msg = f"**💥 本轮炸了**\n收益：{period_profit / 10000:.2f} 万"
+        explode_msg = f"**💥 本轮炸了**\n收益：{_wan(period_profit)} 万"
         await send_message_v2(client, "explode", explode_msg, user_ctx, global_config)
 
     configured_stop_rounds = int(rt.get("stop", 3) if notify_type == "explode" else rt.get("profit_stop", 5))
@@ -3363,8 +3393,7 @@ def get_settle_position(state, rt):
     settle_seq = max(1, int(rt.get("current_bet_seq", 1)) - 1)
     if state.bet_sequence_log:
         last_bet_id = str(state.bet_sequence_log[-1].get("bet_id", ""))
-        import re
-        match = re.match(r"^\d{8}_(\d+)_(\d+)$", last_bet_id)
+        match = _BET_ID_RE.match(last_bet_id)
         if match:
             settle_round = int(match.group(1))
             settle_seq = int(match.group(2))
@@ -3465,8 +3494,7 @@ async def process_settle(client, event, user_ctx: UserContext, global_config: di
     text = event.message.message
     
     try:
-        import re
-        match = re.search(r"已结算: 结果为 (\d+) (大|小)", text)
+        match = _SETTLE_RE.search(text)
         if not match:
             log_event(logging.DEBUG, 'settle', '未匹配到结算消息', user_id=user_ctx.user_id, data='action=跳过')
             return
@@ -3501,8 +3529,7 @@ async def process_settle(client, event, user_ctx: UserContext, global_config: di
             rt["balance_status"] = "network_error"
 
         # 更新历史记录
-        state.history.append(result)
-        state.history = state.history[-2000:]
+        state.append_history(result)
 
         # 影子验证结算消费：对“影子预测方向”做命中统计，不触发真实下注记账。
         shadow_progress = _consume_shadow_probe_settle_result(rt, result)
@@ -3594,7 +3621,7 @@ async def process_settle(client, event, user_ctx: UserContext, global_config: di
                     if hasattr(user_ctx, 'dashboard_message') and user_ctx.dashboard_message:
                         await cleanup_message(client, user_ctx.dashboard_message)
                     display_fund = max(0, rt.get("gambling_fund", 0))
-                    mes = f"**菠菜资金耗尽，已暂停押注**\n当前剩余：{display_fund / 10000:.2f} 万\n请使用 `gf [金额]` 恢复"
+                    mes = f"**菠菜资金耗尽，已暂停押注**\n当前剩余：{_wan(display_fund)} 万\n请使用 `gf [金额]` 恢复"
                     log_event(logging.WARNING, 'settle', '资金耗尽暂停',
                               user_id=user_ctx.user_id, data=f'fund={rt.get("gambling_fund", 0)}')
                     if not rt.get("fund_pause_notified", False):
@@ -3635,7 +3662,7 @@ async def process_settle(client, event, user_ctx: UserContext, global_config: di
                         display_fund = max(0, rt.get("gambling_fund", 0))
                         mes = (
                             f"**菠菜资金不足，已暂停押注**\n"
-                            f"当前剩余：{display_fund / 10000:.2f} 万\n"
+                            f"当前剩余：{_wan(display_fund)} 万\n"
                             "请使用 `gf [金额]` 恢复"
                         )
                         await send_message_v2(
@@ -3733,8 +3760,8 @@ async def process_settle(client, event, user_ctx: UserContext, global_config: di
                                     f"⚡️ 押注方向：{bet_dir_str}\n"
                                     f"💵 押注本金：{format_number(bet_amount)}\n"
                                     f"💰 累计损失：{format_number(total_losses)}\n"
-                                    f"💰 账户余额：{rt.get('account_balance', 0) / 10000:.2f} 万\n"
-                                    f"💰 菠菜余额：{rt.get('gambling_fund', 0) / 10000:.2f} 万"
+                                    f"💰 账户余额：{_wan(rt.get('account_balance', 0))} 万\n"
+                                    f"💰 菠菜余额：{_wan(rt.get('gambling_fund', 0))} 万"
                                 )
 
                                 log_event(
@@ -3960,13 +3987,11 @@ async def process_settle(client, event, user_ctx: UserContext, global_config: di
             user_ctx.stats_message = stats_message
             rt["stats_last_report_total"] = current_total
             if stats_message:
-                asyncio.create_task(
-                    delete_later(
-                        client,
-                        stats_message.chat_id,
-                        stats_message.id,
-                        AUTO_STATS_DELETE_DELAY_SECONDS
-                    )
+                schedule_delete(
+                    client,
+                    stats_message.chat_id,
+                    stats_message.id,
+                    AUTO_STATS_DELETE_DELAY_SECONDS
                 )
         
         # 每 100 局输出一次风控暂停阶段总结，并同步到重点通道（IYUU/TG Bot）。
@@ -3987,8 +4012,8 @@ async def process_settle(client, event, user_ctx: UserContext, global_config: di
                 f"⏸ 累计暂停局数：{block_rounds}\n"
                 f"🏆 当前总胜率：{overall_wr:.2f}%（{win_total}/{current_total}）\n"
                 f"💰 总盈利：{format_number(rt.get('earnings', 0))}\n"
-                f"💰 账户余额：{rt.get('account_balance', 0) / 10000:.2f} 万\n"
-                f"💰 菠菜资金：{rt.get('gambling_fund', 0) / 10000:.2f} 万"
+                f"💰 账户余额：{_wan(rt.get('account_balance', 0))} 万\n"
+                f"💰 菠菜资金：{_wan(rt.get('gambling_fund', 0))} 万"
             )
 
             await send_message_v2(
@@ -4031,8 +4056,8 @@ async def process_settle(client, event, user_ctx: UserContext, global_config: di
                 f"😀 连续押注：{lose_end_payload.get('continuous_count', lose_count + 1)} 次\n"
                 f"⚠️本局连输： {lose_count} 次\n"
                 f"💰 本局盈利： {format_number(lose_end_payload.get('total_profit', 0))}\n"
-                f"💰 账户余额：{rt.get('account_balance', 0) / 10000:.2f} 万\n"
-                f"💰 菠菜资金剩余：{rt.get('gambling_fund', 0) / 10000:.2f} 万"
+                f"💰 账户余额：{_wan(rt.get('account_balance', 0))} 万\n"
+                f"💰 菠菜资金剩余：{_wan(rt.get('gambling_fund', 0))} 万"
             )
             if hasattr(user_ctx, "lose_streak_message") and user_ctx.lose_streak_message:
                 await cleanup_message(client, user_ctx.lose_streak_message)
@@ -4064,8 +4089,88 @@ async def process_settle(client, event, user_ctx: UserContext, global_config: di
 
 
 # 用户命令处理
-async def delete_later(client, chat_id, message_id, delay=10):
-    """延迟指定秒数后删除消息。"""
+# 延迟删除调度：单个后台任务按到期时间统一删除，同一会话同批到期的消息合并为一次调用，
+# 避免每条消息各自挂一个长时间 sleep 的任务；同批到期的各会话并发删除，并发数受限。
+_DELETE_BATCH_SIZE = 100
+_DELETE_QUEUE_MAXSIZE = 1024
+_DELETE_CONCURRENCY = 8
+
+
+class _DeleteScheduler:
+    def __init__(self, loop):
+        self.loop = loop
+        self.heap = []
+        self.seq = itertools.count()
+        self.wakeup = asyncio.Event()
+        self.limit = asyncio.Semaphore(_DELETE_CONCURRENCY)
+        self.task = loop.create_task(self._run())
+
+    def schedule(self, client, chat_id, message_id, delay) -> bool:
+        if len(self.heap) >= _DELETE_QUEUE_MAXSIZE or self.task.done():
+            return False
+        due = self.loop.time() + max(float(delay or 0), 0.0)
+        heapq.heappush(self.heap, (due, next(self.seq), client, chat_id, message_id))
+        self.wakeup.set()
+        return True
+
+    async def _delete(self, client, chat_id, message_ids):
+        async with self.limit:
+            try:
+                await client.delete_messages(chat_id, message_ids)
+            except Exception:
+                pass
+
+    async def _run(self):
+        while True:
+            if not self.heap:
+                self.wakeup.clear()
+                await self.wakeup.wait()
+                continue
+            wait_sec = self.heap[0][0] - self.loop.time()
+            if wait_sec > 0:
+                self.wakeup.clear()
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), timeout=wait_sec)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            now = self.loop.time()
+            batches = {}
+            while self.heap and self.heap[0][0] <= now:
+                _, _, client, chat_id, message_id = heapq.heappop(self.heap)
+                batches.setdefault((id(client), chat_id), (client, chat_id, []))[2].append(message_id)
+            await asyncio.gather(*(
+                self._delete(client, chat_id, message_ids[start:start + _DELETE_BATCH_SIZE])
+                for client, chat_id, message_ids in batches.values()
+                for start in range(0, len(message_ids), _DELETE_BATCH_SIZE)
+            ))
+
+
+_DELETE_SCHEDULER = None
+
+
+def _get_delete_scheduler() -> _DeleteScheduler:
+    global _DELETE_SCHEDULER
+    loop = asyncio.get_running_loop()
+    if _DELETE_SCHEDULER is None or _DELETE_SCHEDULER.loop is not loop:
+        _DELETE_SCHEDULER = _DeleteScheduler(loop)
+    return _DELETE_SCHEDULER
+
+
+async def close_delete_scheduler():
+    """取消后台删除任务（进程退出前调用），未到期的删除一并放弃。"""
+    global _DELETE_SCHEDULER
+    scheduler = _DELETE_SCHEDULER
+    _DELETE_SCHEDULER = None
+    if scheduler is None or scheduler.task.done():
+        return
+    scheduler.task.cancel()
+    if scheduler.loop is asyncio.get_running_loop():
+        await asyncio.gather(scheduler.task, return_exceptions=True)
+
+
+async def _delete_after(client, chat_id, message_id, delay):
     await asyncio.sleep(delay)
     try:
         await client.delete_messages(chat_id, message_id)
@@ -4073,6 +4178,19 @@ async def delete_later(client, chat_id, message_id, delay=10):
         pass
 
 
+def schedule_delete(client, chat_id, message_id, delay=10):
+    """登记延迟删除后立即返回（调用方无需再 create_task）；队列已满时退回单独任务等待删除。"""
+    if not _get_delete_scheduler().schedule(client, chat_id, message_id, delay):
+        asyncio.create_task(_delete_after(client, chat_id, message_id, delay))
+
+
+async def delete_later(client, chat_id, message_id, delay=10):
+    """延迟指定秒数后删除消息（登记到后台调度器后立即返回；队列已满时退回逐条等待删除）。"""
+    if _get_delete_scheduler().schedule(client, chat_id, message_id, delay):
+        return
+    await _delete_after(client, chat_id, message_id, delay)
+
+
 async def handle_model_command_multiuser(event, args, user_ctx: UserContext, global_config: dict):
     """处理 model 命令 - 与master版本handle_model_command一致"""
     rt = user_ctx.state.runtime
@@ -4391,9 +4509,9 @@ async def process_user_command(client, event, user_ctx: UserContext, global_conf
 """
             log_event(logging.INFO, 'user_cmd', '显示帮助', user_id=user_ctx.user_id)
             message = await send_to_admin(client, mes, user_ctx, global_config)
-            asyncio.create_task(delete_later(client, event.chat_id, event.id, 10))
+            schedule_delete(client, event.chat_id, event.id, 10)
             if message:
-                asyncio.create_task(delete_later(client, message.chat_id, message.id, 60))
+                schedule_delete(client, message.chat_id, message.id, 60)
             return
         
         # open/off 兼容旧命令：分别等同 resume/pause。
@@ -4420,9 +4538,9 @@ async def process_user_command(client, event, user_ctx: UserContext, global_conf
 
             if not unique_groups:
                 message = await send_to_admin(client, "未配置可清理的群组（zq_group/monitor）", user_ctx, global_config)
-                asyncio.create_task(delete_later(client, event.chat_id, event.id, 10))
+                schedule_delete(client, event.chat_id, event.id, 10)
                 if message:
-                    asyncio.create_task(delete_later(client, message.chat_id, message.id, 10))
+                    schedule_delete(client, message.chat_id, message.id, 10)
                 return
 
             deleted_total = 0
@@ -4457,9 +4575,9 @@ async def process_user_command(client, event, user_ctx: UserContext, global_conf
                 failed=len(failed_groups),
             )
             message = await send_to_admin(client, mes, user_ctx, global_config)
-            asyncio.create_task(delete_later(client, event.chat_id, event.id, 3))
+            schedule_delete(client, event.chat_id, event.id, 3)
             if message:
-                asyncio.create_task(delete_later(client, message.chat_id, message.id, 10))
+                schedule_delete(client, message.chat_id, message.id, 10)
             return
         
         # pause/resume - 暂停/恢复押注
@@ -4499,9 +4617,9 @@ async def process_user_command(client, event, user_ctx: UserContext, global_conf
 
             if len(my) == 1:
                 message = await send_to_admin(client, _build_risk_state_text(rt), user_ctx, global_config)
-                asyncio.create_task(delete_later(client, event.chat_id, event.id, 10))
+                schedule_delete(client, event.chat_id, event.id, 10)
                 if message:
-                    asyncio.create_task(delete_later(client, message.chat_id, message.id, 60))
+                    schedule_delete(client, message.chat_id, message.id, 60)
                 return
 
             if len(my) != 3:
@@ -4548,9 +4666,9 @@ async def process_user_command(client, event, user_ctx: UserContext, global_conf
             status_text = "开启" if enabled else "关闭"
             mes = f"✅ 已{status_text}{scope_text}（已写入账号默认模式）\n\n{_build_risk_state_text(rt)}"
             message = await send_to_admin(client, mes, user_ctx, global_config)
-            asyncio.create_task(delete_later(client, event.chat_id, event.id, 10))
+            schedule_delete(client, event.chat_id, event.id, 10)
             if message:
-                asyncio.create_task(delete_later(client, message.chat_id, message.id, 60))
+                schedule_delete(client, message.chat_id, message.id, 60)
             log_event(
                 logging.INFO,
                 'user_cmd',
@@ -4591,9 +4709,9 @@ async def process_user_command(client, event, user_ctx: UserContext, global_conf
                 mes = f"预设启动成功: {preset_name} ({preset[0]} {preset[1]} {preset[2]} {preset[3]} {preset[4]} {preset[5]} {preset[6]})"
                 log_event(logging.INFO, 'user_cmd', '启动预设', user_id=user_ctx.user_id, preset=preset_name)
                 message = await send_to_admin(client, mes, user_ctx, global_config)
-                asyncio.create_task(delete_later(client, event.chat_id, event.id, 10))
+                schedule_delete(client, event.chat_id, event.id, 10)
                 if message:
-                    asyncio.create_task(delete_later(client, message.chat_id, message.id, 10))
+                    schedule_delete(client, message.chat_id, message.id, 10)
                 await yc_command_handler_multiuser(
                     client,
                     event,
@@ -4650,18 +4768,18 @@ async def process_user_command(client, event, user_ctx: UserContext, global_conf
             
             log_event(logging.INFO, 'user_cmd', '查看统计', user_id=user_ctx.user_id)
             message = await send_to_admin(client, mes, user_ctx, global_config)
-            asyncio.create_task(delete_later(client, event.chat_id, event.id, 10))
+            schedule_delete(client, event.chat_id, event.id, 10)
             if message:
-                asyncio.create_task(delete_later(client, message.chat_id, message.id, 30))
+                schedule_delete(client, message.chat_id, message.id, 30)
             return
         
         # status - 查看仪表盘 - 与master一致
         if cmd == "status":
             dashboard = format_dashboard(user_ctx)
             message = await send_to_admin(client, dashboard, user_ctx, global_config)
-            asyncio.create_task(delete_later(client, event.chat_id, event.id, 10))
+            schedule_delete(client, event.chat_id, event.id, 10)
             if message:
-                asyncio.create_task(delete_later(client, message.chat_id, message.id, 60))
+                schedule_delete(client, message.chat_id, message.id, 60)
             return
         
         # ========== 参数设置命令 ==========
@@ -4670,7 +4788,7 @@ async def process_user_command(client, event, user_ctx: UserContext, global_conf
             old_fund = rt.get("gambling_fund", 0)
             if len(my) == 1:
                 rt["gambling_fund"] = rt.get("gambling_fund", 2000000)
-                mes = f"菠菜资金已重置为 {rt['gambling_fund'] / 10000:.2f} 万"
+                mes = f"菠菜资金已重置为 {_wan(rt['gambling_fund'])} 万"
             elif len(my) == 2:
                 try:
                     new_fund = int(my[1])
@@ -4680,9 +4798,9 @@ async def process_user_command(client, event, user_ctx: UserContext, global_conf
                         account_balance = rt.get("account_balance", 0)
                         if new_fund > account_balance:
                             new_fund = account_balance
-                            mes = f"设置的资金超过账户余额，已调整为 {new_fund / 10000:.2f} 万"
+                            mes = f"设置的资金超过账户余额，已调整为 {_wan(new_fund)} 万"
                         else:
-                            mes = f"菠菜资金已设置为 {new_fund / 10000:.2f} 万"
+                            mes = f"菠菜资金已设置为 {_wan(new_fund)} 万"
                         rt["gambling_fund"] = new_fund
                 except ValueError:
                     mes = "无效的金额格式，请输入整数"
@@ -4691,9 +4809,9 @@ async def process_user_command(client, event, user_ctx: UserContext, global_conf
             
             log_event(logging.INFO, 'user_cmd', '设置资金', user_id=user_ctx.user_id, mes=mes)
             message = await send_to_admin(client, mes, user_ctx, global_config)
-            asyncio.create_task(delete_later(client, event.chat_id, event.id, 10))
+            schedule_delete(client, event.chat_id, event.id, 10)
             if message:
-                asyncio.create_task(delete_later(client, message.chat_id, message.id, 10))
+                schedule_delete(client, message.chat_id, message.id, 10)
             
             if rt.get("gambling_fund", 0) != old_fund:
                 log_event(logging.INFO, 'user_cmd', '资金变更', user_id=user_ctx.user_id, 
@@ -4715,9 +4833,9 @@ async def process_user_command(client, event, user_ctx: UserContext, global_conf
                 log_event(logging.INFO, 'user_cmd', '设置参数', user_id=user_ctx.user_id,
                          explode=rt['explode'], profit=rt['profit'], stop=rt['stop'], profit_stop=rt['profit_stop'])
                 message = await send_to_admin(client, mes, user_ctx, global_config)
-                asyncio.create_task(delete_later(client, event.chat_id, event.id, 10))
+                schedule_delete(client, event.chat_id, event.id, 10)
                 if message:
-                    asyncio.create_task(delete_later(client, message.chat_id, message.id, 10))
+                    schedule_delete(client, message.chat_id, message.id, 10)
             except ValueError:
                 await send_to_admin(client, "参数格式错误，请输入整数", user_ctx, global_config)
             return
@@ -4741,9 +4859,9 @@ async def process_user_command(client, event, user_ctx: UserContext, global_conf
                     "用法: warn <次数> 或 wlc <次数>"
                 )
             message = await send_to_admin(client, mes, user_ctx, global_config)
-            asyncio.create_task(delete_later(client, event.chat_id, event.id, 10))
+            schedule_delete(client, event.chat_id, event.id, 10)
             if message:
-                asyncio.create_task(delete_later(client, message.chat_id, message.id, 10))
+                schedule_delete(client, message.chat_id, message.id, 10)
             return
         
         # model - 模型管理 - 使用与master一致的handle_model_command
@@ -4751,16 +4869,16 @@ async def process_user_command(client, event, user_ctx: UserContext, global_conf
             if len(my) == 2 and my[1].lower().startswith("v"):
                 mes = "当前算法固定为 V10，无需切换。请使用 `model select <id>` 切换模型。"
                 await event.reply(mes)
-                asyncio.create_task(delete_later(client, event.chat_id, event.id, 10))
+                schedule_delete(client, event.chat_id, event.id, 10)
                 return
             await handle_model_command_multiuser(event, my[1:], user_ctx, global_config)
-            asyncio.create_task(delete_later(client, event.chat_id, event.id, 10))
+            schedule_delete(client, event.chat_id, event.id, 10)
             return
 
         if cmd in ("apikey", "ak"):
             await handle_apikey_command_multiuser(event, my[1:], user_ctx)
             # 防止 key 在命令消息中长期可见
-            asyncio.create_task(delete_later(client, event.chat_id, event.id, 3))
+            schedule_delete(client, event.chat_id, event.id, 3)
             return
 
         # ========== 发布更新命令 ==========
@@ -4840,9 +4958,9 @@ async def process_user_command(client, event, user_ctx: UserContext, global_conf
                 mes = "\n".join(lines)
 
             message = await send_to_admin(client, mes, user_ctx, global_config)
-            asyncio.create_task(delete_later(client, event.chat_id, event.id, 10))
+            schedule_delete(client, event.chat_id, event.id, 10)
             if message:
-                asyncio.create_task(delete_later(client, message.chat_id, message.id, 60))
+                schedule_delete(client, message.chat_id, message.id, 60)
             return
 
         if cmd in ("update", "up", "upnow", "upref", "upcommit"):
@@ -4872,7 +4990,7 @@ async def process_user_command(client, event, user_ctx: UserContext, global_conf
                 if detail:
                     mes_lines.append(f"详情：{detail[:200]}")
                 await send_to_admin(client, "\n".join(mes_lines), user_ctx, global_config)
-            asyncio.create_task(delete_later(client, event.chat_id, event.id, 10))
+            schedule_delete(client, event.chat_id, event.id, 10)
             return
 
         if cmd in ("reback", "rollback", "uprollback"):
@@ -4898,7 +5016,7 @@ async def process_user_command(client, event, user_ctx: UserContext, global_conf
                 if result.get("detail"):
                     mes += f"\n详情：{str(result.get('detail'))[:200]}"
                 await send_to_admin(client, mes, user_ctx, global_config)
-            asyncio.create_task(delete_later(client, event.chat_id, event.id, 10))
+            schedule_delete(client, event.chat_id, event.id, 10)
             return
 
         if cmd in ("restart", "reboot"):
@@ -4908,7 +5026,7 @@ async def process_user_command(client, event, user_ctx: UserContext, global_conf
             else:
                 mes = "♻️ 收到重启指令，2 秒后自动重启进程..."
             await send_to_admin(client, mes, user_ctx, global_config)
-            asyncio.create_task(delete_later(client, event.chat_id, event.id, 3))
+            schedule_delete(client, event.chat_id, event.id, 3)
             asyncio.create_task(restart_process())
             return
         
@@ -4998,9 +5116,9 @@ async def process_user_command(client, event, user_ctx: UserContext, global_conf
                 mes = "请指定重置类型：res tj / res state / res bet"
             
             message = await send_to_admin(client, mes, user_ctx, global_config)
-            asyncio.create_task(delete_later(client, event.chat_id, event.id, 10))
+            schedule_delete(client, event.chat_id, event.id, 10)
             if message:
-                asyncio.create_task(delete_later(client, message.chat_id, message.id, 10))
+                schedule_delete(client, message.chat_id, message.id, 10)
             return
         
         # explain - 查看AI决策解释 - 与master一致
@@ -5012,7 +5130,7 @@ async def process_user_command(client, event, user_ctx: UserContext, global_conf
                 await send_to_admin(client, mes, user_ctx, global_config)
             else:
                 await send_to_admin(client, "⚠️ 暂无 AI 决策记录 (需等待 V10 运行至少一次)", user_ctx, global_config)
-            asyncio.create_task(delete_later(client, event.chat_id, event.id, 10))
+            schedule_delete(client, event.chat_id, event.id, 10)
             return
         
         # balance - 查询余额 - 与master一致
@@ -5041,9 +5159,9 @@ async def process_user_command(client, event, user_ctx: UserContext, global_conf
                 mes = f"预设保存成功: {preset_name} ({ys[0]} {ys[1]} {ys[2]} {ys[3]} {ys[4]} {ys[5]} {ys[6]})"
                 log_event(logging.INFO, 'user_cmd', '保存预设策略', user_id=user_ctx.user_id, preset=preset_name, params=ys)
                 message = await send_to_admin(client, mes, user_ctx, global_config)
-                asyncio.create_task(delete_later(client, event.chat_id, event.id, 10))
+                schedule_delete(client, event.chat_id, event.id, 10)
                 if message:
-                    asyncio.create_task(delete_later(client, message.chat_id, message.id, 10))
+                    schedule_delete(client, message.chat_id, message.id, 10)
             except (ValueError, IndexError) as e:
                 await send_to_admin(client, f"预设格式错误: {e}", user_ctx, global_config)
             return
@@ -5062,9 +5180,9 @@ async def process_user_command(client, event, user_ctx: UserContext, global_conf
                     mes = "删除失败：预设不存在或格式错误"
                     log_event(logging.WARNING, 'user_cmd', '删除预设失败', user_id=user_ctx.user_id, cmd=text)
                 message = await send_to_admin(client, mes, user_ctx, global_config)
-                asyncio.create_task(delete_later(client, event.chat_id, event.id, 10))
+                schedule_delete(client, event.chat_id, event.id, 10)
                 if message:
-                    asyncio.create_task(delete_later(client, message.chat_id, message.id, 10))
+                    schedule_delete(client, message.chat_id, message.id, 10)
             else:
                 # 查看所有预设
                 if len(presets) > 0:
@@ -5075,16 +5193,16 @@ async def process_user_command(client, event, user_ctx: UserContext, global_conf
                     mes = "暂无预设"
                     log_event(logging.INFO, 'user_cmd', '暂无预设', user_id=user_ctx.user_id)
                 message = await send_to_admin(client, mes, user_ctx, global_config)
-                asyncio.create_task(delete_later(client, event.chat_id, event.id, 60))
+                schedule_delete(client, event.chat_id, event.id, 60)
                 if message:
-                    asyncio.create_task(delete_later(client, message.chat_id, message.id, 60))
+                    schedule_delete(client, message.chat_id, message.id, 60)
             return
         
         # ========== 测算命令 ==========
         if cmd == "yc":
             # 测算命令 - 与master一致
             await yc_command_handler_multiuser(client, event, my[1:], user_ctx, global_config)
-            asyncio.create_task(delete_later(client, event.chat_id, event.id, 10))
+            schedule_delete(client, event.chat_id, event.id, 10)
             return
         
         # ms - 切换模式 - 与master一致
@@ -5108,9 +5226,9 @@ async def process_user_command(client, event, user_ctx: UserContext, global_conf
                 mes = f"当前模式: {mode_names.get(current_mode, '未知')} ({current_mode})\n用法: ms [0|1|2]"
             
             message = await send_to_admin(client, mes, user_ctx, global_config)
-            asyncio.create_task(delete_later(client, event.chat_id, event.id, 10))
+            schedule_delete(client, event.chat_id, event.id, 10)
             if message:
-                asyncio.create_task(delete_later(client, message.chat_id, message.id, 10))
+                schedule_delete(client, message.chat_id, message.id, 10)
             return
         
         # ========== 多用户管理命令 ==========
@@ -5124,15 +5242,15 @@ async def process_user_command(client, event, user_ctx: UserContext, global_conf
             user_info += f"🤖 模型: {rt.get('current_model_id', 'default')}\n"
             user_info += f"📈 胜率: {rt.get('win_total', 0)}/{rt.get('total', 0)}"
             message = await send_to_admin(client, user_info, user_ctx, global_config)
-            asyncio.create_task(delete_later(client, event.chat_id, event.id, 10))
+            schedule_delete(client, event.chat_id, event.id, 10)
             if message:
-                asyncio.create_task(delete_later(client, message.chat_id, message.id, 30))
+                schedule_delete(client, message.chat_id, message.id, 30)
             return
         
         # 未知命令
         log_event(logging.DEBUG, 'user_cmd', '未知命令', user_id=user_ctx.user_id, data=text[:50])
         message = await send_to_admin(client, f"未知命令: {cmd}\n输入 help 查看帮助", user_ctx, global_config)
-        asyncio.create_task(delete_later(client, event.chat_id, event.id, 10))
+        schedule_delete(client, event.chat_id, event.id, 10)
         
     except Exception as e:
         log_event(logging.ERROR, 'user_cmd', '命令执行出错', user_id=user_ctx.user_id, error=str(e))
@@ -5175,7 +5293,7 @@ async def check_bet_status(client, user_ctx: UserContext, global_config: dict):
         user_ctx.save_state()
         mes = (
             "✅ 资金条件已满足，恢复可下注状态\n"
-            f"当前资金：{rt.get('gambling_fund', 0) / 10000:.2f} 万\n"
+            f"当前资金：{_wan(rt.get('gambling_fund', 0))} 万\n"
             f"接续倍投金额：{format_number(next_bet_amount)}\n"
             "说明：本提示仅表示“可下注”，实际下注仍以盘口事件触发为准"
         )
@@ -5211,7 +5329,7 @@ async def check_bet_status(client, user_ctx: UserContext, global_config: dict):
             user_ctx.save_state()
             mes = (
                 "✅ 资金同步后已恢复可下注状态\n"
-                f"当前资金：{rt.get('gambling_fund', 0) / 10000:.2f} 万\n"
+                f"当前资金：{_wan(rt.get('gambling_fund', 0))} 万\n"
                 f"接续倍投金额：{format_number(next_bet_amount)}\n"
                 "说明：本提示仅表示“可下注”，实际下注仍以盘口事件触发为准"
             )
@@ -5346,6 +5464,29 @@ def _calculate_yc_sequence(params):
     }
 
 
+def _fmt_yc_table_wan(value: int) -> str:
+    wan = value / 10000
+    if abs(wan) >= 1000:
+        return f"{wan:,.0f}"
+    return f"{wan:.1f}"
+
+
+def _format_yc_table_row(row: dict) -> str:
+    # 注意：保持 str.center 居中，格式化规范 "^" 在奇数补位时左右分配不同，会改变表格对齐。
+    multiplier_text = f"{row['multiplier']:.2f}".rstrip("0")
+    if multiplier_text.endswith("."):
+        multiplier_text += "0"
+    return "|".join(
+        (
+            str(row["streak"]).center(3),
+            multiplier_text.center(4),
+            _fmt_yc_table_wan(row["bet"]).center(6),
+            _fmt_yc_table_wan(row["profit_if_win"]).center(6),
+            _fmt_yc_table_wan(row["cumulative_loss"]).center(6),
+        )
+    )
+
+
 def _build_yc_result_message(params, preset_name: str, current_fund: int, auto_trigger: bool) -> str:
     calc = _calculate_yc_sequence(params)
     rows = calc["rows"]
@@ -5358,12 +5499,6 @@ def _build_yc_result_message(params, preset_name: str, current_fund: int, auto_t
     def fmt_wan(value: int) -> str:
         return f"{value / 10000:,.1f}"
 
-    def fmt_table_wan(value: int) -> str:
-        wan = value / 10000
-        if abs(wan) >= 1000:
-            return f"{wan:,.0f}"
-        return f"{wan:.1f}"
-
     header_line = "🔮 已根据当前预设自动测算\n" if auto_trigger else ""
     command_text = (
         f"{params['continuous']} {params['lose_stop']} "
@@ -5412,19 +5547,7 @@ def _build_yc_result_message(params, preset_name: str, current_fund: int, auto_t
         ]
     )
 
-    for row in rows:
-        multiplier_text = f"{row['multiplier']:.2f}".rstrip("0")
-        if multiplier_text.endswith("."):
-            multiplier_text += "0"
-        row_text = (
-            f"{str(row['streak']).center(3)}|"
-            f"{multiplier_text.center(4)}|"
-            f"{fmt_table_wan(row['bet']).center(6)}|"
-            f"{fmt_table_wan(row['profit_if_win']).center(6)}|"
-            f"{fmt_table_wan(row['cumulative_loss']).center(6)}"
-        )
-        lines.append(row_text)
-
+    lines.extend([_format_yc_table_row(row) for row in rows])
     lines.append("```")
     return "\n".join(lines)
 